@@ -0,0 +1,74 @@
+"""
+
+Waypoint arrival detection for offboard (indoor) missions.
+
+A waypoint counts as reached once the vehicle has stayed within a 3D acceptance radius of it for a settle time.
+Unlike comparing each axis against the target, this works whichever side the vehicle approaches from, and the
+settle time stops a vehicle that is only passing through the sphere from counting as arrived.
+
+"""
+
+import math
+
+import numpy as np
+
+
+# Default acceptance radius (m) and settle time (s).
+ACCEPTANCE_RADIUS = 0.3
+SETTLE_TIME = 0.5
+
+
+"""
+Tracks arrival at one target NED position, fed one position sample at a time.
+"""
+class ArrivalDetector:
+
+    def __init__(self, target, radius=ACCEPTANCE_RADIUS, settle_time=SETTLE_TIME):
+        self.target = tuple(float(value) for value in target[:3])
+        self.radius = radius
+        self.settle_time = settle_time
+        self.since = None
+        self.distance = math.inf
+
+    """
+    Feed a position sample. Returns True once the vehicle has been inside the radius for the settle time.
+    """
+    def update(self, north, east, down, now):
+        self.distance = math.dist((north, east, down), self.target)
+        if self.distance > self.radius:
+            self.since = None
+            return False
+        if self.since is None:
+            self.since = now
+        return now - self.since >= self.settle_time
+
+    """
+    Feed a position_velocity_ned sample.
+    """
+    def update_sample(self, sample, now):
+        position = sample.position
+        return self.update(position.north_m, position.east_m, position.down_m, now)
+
+    def reset(self):
+        self.since = None
+        self.distance = math.inf
+
+
+"""
+Index of the first sample at which a recorded track counts as having arrived at `target`, or None. `times` is
+an (n,) array and `positions` an (n, 3) array of NED positions, e.g. columns from a FlightLog.
+"""
+def arrival_index(times, positions, target, radius=ACCEPTANCE_RADIUS, settle_time=SETTLE_TIME):
+    times = np.asarray(times, dtype="f8")
+    positions = np.asarray(positions, dtype="f8")
+    if not len(times):
+        return None
+
+    inside = np.linalg.norm(positions - np.asarray(target[:3], dtype="f8"), axis=1) <= radius
+    # Start time of the run of inside samples each sample belongs to.
+    entered = inside & ~np.concatenate(([False], inside[:-1]))
+    starts = np.maximum.accumulate(np.where(entered, np.arange(len(inside)), 0))
+    arrived = inside & (times - times[starts] >= settle_time)
+    if not arrived.any():
+        return None
+    return int(np.argmax(arrived))
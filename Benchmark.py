@@ -0,0 +1,99 @@
+"""
+
+Benchmark/load test of the drone functions against the in-process simulated drone.
+
+Runs connect, a burst of module actions, an indoor mission and an outdoor mission on the shared drone event
+loop, then flies a fleet of simulated drones concurrently (directly and through the mission scheduler), and
+prints how long each took. No PX4 SITL or hardware is needed:
+
+      python Benchmark.py [module actions] [time scale] [fleet size]
+
+"""
+
+import asyncio
+import sys
+import time
+
+import DroneFunctions
+from DroneLoop import DroneLoop
+from Fleet import Fleet, MissionScheduler, DONE, FAILED
+from SimulatedDrone import SimulatedDrone
+
+
+INDOOR_MISSION = [[0.0, 0.0, -2.5, 0.0], [7.0, 0.0, -2.5, 0.0], [7.0, 7.0, -2.5, 0.0]]
+# Indoor setpoints are streamed in real time, so the indoor missions fly at full speed.
+INDOOR_SPEED = 5.0
+OUTDOOR_MISSION = [[55.860537813626316, -4.241570234298707, 2.5],
+                   [55.859791187406984, -4.2425787448883066, 2.5],
+                   [55.86059501423685, -4.2430293560028085, 2.5]]
+
+
+"""
+Time a coroutine on the drone loop.
+"""
+def timed(drone_loop, label, coro):
+    start = time.perf_counter()
+    result = drone_loop.run(coro)
+    print(f"{label:<32}{(time.perf_counter() - start) * 1000:10.1f} ms    -> {result}")
+    return result
+
+
+def main():
+    actions = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    time_scale = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+    fleet_size = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    DroneFunctions.address = "sim://benchmark"
+    DroneFunctions.RECORD_FLIGHTS = False
+    # Batteries do not drain, so long runs never leave the scheduler without a vehicle to fly.
+    DroneFunctions.connections.register_backend(
+        "sim", lambda address: SimulatedDrone(time_scale=time_scale, drain_rate=0.0))
+
+    drone_loop = DroneLoop().start()
+    try:
+        timed(drone_loop, "connect", DroneFunctions.connect())
+
+        start = time.perf_counter()
+        for i in range(actions):
+            drone_loop.run(DroneFunctions.module_action((0, i % 2)))
+        elapsed = time.perf_counter() - start
+        print(f"{f'{actions} module actions':<32}{elapsed * 1000:10.1f} ms    "
+              f"({elapsed / actions * 1e6:.0f} us each)")
+
+        timed(drone_loop, f"indoor mission (x{time_scale:g})",
+              DroneFunctions.run_indoor(INDOOR_MISSION, speed=INDOOR_SPEED))
+        timed(drone_loop, f"outdoor mission (x{time_scale:g})",
+              DroneFunctions.run_outdoor(OUTDOOR_MISSION, True))
+
+        fleet = Fleet(DroneFunctions.connections)
+        for i in range(fleet_size):
+            fleet.add(f"drone{i}", f"sim://fleet{i}")
+
+        async def connect_fleet():
+            return sum((await fleet.connect_all()).values())
+        timed(drone_loop, f"connect fleet of {fleet_size}", connect_fleet())
+
+        async def fly_fleet():
+            tasks = [fleet.start_mission(vehicle.name, INDOOR_MISSION, False, speed=INDOOR_SPEED)
+                     for vehicle in fleet]
+            return sum(result is True for result in await asyncio.gather(*tasks))
+        timed(drone_loop, f"fleet indoor missions (x{time_scale:g})", fly_fleet())
+
+        async def schedule_fleet():
+            scheduler = MissionScheduler(fleet)
+            runner = asyncio.ensure_future(scheduler.run())
+            jobs = [scheduler.submit(f"mission{i}", INDOOR_MISSION, False, speed=INDOOR_SPEED)
+                    for i in range(2 * fleet_size)]
+            try:
+                while any(job.state not in (DONE, FAILED) for job in jobs):
+                    await asyncio.sleep(0.01)
+            finally:
+                runner.cancel()
+            return sum(job.state == DONE for job in jobs)
+        timed(drone_loop, f"{2 * fleet_size} scheduled missions (x{time_scale:g})", schedule_fleet())
+    finally:
+        drone_loop.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+
+Module command acknowledgement tracking.
+
+Each module command is timestamped when it is submitted in the GUI, when it has been sent and when the vehicle
+acknowledges it. Module commands go out as gimbal manager messages, which get no COMMAND_ACK: MAVSDK returns as
+soon as the message has been handed to mavsdk_server, so that is only the send time. The ack is the vehicle's
+gimbal attitude echo of the command (see ModuleChannel). Latencies are recorded into HDR-style histograms, which
+keep a fixed relative precision from microseconds up to minutes in a small, fixed amount of memory. This allows
+long sessions to be summarised (p50/p99/max) and exported without keeping every sample.
+
+"""
+
+import collections
+import threading
+import time
+
+import numpy as np
+
+
+# Histograms record microseconds from 1 us up to this value with this many significant figures.
+HIGHEST_LATENCY_US = 10 * 60 * 1000000
+SIGNIFICANT_FIGURES = 2
+
+# Number of individual command records kept for inspection.
+RECENT_COMMANDS = 1000
+
+# Percentiles shown in summaries.
+SUMMARY_PERCENTILES = (50.0, 90.0, 99.0)
+
+
+"""
+Log-linear latency histogram in the style of HdrHistogram. Values are integers (here microseconds); every
+recorded value is counted in a bucket no wider than 1 part in 10^significant_figures of its value.
+"""
+class LatencyHistogram:
+
+    def __init__(self, highest=HIGHEST_LATENCY_US, significant_figures=SIGNIFICANT_FIGURES):
+        self.highest = int(highest)
+        self.significant_figures = significant_figures
+
+        largest_single_unit = 2 * 10 ** significant_figures
+        self.sub_bucket_count_magnitude = (largest_single_unit - 1).bit_length()
+        self.sub_bucket_half_count_magnitude = self.sub_bucket_count_magnitude - 1
+        self.sub_bucket_count = 1 << self.sub_bucket_count_magnitude
+        self.sub_bucket_half_count = self.sub_bucket_count // 2
+        self.sub_bucket_mask = self.sub_bucket_count - 1
+
+        bucket_count = 1
+        smallest_untrackable = self.sub_bucket_count
+        while smallest_untrackable <= self.highest:
+            smallest_untrackable <<= 1
+            bucket_count += 1
+        self.bucket_count = bucket_count
+        self.counts = np.zeros((bucket_count + 1) * self.sub_bucket_half_count, dtype=np.int64)
+        self.reset()
+
+    def reset(self):
+        self.counts[:] = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.sum = 0
+
+    def _index(self, value):
+        bucket = (value | self.sub_bucket_mask).bit_length() - (self.sub_bucket_half_count_magnitude + 1)
+        sub_bucket = value >> bucket
+        return ((bucket + 1) << self.sub_bucket_half_count_magnitude) + (sub_bucket - self.sub_bucket_half_count)
+
+    """
+    Smallest and largest value counted at each index, as arrays.
+    """
+    def _ranges(self):
+        index = np.arange(len(self.counts))
+        bucket = (index >> self.sub_bucket_half_count_magnitude) - 1
+        sub_bucket = (index & (self.sub_bucket_half_count - 1)) + self.sub_bucket_half_count
+        first = bucket < 0
+        sub_bucket[first] -= self.sub_bucket_half_count
+        bucket[first] = 0
+        low = sub_bucket.astype(np.int64) << bucket
+        return low, low + (np.int64(1) << bucket) - 1
+
+    def record(self, value, count=1):
+        value = min(max(int(value), 0), self.highest)
+        self.counts[self._index(value)] += count
+        self.total += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def mean(self):
+        return self.sum / self.total if self.total else None
+
+    """
+    Value at or below which the given percentage of recorded values fall (to histogram precision).
+    """
+    def percentile(self, percent):
+        if not self.total:
+            return None
+        target = max(1, int(np.ceil(percent / 100.0 * self.total)))
+        index = int(np.searchsorted(np.cumsum(self.counts), target))
+        _, high = self._ranges()
+        return int(min(high[index], self.max))
+
+    """
+    Percentile distribution as (value, percentile, total count) rows, one per populated bucket.
+    """
+    def distribution(self):
+        populated = np.nonzero(self.counts)[0]
+        if not len(populated):
+            return []
+        _, high = self._ranges()
+        cumulative = np.cumsum(self.counts)[populated]
+        values = np.minimum(high[populated], self.max)
+        return [(int(value), 100.0 * int(count) / self.total, int(count))
+                for value, count in zip(values, cumulative)]
+
+    """
+    Write the percentile distribution in HdrHistogram's text output format (values in milliseconds).
+    """
+    def export(self, file):
+        file.write(f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>14}\n\n")
+        for value, percentile, count in self.distribution():
+            inverse = "inf" if percentile >= 100.0 else f"{1.0 / (1.0 - percentile / 100.0):.2f}"
+            file.write(f"{value / 1000.0:12.3f} {percentile / 100.0:14.12f} {count:10d} {inverse:>14}\n")
+        mean = self.mean()
+        file.write(f"#[Mean    = {0.0 if mean is None else mean / 1000.0:12.3f}]\n")
+        file.write(f"#[Max     = {0.0 if self.max is None else self.max / 1000.0:12.3f}]\n")
+        file.write(f"#[Total count    = {self.total:12d}]\n")
+
+
+"""
+Timestamps (time.monotonic seconds) of one submitted module command.
+"""
+class CommandRecord:
+
+    def __init__(self, command, submitted):
+        self.command = command
+        self.submitted = submitted
+        self.sent = None
+        self.acked = None
+        self.error = None
+        self.coalesced = False
+        self.timed_out = False
+        self.unverifiable = False
+
+    def latency(self):
+        if self.acked is None:
+            return None
+        return self.acked - self.submitted
+
+    def __repr__(self):
+        return f"CommandRecord({self.command}, latency={self.latency()}, error={self.error})"
+
+
+"""
+Tracks module commands for one vehicle. Records are created and stamped on the drone loop; summaries and
+exports can be taken from any thread.
+"""
+class CommandTracker:
+
+    def __init__(self, recent=RECENT_COMMANDS):
+        self.recent = collections.deque(maxlen=recent)
+        # submit -> send, send -> ack and submit -> ack latencies.
+        self.queued = LatencyHistogram()
+        self.ack = LatencyHistogram()
+        self.total = LatencyHistogram()
+        self.failed = 0
+        self.unacknowledged = 0
+        self.unverifiable = 0
+        self._lock = threading.Lock()
+
+    def submitted(self, command, submitted=None):
+        record = CommandRecord(command, time.monotonic() if submitted is None else submitted)
+        with self._lock:
+            self.recent.append(record)
+        return record
+
+    def sent(self, record, now=None):
+        record.sent = time.monotonic() if now is None else now
+        with self._lock:
+            self.queued.record((record.sent - record.submitted) * 1e6)
+
+    def acked(self, record, now=None):
+        record.acked = time.monotonic() if now is None else now
+        with self._lock:
+            self.ack.record((record.acked - record.sent) * 1e6)
+            self.total.record((record.acked - record.submitted) * 1e6)
+
+    def failed_with(self, record, error):
+        record.error = str(error)
+        with self._lock:
+            self.failed += 1
+
+    """
+    Mark a sent command whose echo never arrived.
+    """
+    def timed_out(self, record):
+        record.timed_out = True
+        with self._lock:
+            self.unacknowledged += 1
+
+    """
+    Mark a sent command whose echo could not be told apart from the attitude already reported, e.g. a repeat of
+    the last command.
+    """
+    def unverified(self, record):
+        record.unverifiable = True
+        with self._lock:
+            self.unverifiable += 1
+
+    def reset(self):
+        with self._lock:
+            self.recent.clear()
+            for histogram in (self.queued, self.ack, self.total):
+                histogram.reset()
+            self.failed = 0
+            self.unacknowledged = 0
+            self.unverifiable = 0
+
+    """
+    Short submit-to-ack latency summary for display, e.g. "p50 12.1 ms  p99 40.2 ms  max 51.0 ms  (n=20)".
+    """
+    def summary(self):
+        with self._lock:
+            if not self.total.total:
+                counts = self._counts()
+                return "No acknowledged commands" + (f" ({counts})" if counts else "")
+            parts = [f"p{percent:g} {self.total.percentile(percent) / 1000.0:.1f} ms"
+                     for percent in SUMMARY_PERCENTILES]
+            parts.append(f"max {self.total.max / 1000.0:.1f} ms")
+            counts = self._counts()
+            return "  ".join(parts) + f"  (n={self.total.total}" + (f", {counts}" if counts else "") + ")"
+
+    def _counts(self):
+        counts = [(self.failed, "failed"), (self.unacknowledged, "unacknowledged"),
+                  (self.unverifiable, "unverifiable")]
+        return ", ".join(f"{count} {label}" for count, label in counts if count)
+
+    """
+    Write every histogram's percentile distribution, followed by the recent individual commands, to a file.
+    """
+    def export(self, path):
+        with self._lock, open(path, "w") as file:
+            for title, histogram in (("Submit to ack", self.total), ("Submit to send", self.queued),
+                                     ("Send to ack", self.ack)):
+                file.write(f"# {title} latency (ms)\n")
+                histogram.export(file)
+                file.write("\n")
+            file.write("# Recent commands\n")
+            file.write("module,action,submitted,sent_ms,acked_ms,coalesced,timed_out,unverifiable,error\n")
+            for record in self.recent:
+                sent = "" if record.sent is None else f"{(record.sent - record.submitted) * 1000.0:.3f}"
+                acked = "" if record.acked is None else f"{(record.acked - record.submitted) * 1000.0:.3f}"
+                file.write(f"{record.command[0]},{record.command[1]},{record.submitted:.6f},{sent},{acked},"
+                           f"{int(record.coalesced)},{int(record.timed_out)},"
+                           f"{int(record.unverifiable)},{record.error or ''}\n")
@@ -0,0 +1,292 @@
+"""
+
+Long-lived MAVSDK connections shared by all of the drone functions.
+
+Every vehicle gets one mavsdk_server which is started on first use and kept running for the rest of the
+session. Module commands, telemetry and missions then borrow the same link instead of each spawning their
+own server and waiting for a fresh handshake with the drone.
+
+"""
+
+import asyncio
+import threading
+
+from mavsdk import System
+
+from TelemetryHub import TelemetryHub
+from TelemetryBuffer import TelemetryStore
+from ModuleChannel import ModuleChannel
+from CommandTracker import CommandTracker
+from LinkWatchdog import LinkWatchdog, CONNECTED
+from SimulatedDrone import SimulatedDrone
+
+
+# Default time (in seconds) to wait for a heartbeat from the drone before giving up.
+CONNECTION_TIMEOUT = 10.0
+
+
+"""
+Wait for the drone to report that it is connected.
+
+Resolves as soon as the first connected state arrives instead of sampling on a fixed interval. Returns False
+if no heartbeat is seen within the timeout.
+"""
+async def wait_connected(drone, timeout=CONNECTION_TIMEOUT):
+
+    async def heartbeat():
+        async for state in drone.core.connection_state():
+            if state.is_connected:
+                return True
+        return False
+
+    try:
+        return await asyncio.wait_for(heartbeat(), timeout)
+    except asyncio.TimeoutError:
+        return False
+
+
+"""
+Connection to a single vehicle.
+
+The first System created for the vehicle launches mavsdk_server and is kept alive so that the server (and
+the MAVLink link it owns) stays up. A gRPC channel is tied to the event loop it was created on, so any other
+loop that needs the vehicle gets its own lightweight System attached to the already running server.
+"""
+class VehicleLink:
+
+    def __init__(self, address, port):
+        self.address = address
+        self.port = port
+        self.server = None
+        self.systems = {}
+        self.pending = {}
+        # Shared connection checks per loop (see ConnectionManager.is_connected).
+        self.connected = {}
+        self.hubs = {}
+        self.channels = {}
+        self.store = TelemetryStore()
+        self.tracker = CommandTracker()
+        self.watchdog = None
+        # Hash of the last mission plan uploaded to the vehicle (see MissionUpload).
+        self.mission_hash = None
+
+
+"""
+Owns one VehicleLink per vehicle address and hands out connected System objects on request.
+
+Addresses are normally passed straight to mavsdk_server. An address whose scheme has a registered backend
+(e.g. "sim://" for the in-process SimulatedDrone) is instead created by that backend's factory, which is
+called with the address and must return an object providing the System API used by DroneFunctions.
+"""
+class ConnectionManager:
+
+    def __init__(self, base_port=50051, backends=None):
+        self.base_port = base_port
+        self.next_port = base_port
+        self.links = {}
+        self.backends = {"sim": lambda address: SimulatedDrone()}
+        if backends:
+            self.backends.update(backends)
+        self._lock = threading.Lock()
+
+    """
+    Register a vehicle backend for addresses of the form "<scheme>://...".
+    """
+    def register_backend(self, scheme, factory):
+        self.backends[scheme] = factory
+
+    def backend(self, address):
+        scheme = address.split("://", 1)[0] if "://" in address else None
+        return self.backends.get(scheme)
+
+    """
+    Get (or create) the link for a vehicle. Each vehicle is given its own mavsdk_server port.
+    """
+    def link(self, address):
+        with self._lock:
+            if address not in self.links:
+                self.links[address] = VehicleLink(address, self.next_port)
+                self.next_port += 1
+            return self.links[address]
+
+    """
+    Return a System for the vehicle that is usable on the running event loop, connecting if required.
+    """
+    async def get_drone(self, address):
+        loop = asyncio.get_running_loop()
+        link = self.link(address)
+
+        # Forget Systems belonging to loops that have since been closed.
+        for old_loop in [l for l in link.systems if l.is_closed()]:
+            del link.systems[old_loop]
+            link.hubs.pop(old_loop, None)
+            link.channels.pop(old_loop, None)
+            link.connected.pop(old_loop, None)
+
+        drone = link.systems.get(loop)
+        if drone is not None:
+            return drone
+
+        # Concurrent callers on the same loop share a single attach.
+        task = link.pending.get(loop)
+        if task is None:
+            task = loop.create_task(self._attach(link))
+            link.pending[loop] = task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task.done():
+                link.pending.pop(loop, None)
+
+    """
+    Attach a new System to the vehicle, launching mavsdk_server if this is the first one.
+    """
+    async def _attach(self, link):
+        factory = self.backend(link.address)
+        if factory is not None:
+            # In-process backends are not tied to an event loop, so every loop shares the one instance.
+            with self._lock:
+                if link.server is None:
+                    link.server = factory(link.address)
+                drone = link.server
+            await drone.connect(system_address=link.address)
+            link.systems[asyncio.get_running_loop()] = drone
+            return drone
+
+        with self._lock:
+            launch = link.server is None
+            if launch:
+                drone = System(port=link.port)
+                link.server = drone
+            else:
+                drone = System(mavsdk_server_address="localhost", port=link.port)
+
+        try:
+            if launch:
+                await drone.connect(system_address=link.address)
+            else:
+                await drone.connect()
+        except Exception:
+            if launch:
+                link.server = None
+            raise
+
+        link.systems[asyncio.get_running_loop()] = drone
+        return drone
+
+    """
+    Return the telemetry hub for the vehicle on the running event loop. All telemetry consumers should
+    subscribe through this rather than opening their own MAVSDK streams.
+    """
+    async def get_hub(self, address):
+        loop = asyncio.get_running_loop()
+        drone = await self.get_drone(address)
+        link = self.link(address)
+        hub = link.hubs.get(loop)
+        if hub is None or hub.drone is not drone:
+            hub = TelemetryHub(drone)
+            link.hubs[loop] = hub
+            link.store.attach(hub)
+        return hub
+
+    """
+    Return the module command channel for the vehicle on the running event loop. It keeps gimbal control for
+    the whole session.
+    """
+    async def get_channel(self, address):
+        loop = asyncio.get_running_loop()
+        drone = await self.get_drone(address)
+        link = self.link(address)
+        hub = await self.get_hub(address)
+        channel = link.channels.get(loop)
+        if channel is None or channel.drone is not drone:
+            channel = ModuleChannel(drone, link.tracker, hub)
+            link.channels[loop] = channel
+        return channel
+
+    """
+    Return the link health watchdog for the vehicle, starting it on the running event loop if needed.
+    """
+    async def get_watchdog(self, address):
+        loop = asyncio.get_running_loop()
+        hub = await self.get_hub(address)
+        channel = await self.get_channel(address)
+        link = self.link(address)
+        watchdog = link.watchdog
+        if watchdog is None or watchdog.loop is not loop or watchdog.hub is not hub:
+            if watchdog is not None:
+                # The old watchdog may be on another loop; one whose loop has closed has already stopped.
+                if watchdog.loop is loop:
+                    watchdog.stop()
+                elif not watchdog.loop.is_closed():
+                    watchdog.loop.call_soon_threadsafe(watchdog.stop)
+            watchdog = LinkWatchdog(hub.drone, hub, channel).start()
+            link.watchdog = watchdog
+        return watchdog
+
+    """
+    Whether the vehicle is connected, for commands that should not each open a connection state stream. The
+    link watchdog's state is used when there is one on the running loop. Otherwise every caller on the loop
+    shares a single wait for the first connected report, and its result is kept once it succeeds. Callers that
+    do not suspend anywhere else therefore resume in the order they called.
+    """
+    async def is_connected(self, address, timeout=CONNECTION_TIMEOUT):
+        loop = asyncio.get_running_loop()
+        link = self.link(address)
+        if link.watchdog is not None and link.watchdog.loop is loop:
+            return link.watchdog.state == CONNECTED
+
+        task = link.connected.get(loop)
+        if task is None:
+            drone = await self.get_drone(address)
+            task = link.connected.get(loop)
+            if task is None:
+                task = loop.create_task(wait_connected(drone, timeout))
+                link.connected[loop] = task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task.done() and (task.cancelled() or task.exception() is not None or not task.result()):
+                if link.connected.get(loop) is task:
+                    del link.connected[loop]
+
+    """
+    Return the module command tracker (acknowledgement latencies) of a vehicle.
+    """
+    def get_tracker(self, address):
+        return self.link(address).tracker
+
+    """
+    Return the telemetry history (ring buffer store) of a vehicle.
+    """
+    def get_store(self, address):
+        return self.link(address).store
+
+    """
+    Drop a vehicle's link. Releasing the last reference to the server System stops mavsdk_server.
+    """
+    def release(self, address):
+        with self._lock:
+            link = self.links.pop(address, None)
+        if link is not None:
+            link.store.detach()
+            if link.watchdog is not None and not link.watchdog.loop.is_closed():
+                link.watchdog.loop.call_soon_threadsafe(link.watchdog.stop)
+            link.watchdog = None
+            for hub in link.hubs.values():
+                hub.close()
+            link.hubs.clear()
+            for channel in link.channels.values():
+                if not channel.loop.is_closed():
+                    channel.loop.call_soon_threadsafe(channel.close)
+            link.channels.clear()
+            link.systems.clear()
+            link.connected.clear()
+            link.server = None
+
+    """
+    Drop every link (on application shutdown).
+    """
+    def close(self):
+        for address in list(self.links.keys()):
+            self.release(address)
@@ -1,10 +1,9 @@
 
 from functools import partial
-from time import sleep
 import os
-import asyncio
+import time
 
-from PyQt5.QtCore import QObject, QThread, pyqtSignal
+from PyQt5.QtCore import QObject, pyqtSignal
 from PyQt5.QtWidgets import QFileDialog
 
 """
@@ -13,7 +12,6 @@ Import functions from 'Model' classes.
 from Util import (
     saveMission,
     readMissions,
-    missionToPlot,
     checkAltitude,
     checkSpeed,
     formatInput,
@@ -25,16 +23,26 @@ All MAVSDK functions required by application to
 connect, communicate and control the MultiDrone
 """
 from DroneFunctions import (
-    run_indoor,
-    run_outdoor,
     get_battery,
     connect,
-    get_telemetry,
+    stream_telemetry,
     print_telemetry,
-    module_action
+    module_action,
+    connections,
+    address,
+    MISSION_SPEED
 )
-
-telemetry = [1.0, False, []]
+from Fleet import Fleet, MissionScheduler, RUNNING, DONE, FAILED
+from MissionStatus import MissionStatus
+from LinkWatchdog import CONNECTED, LOST, RECONNECTING
+from TaskRunner import TaskRunner, FAILSAFE, MODULE, MISSION, TELEMETRY
+from Mission import Mission
+from MissionHistory import MissionHistory
+from TrajectoryStreamer import DEFAULT_SPEED
+from MissionIO import import_mission, export_mission, DEFAULT_ALTITUDE
+from StructuredLog import get_logger
+
+log = get_logger(__name__)
 
 """
 Create a Controller class to connect the GUI and the model. 
@@ -44,18 +52,43 @@ Create a Controller class to connect the GUI and the model.
 class PlannerControl:
     """Planner's Controller."""
 
-    def __init__(self, view):
+    def __init__(self, view, drone_loop):
         """Controller initializer."""
-        self.outdoor_mission = []
-        self.indoor_mission = []
+        self.outdoor_mission = Mission(outdoor=True)
+        self.indoor_mission = Mission(outdoor=False)
+        # Undo/redo history and waypoint selection of each planner.
+        self.outdoor_history = MissionHistory(self.outdoor_mission)
+        self.indoor_history = MissionHistory(self.indoor_mission)
         self.relative_start_x = 0
         self.relative_start_y = 0
+        # Indoor flight speed (m/s) set in the GUI; None flies at the default speed.
+        self.speed = None
         self.missions = {}
         self._view = view
-        self.connecting = False
-        self.telemetry_thread = None
-        self.mission_thread = None
-        self.module_action = True
+        # Workers whose job is still queued or running, by task handle, with the slot to call when it ends.
+        # Holding them here keeps each one alive until it finishes, however many are started at once.
+        self.workers = {}
+        # Handle of the mission flown from the planner, while it runs.
+        self.mission_task = None
+        # Module commands submitted but not yet sent.
+        self.module_actions = 0
+        # Application wide asyncio loop that all drone I/O is submitted to.
+        self.drone_loop = drone_loop
+        # Long-lived drone links shared by every worker.
+        self.connections = connections
+        # Bounded, prioritised pool that every drone job started from the GUI runs in.
+        self.runner = TaskRunner()
+        self.runnerSignals = RunnerSignals()
+        self.runnerSignals.taskDone.connect(self._taskDone)
+        self.drone_loop.submit(self.runner.run())
+        # Vehicles this ground station can fly; the planner currently drives the first one.
+        self.fleet = Fleet(self.connections)
+        self.vehicle = self.fleet.add("MultiDrone", address)
+        # Hands queued missions out to idle vehicles.
+        self.scheduler = MissionScheduler(self.fleet)
+        self.schedulerSignals = SchedulerSignals()
+        self.scheduler.add_listener(self.schedulerSignals.relay)
+        self.drone_loop.submit(self.scheduler.run())
         # Connect signals and slots.
         self._connectSignals()
         # Load any saved missions.
@@ -64,50 +97,76 @@ class PlannerControl:
     """
     Make connection to drone and start retrieving telemetry data.
     
-    Moves work to a different thread to keep GUI responsive. 
+    Work is submitted to the drone event loop to keep GUI responsive. 
     """
     def _connectDrone(self):
-        if self.connecting:
+        key = ("telemetry", self.vehicle.address)
+        if self.runner.active(key):
             return
 
         self._view.setStatusText("Connecting...")
-        # Step 2: Create a QThread object
-        self.thread = QThread()
-        # Step 3: Create a worker object
-        self.worker = TelemetryWorker(self._view.outdoor)
-        # Step 4: Move worker to the thread
-        self.worker.moveToThread(self.thread)
-        # Step 5: Connect signals and slots
-        self.thread.started.connect(self.worker.run)
-        self.worker.finished.connect(self.thread.quit)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.thread.finished.connect(self.thread.deleteLater)
-        self.worker.progress.connect(self._view.setBatteryText)
-        self.worker.timeout.connect(self._connectionTimeout)
-        self.worker.location.connect(self._view.map.setStart)
-        # Step 6: Start the thread
-        self.thread.start()
-
-        # Final resets
-        self.connecting = True
-        self.thread.finished.connect(
-            lambda: self._connectionComplete()
-        )
-
-    def _connectionComplete(self):
-        self.connecting = False
+        self._startWorker(TelemetryWorker(self._view.outdoor, self.connections, self.vehicle.address),
+                          TELEMETRY, "Connection", key,
+                          progress=self._view.setBatteryText,
+                          timeout=self._connectionTimeout,
+                          location=self._view.map.setStart,
+                          link=self._linkState)
+        # Make the vehicle available to the mission scheduler
+        self.runner.submit(self.fleet.connect(self.vehicle.name), TELEMETRY, "Fleet connection",
+                           ("connect", self.vehicle.address))
+
+    def _linkState(self, state):
+        if state == LOST:
+            self._view.setStatusText("Link Lost")
+        elif state == RECONNECTING:
+            self._view.setStatusText("Reconnecting...")
+        elif state == CONNECTED:
+            self._view.setStatusText("Link Restored")
 
     def _connectionTimeout(self, timeout):
         if timeout:
             self._view.setStatusText("Connection Timeout")
 
+    """
+    Run a worker's run() coroutine in the task runner with its signals connected to the given slots.
+    `finished` is called once the job ends, whether it completed, failed or was cancelled.
+    """
+    def _startWorker(self, worker, priority, name, key=None, finished=None, **slots):
+        for signal, slot in slots.items():
+            getattr(worker, signal).connect(slot)
+        handle = self.runner.submit(worker.run(), priority, name, key, self.runnerSignals.relay)
+        if handle in self.workers:
+            # The same job is already queued or running.
+            worker.deleteLater()
+        else:
+            self.workers[handle] = (worker, finished)
+        return handle
+
+    """
+    Called on the GUI thread when a job from the task runner ends.
+    """
+    def _taskDone(self, handle):
+        worker, finished = self.workers.pop(handle, (None, None))
+        if finished is not None:
+            finished()
+        if worker is not None:
+            worker.deleteLater()
+        self._view.setTaskState(handle.name, handle.state)
+
     """
     Arm drone on command.
     """
     def _armDrone(self):
-        battery = getBatteryLevel()
-        battery_str = str(int(battery * 100))
-        self._view.setBatteryText(battery_str + "%")
+        self._startWorker(BatteryWorker(self.connections, self.vehicle.address), TELEMETRY, "Battery",
+                          ("battery", self.vehicle.address),
+                          progress=self._showBattery,
+                          timeout=self._connectionTimeout)
+
+    def _showBattery(self, battery):
+        if battery is None:
+            self._view.setStatusText("Battery Unavailable")
+            return
+        self._view.setBatteryText(battery, self.vehicle.in_air)
 
     """
     Add waypoint through manual input method (Terminal Planners).
@@ -153,8 +212,8 @@ class PlannerControl:
             self._view.errorDialog("Altitude value not valid. Make sure altitude is set between 1 & 20 metres.", None)
             return
 
-        self.outdoor_mission.append([float(latitude), float(longitude), float(altitude_fl)])
-        self._view.map.addMarker(latitude, longitude, altitude_fl)
+        self._insertWaypoint(self.outdoor_history, [float(latitude), float(longitude), float(altitude_fl)])
+        self._refreshMission(outdoor=True)
         wp_text = terminalString([float(latitude), float(longitude), float(altitude_fl)], self._view.outdoor)
         self._view.addDisplayText(wp_text)
 
@@ -184,85 +243,252 @@ class PlannerControl:
             relative_x = x - self.relative_start_x
             relative_y = y - self.relative_start_y
 
-        self.indoor_mission.append([float(relative_x), float(relative_y), altitude_fl, 0.0])
-        self._view.grid.chart.add_point(x, y)
+        self._insertWaypoint(self.indoor_history, [float(relative_x), float(relative_y), altitude_fl, 0.0])
+        self._refreshMission(outdoor=False)
         wp_text = terminalString([float(relative_x), float(relative_y), altitude_fl], self._view.outdoor)
         self._view.addDisplayText(wp_text)
 
     """
-    Remove last indoor waypoint from both mission array and grid planner UI.
+    Add a waypoint to a mission. With exactly one waypoint selected the new one goes in after it (and is 
+    selected instead), otherwise it goes on the end.
+    """
+    def _insertWaypoint(self, history, waypoint):
+        if len(history.selected) == 1:
+            index = next(iter(history.selected)) + 1
+            history.insert(waypoint, index)
+            history.select([index])
+        else:
+            history.insert(waypoint)
+
+    """
+    Remove the selected indoor waypoints, or the last one if none are selected.
     """
     def _removeIndoorWaypoint(self):
-        self.indoor_mission = self.indoor_mission[:-1]
-        self._view.grid.chart.remove_point()
+        if self.indoor_history.selected:
+            self.indoor_history.delete()
+        else:
+            self.indoor_history.pop()
+        self._refreshMission(outdoor=False)
+
+    """
+    Select or deselect the indoor waypoint nearest a click on the grid.
+    """
+    def _selectIndoorWaypoint(self, x, y):
+        index = self.indoor_history.nearest(x - self.relative_start_x, y - self.relative_start_y,
+                                            self._view.grid.chart.PICK_RADIUS)
+        if index is not None:
+            self.indoor_history.toggle(index)
+            self._refreshMission(outdoor=False)
+
+    """
+    Move the indoor waypoint dragged on the grid, along with the rest of the selection if it is selected.
+    """
+    def _moveIndoorWaypoints(self, x, y, dx, dy):
+        index = self.indoor_history.nearest(x - self.relative_start_x, y - self.relative_start_y,
+                                            self._view.grid.chart.PICK_RADIUS)
+        if index is None:
+            return
+        self.indoor_history.move(dx, dy, None if index in self.indoor_history.selected else [index])
+        self._refreshMission(outdoor=False)
 
     """
-    Clear all waypoints for current indoor/outdoor mission.
+    Select or deselect an outdoor waypoint (shift-clicked on the map).
+    """
+    def _selectWaypoint(self, index):
+        if 0 <= index < len(self.outdoor_mission):
+            self.outdoor_history.toggle(index)
+            self._refreshMission(outdoor=True)
+
+    """
+    Move an outdoor waypoint dragged on the map, along with the rest of the selection if it is selected.
+    """
+    def _moveWaypoint(self, index, latitude, longitude):
+        if not 0 <= index < len(self.outdoor_mission):
+            return
+        lat, lon = self.outdoor_mission.position[index]
+        selection = None if index in self.outdoor_history.selected else [index]
+        self.outdoor_history.move(latitude - lat, longitude - lon, selection)
+        self._refreshMission(outdoor=True)
+
+    def _history(self):
+        return self.outdoor_history if self._view.outdoor else self.indoor_history
+
+    def _undo(self):
+        if self._history().undo():
+            self._refreshMission(self._view.outdoor)
+
+    def _redo(self):
+        if self._history().redo():
+            self._refreshMission(self._view.outdoor)
+
+    def _deleteSelected(self):
+        if self._history().selected:
+            self._history().delete()
+            self._refreshMission(self._view.outdoor)
+
+    """
+    Import waypoints from a CSV, GeoJSON, KML or QGroundControl plan file onto the end of the current mission.
+    The whole file is read and validated before anything is added, and can be undone as a single edit.
+    """
+    def _importMission(self):
+        importDialog = QFileDialog.getOpenFileName(self._view, 'Import Waypoints', os.getcwd(),
+                                                   'Waypoint files (*.csv *.txt *.geojson *.json *.kml *.plan)')
+        if not importDialog[0]:
+            return
+
+        outdoor = self._view.outdoor
+        altitude = checkAltitude((self._view.altitudeInput if outdoor else self._view.altitudeInputGrid).text())
+        if altitude in (-1, 0):
+            altitude = DEFAULT_ALTITUDE
+        try:
+            imported, _ = import_mission(importDialog[0], outdoor, default_altitude=altitude)
+        except (OSError, ValueError) as e:
+            self._view.errorDialog(f"Could not import waypoints: {e}", None)
+            return
+
+        history = self._history()
+        if not outdoor and not len(self.indoor_mission):
+            self.relative_start_x = 0
+            self.relative_start_y = 0
+        history.extend(imported.records)
+        self._refreshMission(outdoor)
+        self._view.setStatusText(f"Imported {len(imported)} waypoints")
+
+    """
+    Export the current mission as a QGroundControl plan or MAVLink waypoint file, with the speeds it would fly at
+    here: outdoors, waypoints without a speed of their own fly at MISSION_SPEED; indoors, every leg is flown at
+    the planner's speed (see fly_indoor). Outdoor missions are homed at the drone's start position.
+    """
+    def _exportMission(self):
+        outdoor = self._view.outdoor
+        mission = self.outdoor_mission if outdoor else self.indoor_mission
+        if not len(mission):
+            self._view.errorDialog("There are no waypoints to export", None)
+            return
+
+        filters = 'MAVLink waypoints (*.waypoints *.txt)'
+        if outdoor:
+            filters = 'QGroundControl plan (*.plan);;' + filters
+        exportDialog = QFileDialog.getSaveFileName(self._view, 'Export Waypoints', os.getcwd(), filters)
+        if not exportDialog[0]:
+            return
+
+        path = exportDialog[0]
+        if not os.path.splitext(path)[1]:
+            path += ".plan" if exportDialog[1].startswith("QGroundControl") else ".waypoints"
+        home = self._view.map.drone_start if outdoor and self._view.map.drone_start else None
+        if not outdoor:
+            mission = mission.copy().set_speed(self.speed or DEFAULT_SPEED)
+        try:
+            export_mission(mission, path, home=home, default_speed=MISSION_SPEED if outdoor else None)
+        except (OSError, ValueError) as e:
+            self._view.errorDialog(f"Could not export waypoints: {e}", None)
+            return
+        self._view.setStatusText(f"Exported {len(mission)} waypoints to {os.path.basename(path)}")
+
+    """
+    Redraw a planner after its mission was edited.
+    """
+    def _refreshMission(self, outdoor):
+        if outdoor:
+            history = self.outdoor_history
+            if len(self.outdoor_mission):
+                self._view.map.showMission(self.outdoor_mission, history.selected)
+            else:
+                self._view.map.clearMap()
+        else:
+            history = self.indoor_history
+            if len(self.indoor_mission):
+                plot = self.indoor_mission.plot((self.relative_start_x, self.relative_start_y)).tolist()
+                self._view.grid.chart.set_plot(plot, sorted(history.selected))
+            else:
+                self._view.grid.chart.clear_plot()
+        if outdoor == self._view.outdoor:
+            self._view.setHistoryState(history.can_undo(), history.can_redo(), len(history.selected))
+
+    """
+    Clear all waypoints for current indoor/outdoor mission. Can be undone.
     """
     def _clearMission(self):
         """Clear current mission."""
         if self._view.outdoor:
-            self.outdoor_mission = []
+            self.outdoor_history.clear()
             self._view.map.clearMap()
         else:
-            self.indoor_mission = []
+            self.indoor_history.clear()
             self._view.grid.chart.clear_plot()
+        history = self._history()
+        self._view.setHistoryState(history.can_undo(), history.can_redo(), 0)
 
     """
     Runs the current mission.
     
-    Once again, all processing is moved to a different thread to 
+    Once again, all processing is moved to the drone event loop to 
     keep the GUI responsive.
     """
     def _runMission(self):
         """Run the mission using drone functions."""
         self._view.setStatusText("Arming...")
         if self._view.outdoor:
-            print(self.outdoor_mission)
-            # Step 2: Create a QThread object
-            self.mission_thread = QThread()
-            # Step 3: Create a worker object
-            self.worker = MissionWorker(self.outdoor_mission, self._view.outdoor)
-            # Step 4: Move worker to the thread
-            self.worker.moveToThread(self.mission_thread)
-            # Step 5: Connect signals and slots
-            self.mission_thread.started.connect(self.worker.run)
-            self.worker.finished.connect(self.mission_thread.quit)
-            self.worker.finished.connect(self.worker.deleteLater)
-            self.mission_thread.finished.connect(self.mission_thread.deleteLater)
-            self.worker.progress.connect(self._emptyMissionError)
-            self.worker.timeout.connect(self._connectionTimeout)
-            # Step 6: Start the thread
-            self.mission_thread.start()
-
-            # Final resets
-            self._view.buttons["Run Mission  "].setEnabled(False)
-            self.mission_thread.finished.connect(
-                lambda: self._view.buttons["Run Mission  "].setEnabled(True)
-            )
+            mission = self.outdoor_mission.copy()
         else:
-            print(self.indoor_mission)
-            # Step 2: Create a QThread object
-            self.mission_thread = QThread()
-            # Step 3: Create a worker object
-            self.worker = MissionWorker(self.indoor_mission, self._view.outdoor)
-            # Step 4: Move worker to the thread
-            self.worker.moveToThread(self.mission_thread)
-            # Step 5: Connect signals and slots
-            self.mission_thread.started.connect(self.worker.run)
-            self.worker.finished.connect(self.mission_thread.quit)
-            self.worker.finished.connect(self.worker.deleteLater)
-            self.mission_thread.finished.connect(self.mission_thread.deleteLater)
-            self.worker.progress.connect(self._emptyMissionError)
-            self.worker.timeout.connect(self._connectionTimeout)
-            # Step 6: Start the thread
-            self.mission_thread.start()
-
-            # Final resets
-            self._view.buttons["Run Mission  "].setEnabled(False)
-            self.mission_thread.finished.connect(
-                lambda: self._view.buttons["Run Mission  "].setEnabled(True)
-            )
+            mission = self.indoor_mission.copy()
+        log.debug("Running mission: %s", mission)
+        self.mission_task = self._startWorker(
+            MissionWorker(mission, self._view.outdoor, self.fleet, self.vehicle.name, self.speed),
+            MISSION, "Mission", ("mission", self.vehicle.name),
+            finished=self._missionComplete,
+            progress=self._emptyMissionError,
+            status=self._view.setMissionStatus,
+            timeout=self._connectionTimeout)
+
+        # Final resets
+        self._view.buttons["Run Mission  "].setEnabled(False)
+        self._view.buttons["Cancel Mission  "].setEnabled(True)
+
+    def _missionComplete(self):
+        self.mission_task = None
+        self._view.buttons["Run Mission  "].setEnabled(True)
+        self._view.buttons["Cancel Mission  "].setEnabled(False)
+
+    """
+    Cancel the running mission and bring the drone down: outdoors it returns to launch, indoors it lands.
+    """
+    def _cancelMission(self):
+        if self.mission_task is None or self.mission_task.done():
+            return
+        worker, _ = self.workers.get(self.mission_task, (None, None))
+        outdoor = worker.outdoor if worker is not None else self._view.outdoor
+        self._view.setStatusText("Aborting...")
+        self.mission_task.cancel("Cancelled from the planner")
+        self.runner.submit(self.fleet.abort_mission(self.vehicle.name, outdoor), FAILSAFE, "Failsafe",
+                           ("failsafe", self.vehicle.name))
+
+    """
+    Queue the selected saved mission for the next suitable idle vehicle in the fleet.
+    """
+    def _queueMission(self):
+        index = self._view.savedDropdown.currentIndex()
+        if index == 0:
+            self._view.errorDialog("Select a saved mission to queue.", None)
+            return
+        name = list(self.missions.keys())[index-1]
+        saved_mission = self.missions[name]
+        mission = saved_mission[2] if self._view.outdoor else saved_mission[1]
+        if not mission:
+            self._view.errorDialog("Mission is empty. Please add at least one waypoint.", None)
+            return
+
+        self.scheduler.submit(name, mission, self._view.outdoor, speed=self.speed)
+        self._view.setStatusText("Queued " + name)
+
+    def _jobChanged(self, name, state, vehicle):
+        if state == RUNNING:
+            self._view.setStatusText(name + " on " + vehicle)
+        elif state == DONE:
+            self._view.setStatusText(name + " complete")
+        elif state == FAILED:
+            self._view.setStatusText(name + " failed")
 
     """
     Handling running of an empty mission.
@@ -282,6 +508,8 @@ class PlannerControl:
         else:
             self._view.setOutdoorPlanner()
             self._view.outdoor = True
+        history = self._history()
+        self._view.setHistoryState(history.can_undo(), history.can_redo(), len(history.selected))
 
     """
     Set the altitude for upcoming waypoints.
@@ -316,6 +544,7 @@ class PlannerControl:
                                    None)
             return
 
+        self.speed = speed_fl
         self._view.changeAltitudeFocus()
 
     """
@@ -371,31 +600,34 @@ class PlannerControl:
     Start module worker to send module command to drone.
     """
     def _moduleAction(self, command):
+        submitted = time.monotonic()
         self._view.setStatusText("Sending...")
-        if self.module_action:
-            # Step 2: Create a QThread object
-            self.module_thread = QThread()
-            # Step 3: Create a worker object
-            self.worker = ModuleWorker(command)
-            # Step 4: Move worker to the thread
-            self.worker.moveToThread(self.module_thread)
-            # Step 5: Connect signals and slots
-            self.module_thread.started.connect(self.worker.run)
-            self.worker.finished.connect(self.module_thread.quit)
-            self.worker.finished.connect(self.worker.deleteLater)
-            self.module_thread.finished.connect(self.module_thread.deleteLater)
-            self.worker.timeout.connect(self._connectionTimeout)
-            # Step 6: Start the thread
-            self.module_thread.start()
-
-            # Final resets
-            self.module_action = False
-            self.module_thread.finished.connect(
-                lambda: self._moduleActionComplete()
-            )
+        # Every click is queued; the module channel orders and coalesces the commands.
+        self._startWorker(ModuleWorker(command, self.connections, self.vehicle.address, submitted),
+                          MODULE, "Module command",
+                          finished=self._moduleActionComplete,
+                          timeout=self._connectionTimeout)
+
+        self.module_actions += 1
 
     def _moduleActionComplete(self):
-        self.module_action = True
+        self.module_actions -= 1
+        if not self.module_actions:
+            self._view.setStatusText("Sent")
+        self._view.setLatencyText(self.connections.get_tracker(self.vehicle.address).summary())
+
+    """
+    Export module command latencies to a text file.
+    """
+    def _exportLatency(self):
+        exportDialog = QFileDialog.getSaveFileName(self._view, 'Export Module Command Latency',
+                                                   os.path.join(os.getcwd(), "module_latency.txt"),
+                                                   'Text files (*.txt)')
+        if exportDialog[0]:
+            try:
+                self.connections.get_tracker(self.vehicle.address).export(exportDialog[0])
+            except OSError as e:
+                self._view.errorDialog(f"Could not export latency: {e}", None)
 
     """
     Save current indoor and outdoor mission to file.
@@ -410,10 +642,10 @@ class PlannerControl:
                 return
 
         saveMission(mission_name, (self.relative_start_x, self.relative_start_y),
-                    self.indoor_mission, self.outdoor_mission)
+                    self.indoor_mission.to_list(), self.outdoor_mission.to_list())
         self._view.addSavedMission(mission_name)
         self.missions[mission_name] = [(self.relative_start_x, self.relative_start_y),
-                                       self.indoor_mission, self.outdoor_mission]
+                                       self.indoor_mission.copy(), self.outdoor_mission.copy()]
 
     """
     Load a mission from saved dropdown menu.
@@ -421,26 +653,29 @@ class PlannerControl:
     def _loadMission(self, index):
         if index == 0:
             return
-        print(index)
         key = list(self.missions.keys())[index-1]
         saved_mission = self.missions[key]
         self.relative_start_x = saved_mission[0][0]
         self.relative_start_y = saved_mission[0][1]
-        self.indoor_mission = saved_mission[1]
-        print(self.indoor_mission)
+        self.indoor_mission = saved_mission[1].copy()
+        self.indoor_history.reset(self.indoor_mission)
+        log.debug("Indoor mission: %s", self.indoor_mission)
         if self.indoor_mission:
-            indoor_plot = missionToPlot(self.indoor_mission, (self.relative_start_x, self.relative_start_y))
-            self._view.grid.chart.set_plot(indoor_plot)
-        self.outdoor_mission = saved_mission[2]
-        print(self.outdoor_mission)
+            self._refreshMission(outdoor=False)
+        self.outdoor_mission = saved_mission[2].copy()
+        self.outdoor_history.reset(self.outdoor_mission)
+        log.debug("Outdoor mission: %s", self.outdoor_mission)
         if self.outdoor_mission:
-            self._view.map.setMap(self.outdoor_mission)
+            self._refreshMission(outdoor=True)
 
     """
     Load all saved missions (on boot of application).
     """
     def _loadMissions(self):
-        self.missions = readMissions()
+        self.missions = {}
+        for name, (offset, indoor, outdoor) in readMissions().items():
+            self.missions[name] = [offset, Mission.from_list(indoor, outdoor=False),
+                                   Mission.from_list(outdoor, outdoor=True)]
         for name in self.missions.keys():
             self._view.addSavedMission(name)
 
@@ -454,6 +689,9 @@ class PlannerControl:
         self._view.buttons["  Clear Mission"].clicked.connect(partial(self._clearMission))
         self._view.buttons["  Save Mission"].clicked.connect(partial(self._saveMission))
         self._view.buttons["Run Mission  "].clicked.connect(partial(self._runMission))
+        self._view.buttons["Queue Mission  "].clicked.connect(partial(self._queueMission))
+        self._view.buttons["Cancel Mission  "].clicked.connect(partial(self._cancelMission))
+        self.schedulerSignals.jobChanged.connect(self._jobChanged)
 
         self._view.connectButton.clicked.connect(partial(self._connectDrone))
         self._view.dropdown.currentIndexChanged.connect(partial(self._changeMissionMode))
@@ -464,6 +702,19 @@ class PlannerControl:
         self._view.map.newWaypoint.connect(partial(self._newWaypoint))
         self._view.grid.chart.newWaypoint.connect(partial(self._newIndoorWaypoint))
         self._view.grid.chart.removeWaypoint.connect(partial(self._removeIndoorWaypoint))
+        self._view.grid.chart.selectWaypoint.connect(partial(self._selectIndoorWaypoint))
+        self._view.grid.chart.moveWaypoints.connect(partial(self._moveIndoorWaypoints))
+        self._view.map.selectWaypoint.connect(partial(self._selectWaypoint))
+        self._view.map.moveWaypoint.connect(partial(self._moveWaypoint))
+
+        self._view.undoButton.clicked.connect(partial(self._undo))
+        self._view.redoButton.clicked.connect(partial(self._redo))
+        self._view.deleteButton.clicked.connect(partial(self._deleteSelected))
+        self._view.importButton.clicked.connect(partial(self._importMission))
+        self._view.exportButton.clicked.connect(partial(self._exportMission))
+        self._view.undoShortcut.activated.connect(partial(self._undo))
+        self._view.redoShortcut.activated.connect(partial(self._redo))
+        self._view.deleteShortcut.activated.connect(partial(self._deleteSelected))
 
         self._view.altitudeInputButton.clicked.connect(partial(self._setAltitude))
         self._view.altitudeInputButtonGrid.clicked.connect(partial(self._setAltitude))
@@ -483,6 +734,7 @@ class PlannerControl:
         self._view.openButton.clicked.connect(partial(self._gripperOpen))
         self._view.closeButton.clicked.connect(partial(self._gripperClose))
         self._view.manualSeedButton.clicked.connect(partial(self._seederRotate))
+        self._view.latencyExportButton.clicked.connect(partial(self._exportLatency))
 
         """ 
         **********************************************************************************************************
@@ -497,140 +749,202 @@ class PlannerControl:
 """
 Worker Classes.
 
-Provides controller with access to drone_functions through threads 
-that run parallel to the main GUI thread.
+Provides controller with access to drone_functions. Each worker's run() coroutine is run by the controller's 
+TaskRunner on the shared drone event loop. With qasync that loop is the Qt event loop itself and signals are 
+delivered directly; otherwise it runs parallel to the main GUI thread and signals emitted from the loop thread 
+are queued back onto the GUI thread by Qt (see QtDroneLoop.py).
 """
 
 
 """
-Worker for threaded access to drone telemetry data.
+Worker for access to drone telemetry data.
+
+Subscribes to the drone's telemetry hub once and pushes throttled progress and location signals for the 
+whole session, until the connection is lost.
 """
 class TelemetryWorker(QObject):
     finished = pyqtSignal()
     progress = pyqtSignal(float, bool)
     timeout = pyqtSignal(bool)
     location = pyqtSignal(float, float)
+    link = pyqtSignal(str)
 
-    def __init__(self, outdoor):
+    # Rate (Hz) that battery/armed status is pushed to the GUI at.
+    PROGRESS_RATE = 0.5
+
+    def __init__(self, outdoor, manager, vehicle):
         super().__init__()
         self.outdoor = outdoor
+        self.manager = manager
+        self.vehicle = vehicle
+        self.in_air = False
+        self.location_sent = False
+
+    async def run(self):
+        callbacks = {
+            "battery": (self._battery, self.PROGRESS_RATE),
+            "in_air": (self._inAir, None),
+        }
+        if self.outdoor:
+            callbacks["position"] = (self._position, None)
 
-    def run(self, ):
-        sent = False
         try:
-            loop = asyncio.new_event_loop()
-            sleep(1)
-            while True:
-                connected = loop.run_until_complete(get_telemetry(telemetry, self.outdoor))
-                sleep(2)
-                if not connected:
-                    self.timeout.emit(True)
-                    self.finished.emit()
-                    break
-                if telemetry[2] and self.outdoor and not sent:
-                    # print(telemetry[2].longitude_deg)
-                    self.location.emit(telemetry[2].latitude_deg, telemetry[2].longitude_deg)
-                    sent = True
-                self.progress.emit(telemetry[0], telemetry[1])
-                sleep(5)
-
+            await stream_telemetry(callbacks, self.manager, vehicle=self.vehicle, link_state=self.link.emit)
+            # The drone never connected.
+            self.timeout.emit(True)
             self.finished.emit()
-
         except Exception as e:
             self.finished.emit()
-            print(e)
+            log.exception("Telemetry worker failed: %s", e)
+            return
+
+    def _battery(self, battery):
+        self.progress.emit(battery.remaining_percent, self.in_air)
+
+    def _inAir(self, in_air):
+        self.in_air = in_air
+
+    def _position(self, position):
+        """Only the first fix is needed to set the mission start location."""
+        if self.location_sent:
             return
+        self.location_sent = True
+        self.location.emit(position.latitude_deg, position.longitude_deg)
 
 
 """
-Worker for threaded access to drone mission running.
+Worker for access to drone mission running.
 """
 class MissionWorker(QObject):
 
-    def __init__(self, mission, outdoor):
+    def __init__(self, mission, outdoor, fleet, vehicle, speed=None):
         super().__init__()
         self.mission = mission
         self.outdoor = outdoor
+        self.fleet = fleet
+        self.vehicle = vehicle
+        self.speed = speed
 
     finished = pyqtSignal()
     progress = pyqtSignal(bool)
     timeout = pyqtSignal(bool)
+    status = pyqtSignal(MissionStatus)
 
-    def run(self):
+    async def run(self):
         if not self.mission:
             self.progress.emit(False)
             self.finished.emit()
             return
 
         try:
-            loop = asyncio.new_event_loop()
-            print("Loop resolved.")
-            if self.outdoor:
-                connected = loop.run_until_complete(run_outdoor(self.mission, telemetry, True))
-                if not connected:
-                    self.timeout.emit(True)
-                    self.finished.emit()
-            else:
-                connected = loop.run_until_complete(run_indoor(self.mission))
-                if not connected:
-                    self.finished.emit()
+            # Flown through the fleet so the scheduler sees the vehicle as busy.
+            result = await self.fleet.run_mission(self.vehicle, self.mission, self.outdoor, speed=self.speed,
+                                                  status=self.status.emit)
+            if self.outdoor and not result:
+                self.timeout.emit(True)
             self.finished.emit()
         except Exception as e:
             self.finished.emit()
-            print(e)
+            log.exception("Mission failed: %s", e)
             return e
 
 
 """
-Worker for threaded access to drone module action.
+Relays mission scheduler job updates from the drone loop to the GUI thread.
+"""
+class SchedulerSignals(QObject):
+    jobChanged = pyqtSignal(str, str, str)
+
+    def relay(self, job):
+        self.jobChanged.emit(job.name, job.state, job.vehicle or "")
+
+
+"""
+Relays task runner completions from the drone loop to the GUI thread.
+"""
+class RunnerSignals(QObject):
+    taskDone = pyqtSignal(object)
+
+    def relay(self, handle):
+        self.taskDone.emit(handle)
+
+
+"""
+Worker for access to drone module action.
 """
 class ModuleWorker(QObject):
 
-    def __init__(self, command):
+    def __init__(self, command, manager, vehicle, submitted=None):
         super().__init__()
         self.command = command
+        self.manager = manager
+        self.vehicle = vehicle
+        self.submitted = submitted
 
     finished = pyqtSignal()
     progress = pyqtSignal(bool)
     timeout = pyqtSignal(bool)
 
-    def run(self):
+    async def run(self):
         if not self.command:
             self.progress.emit(False)
             self.finished.emit()
             return
 
         try:
-            loop = asyncio.new_event_loop()
-            print("Loop resolved.")
-            connected = loop.run_until_complete(module_action(self.command))
+            connected = await module_action(self.command, self.manager, vehicle=self.vehicle,
+                                            submitted=self.submitted)
             if not connected:
                 self.timeout.emit(True)
-                self.finished.emit()
             self.finished.emit()
         except Exception as e:
             self.progress.emit(False)
             self.finished.emit()
-            print(e)
+            log.exception("Module action failed: %s", e)
             return
 
 
-"""Simple connect drone function."""
-def connectDrone():
+"""
+Worker that reads the drone's battery level once. progress carries the remaining fraction, or None if it could
+not be read.
+"""
+class BatteryWorker(QObject):
+
+    def __init__(self, manager, vehicle):
+        super().__init__()
+        self.manager = manager
+        self.vehicle = vehicle
+
+    finished = pyqtSignal()
+    progress = pyqtSignal(object)
+    timeout = pyqtSignal(bool)
+
+    async def run(self):
+        try:
+            battery = await get_battery(self.manager, vehicle=self.vehicle)
+        except Exception as e:
+            log.error("Could not read battery: %s", e)
+            battery = None
+
+        if battery is False:
+            self.timeout.emit(True)
+        else:
+            self.progress.emit(battery)
+        self.finished.emit()
+
+
+"""Simple connect drone function. Blocks, so only usable with the threaded drone loop."""
+def connectDrone(drone_loop):
     try:
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(connect())
+        return drone_loop.run(connect())
     except Exception as e:
-        print(e)
+        log.error("Connection failed: %s", e)
         return None
 
 
-"""Basic telemetry function."""
-def getBatteryLevel():
+"""Basic telemetry function. Blocks, so only usable with the threaded drone loop."""
+def getBatteryLevel(drone_loop):
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.ensure_future(get_battery())
-        loop.run_forever()
-        return 1.0
+        return drone_loop.run(get_battery())
     except Exception as e:
         return e
@@ -10,33 +10,60 @@ autonomously as well as retrieve useful drone telemetry data/mission progress in
 """
 
 import asyncio
+from functools import partial
 
-from mavsdk import System
-from mavsdk.telemetry import (PositionNed)
 from mavsdk.offboard import (OffboardError, PositionNedYaw)
 from mavsdk.mission import (MissionItem, MissionPlan)
-from mavsdk.gimbal import GimbalMode, ControlMode
+
+from ConnectionManager import ConnectionManager, wait_connected, CONNECTION_TIMEOUT
+from ArrivalDetector import ArrivalDetector, ACCEPTANCE_RADIUS, SETTLE_TIME
+from MissionUpload import upload_mission
+from MissionStatus import StatusReporter, UPLOADING, ARMING, FLYING, RETURNING, LANDING, LANDED, FAILED, ABORTED
+from Util import haversine
+from TrajectoryStreamer import Trajectory, stream_trajectory, DEFAULT_SPEED
+from Mission import as_mission
+from FlightRecorder import FlightRecorder, new_log_path
+from StructuredLog import get_logger
+
+log = get_logger(__name__)
 
 
 address = "udp://:14540"           # For SITL testing.
 # address = "serial://COM6:56000"  # Uncomment for use with real drone and USB telemetry module
+# address = "sim://"               # Uncomment to fly the in-process simulated drone (no SITL needed)
+
+# Shared, long-lived links to the drone(s). Every function below borrows its System from here.
+connections = ConnectionManager()
+
+# Rate (Hz) that the print_* functions report telemetry at.
+PRINT_RATE = 0.2
+
+# Speed (m/s) outdoor missions are flown at.
+MISSION_SPEED = 1.0
+
+# Write a binary telemetry log of every mission flown (see FlightRecorder).
+RECORD_FLIGHTS = True
+
+"""
+Address of the vehicle to talk to. Every drone function takes an optional vehicle address so that several
+drones can be flown at once (see Fleet.py); without one the module level address above is used.
+"""
+def vehicle_address(vehicle=None):
+    if vehicle is None:
+        return address
+    return vehicle
+
 
 """
 Connect to drone with given address.
 """
-async def connect():
+async def connect(manager=connections, timeout=CONNECTION_TIMEOUT, vehicle=None):
 
-    drone = System()
-    attempts = 0
-    await drone.connect(system_address=address)
-    print("Waiting for drone to connect...")
-    async for state in drone.core.connection_state():
-        await asyncio.sleep(5)
-        if state.is_connected:
-            print("Drone discovered!")
-            break
-        else:
-            return False
+    drone = await manager.get_drone(vehicle_address(vehicle))
+    log.info("Waiting for drone to connect...")
+    if not await wait_connected(drone, timeout):
+        return False
+    log.info("Drone discovered!")
         
     return True
 
@@ -46,166 +73,312 @@ Run an autonomous mission with optical flow based position sensing.
 
 @author Simas
 """
-async def run_indoor(mission):
+async def run_indoor(mission, manager=connections, timeout=CONNECTION_TIMEOUT, vehicle=None, speed=None,
+                     status=None):
 
-    drone = System()
-    attempts = 0
-    mission_point = mission
+    log.info("Mission Started")
+    drone = await manager.get_drone(vehicle_address(vehicle))
+    log.info("Waiting for drone to connect...")
+    if not await wait_connected(drone, timeout):
+        return False
+    log.info("Drone discovered!")
 
-    print("Mission Started")
-    await drone.connect(system_address=address)
-    print("Waiting for drone to connect...")
-    async for state in drone.core.connection_state():
-        await asyncio.sleep(5)
-        if state.is_connected:
-            print("Drone discovered!")
-            break
-        else:
-            return False
+    hub = await manager.get_hub(vehicle_address(vehicle))
+    recorder = await start_recording(manager, vehicle=vehicle)
+    reporter = StatusReporter(status)
+    try:
+        return await fly_indoor(drone, hub, mission, speed, reporter=reporter)
+    except asyncio.CancelledError:
+        reporter.phase(ABORTED)
+        raise
+    except Exception:
+        reporter.phase(FAILED)
+        raise
+    finally:
+        stop_recording(recorder)
 
-    print("-- Arming")
+
+"""
+Fly an indoor mission on a connected drone.
+"""
+async def fly_indoor(drone, hub, mission, speed=None, radius=ACCEPTANCE_RADIUS, settle_time=SETTLE_TIME,
+                     reporter=None):
+
+    mission_point = mission
+    if reporter is None:
+        reporter = StatusReporter()
+
+    reporter.phase(ARMING)
+    log.info("-- Arming")
     await drone.action.arm()
     async for is_armed in drone.telemetry.armed():
         if is_armed is True:
-            print("The drone is armed ")
+            log.info("The drone is armed")
             break
 
-    print("-- Setting initial setpoint")
+    log.info("-- Setting initial setpoint")
     await drone.offboard.set_position_ned(PositionNedYaw(0.0, 0.0, 0.0, 0.0))
 
-    print("-- Starting offboard")
+    log.info("-- Starting offboard")
     try:
         await drone.offboard.start()
     except OffboardError as error:
-        print(f"Starting offboard mode failed with error code: {error._result.result}")
-        print("-- Disarming")
+        log.error("Starting offboard mode failed with error code: %s", error._result.result)
+        log.info("-- Disarming")
         await drone.action.disarm()
-        return
-    for i in range(0, len(mission_point)):
-        print(f"-- Go {mission_point[i][0]}m North, {mission_point[i][1]}m East, {mission_point[i][2]}m Down within local coordinate system")
-        await drone.offboard.set_position_ned(PositionNedYaw(mission_point[i][0],mission_point[i][1],mission_point[i][2],mission_point[i][3]))
-        async for current_position in drone.telemetry.position_velocity_ned():
-            print("north: ", current_position.position.north_m)
-            print("east: ", current_position.position.east_m)
-            print("down: ", current_position.position.down_m)
-            if (current_position.position.north_m >= mission_point[i][0]) and (current_position.position.east_m >= mission_point[i][1]) and (current_position.position.down_m <= mission_point[i][2]):
-                print("Waypoint was reached")
-                break
-        print("Next waypoint")
-    print ("Flying back to starting position")
-    await drone.offboard.set_position_ned(PositionNedYaw(0.0, 0.0, 0.0, 0.0))
-    async for current_position in drone.telemetry.position_velocity_ned():
-        if ((current_position.position.north_m >= 0.0) and (
-                current_position.position.east_m >= 0.0) and (
-                current_position.position.down_m <= 0.0)):
-            print("Waypoint was reached")
-            break
+        reporter.phase(FAILED)
+        return None
+
+    # Fly from where the drone is, through every waypoint and back to the start, at the set speed.
+    current = (await hub.first("position_velocity_ned")).position
+    waypoints = [[current.north_m, current.east_m, current.down_m, 0.0]] + list(mission_point) + [[0.0, 0.0, 0.0, 0.0]]
+    trajectory = Trajectory(waypoints, speed or DEFAULT_SPEED)
+    reporter.phase(FLYING)
+    reporter.eta(trajectory.duration + settle_time)
+
+    def next_leg(leg):
+        reporter.progress(min(leg, len(mission_point)), len(mission_point))
+        if leg < len(mission_point):
+            log.info("-- Go %sm North, %sm East, %sm Down within local coordinate system", *mission_point[leg][:3])
+        else:
+            reporter.phase(RETURNING)
+            log.info("Flying back to starting position")
+
+    await stream_trajectory(drone, trajectory, on_leg=next_leg)
+    await wait_arrival(hub, ArrivalDetector((0.0, 0.0, 0.0), radius, settle_time))
+    log.info("Waypoint was reached")
+    reporter.phase(LANDING)
     await drone.action.land()
     await drone.action.disarm()
+    reporter.phase(LANDED)
 
     return True
 
 
+"""
+Wait until an arrival detector reports the vehicle has reached its target, checking every
+position_velocity_ned sample from the telemetry hub.
+"""
+async def wait_arrival(hub, detector):
+    loop = asyncio.get_running_loop()
+    async for sample in hub.samples("position_velocity_ned"):
+        if detector.update_sample(sample, loop.time()):
+            return
+
+
 """
 Run an autonomous mission with GPS based positioning.
 """
-async def run_outdoor(mission, telemetry, ret):
-    
-    drone = System()
-    attempts = 0
-    await drone.connect(system_address=address)  # CHANGE
-
-    # asyncio.ensure_future(print_battery(drone, telemetry))
-    # asyncio.ensure_future(print_in_air(drone, telemetry))
-    # asyncio.ensure_future(print_position(drone, telemetry))
-
-    print("Waiting for drone to connect...")
-    async for state in drone.core.connection_state():
-        await asyncio.sleep(5)
-        if state.is_connected:
-            print("Drone discovered!")
-            break
-        else:
-            return False
+async def run_outdoor(mission, ret, manager=connections, timeout=CONNECTION_TIMEOUT, vehicle=None, status=None):
 
-    print_mission_progress_task = asyncio.ensure_future(
-        print_mission_progress(drone))
+    drone = await manager.get_drone(vehicle_address(vehicle))
 
-    running_tasks = [print_mission_progress_task]
-    termination_task = asyncio.ensure_future(
-        observe_is_in_air(drone, running_tasks))
+    log.info("Waiting for drone to connect...")
+    if not await wait_connected(drone, timeout):
+        return False
+    log.info("Drone discovered!")
+
+    hub = await manager.get_hub(vehicle_address(vehicle))
+    recorder = await start_recording(manager, vehicle=vehicle)
+    reporter = StatusReporter(status)
+    try:
+        return await fly_outdoor(drone, hub, mission, ret, vehicle_address(vehicle),
+                                 manager.link(vehicle_address(vehicle)), reporter)
+    except asyncio.CancelledError:
+        reporter.phase(ABORTED)
+        raise
+    except Exception:
+        reporter.phase(FAILED)
+        raise
+    finally:
+        stop_recording(recorder)
+
+
+"""
+Fly an outdoor mission on a connected drone.
+"""
+async def fly_outdoor(drone, hub, mission, ret, system_address, link=None, reporter=None):
 
+    if reporter is None:
+        reporter = StatusReporter()
+
+    # Items are built straight from the mission's columns. Waypoints with a hold time loiter there instead of
+    # being flown through.
+    mission = as_mission(mission, outdoor=True)
     mission_items = []
-    for waypoint in mission:
-
-        if address == "udp://:14540":
-            mission_items.append(MissionItem(waypoint[0],
-                                             waypoint[1],
-                                             waypoint[2],
-                                             1,
-                                             True,
+    for (lat, lon), alt, speed, hold, yaw in zip(mission.position, mission.altitude,
+                                                 mission.speeds(MISSION_SPEED), mission.hold, mission.yaw):
+        fly_through = bool(hold <= 0)
+        loiter_time = float('nan') if fly_through else float(hold)
+
+        if system_address == "udp://:14540":
+            mission_items.append(MissionItem(float(lat),
+                                             float(lon),
+                                             float(alt),
+                                             float(speed),
+                                             fly_through,
                                              float('nan'),
                                              float('nan'),
                                              MissionItem.CameraAction.NONE,
+                                             loiter_time,
                                              float('nan'),
                                              float('nan'),
-                                             float('nan'),
-                                             float('nan')))
+                                             float(yaw)))
         else:
-            mission_items.append(MissionItem(waypoint[0],
-                                             waypoint[1],
-                                             waypoint[2],
-                                             1,
-                                             True,
+            mission_items.append(MissionItem(float(lat),
+                                             float(lon),
+                                             float(alt),
+                                             float(speed),
+                                             fly_through,
                                              float('nan'),
                                              float('nan'),
                                              MissionItem.CameraAction.NONE,
+                                             loiter_time,
                                              float('nan'),
                                              float('nan'),
-                                             float('nan'),
-                                             float('nan'),
+                                             float(yaw),
                                              float('nan')))
 
     mission_plan = MissionPlan(mission_items)
 
-    await drone.mission.set_return_to_launch_after_mission(ret)
+    print_mission_progress_task = asyncio.ensure_future(
+        print_mission_progress(hub, reporter, ret))
+    track_eta_task = asyncio.ensure_future(
+        track_eta(hub, reporter, mission, ret))
 
-    print("-- Uploading mission")
-    await drone.mission.upload_mission(mission_plan)
+    running_tasks = [print_mission_progress_task, track_eta_task]
+    termination_task = asyncio.ensure_future(
+        observe_is_in_air(hub, running_tasks))
+
+    # The progress tasks are stopped however the mission ends, including a cancel during upload or arming.
+    try:
+        await drone.mission.set_return_to_launch_after_mission(ret)
+
+        reporter.phase(UPLOADING)
+        await upload_mission(drone, mission_plan, link)
+
+        reporter.phase(ARMING)
+        log.info("-- Arming")
+        await drone.action.arm()
+        async for is_armed in drone.telemetry.armed():
+            if is_armed is True:
+                log.info("The drone is armed")
+                break
+
+        log.info("-- Starting mission")
+        await drone.mission.start_mission()
+        reporter.phase(FLYING)
+
+        await termination_task
+    finally:
+        for task in running_tasks + [termination_task]:
+            task.cancel()
+    reporter.phase(LANDED)
+
+    return True
 
-    print("-- Arming")
-    await drone.action.arm()
-    async for is_armed in drone.telemetry.armed():
-        if is_armed is True:
-            print("The drone is armed ")
-            break
 
-    print("-- Starting mission")
-    await drone.mission.start_mission()
+"""
+Failsafe for a mission that was cancelled part way through. Outdoor missions are paused and the drone returns
+to launch; indoor missions leave offboard mode and the drone lands where it is. Returns once the drone is on
+the ground.
+"""
+async def abort_mission(outdoor, manager=connections, timeout=CONNECTION_TIMEOUT, vehicle=None):
+    drone = await manager.get_drone(vehicle_address(vehicle))
+    if not await wait_connected(drone, timeout):
+        return False
 
-    await termination_task
+    hub = await manager.get_hub(vehicle_address(vehicle))
+    if not await get_in_air(hub):
+        # Cancelled before take off: make sure the uploaded mission is not started later.
+        log.info("-- Mission aborted on the ground")
+        if outdoor:
+            await drone.mission.pause_mission()
+        return True
 
+    if outdoor:
+        log.info("-- Mission aborted, returning to launch")
+        await drone.mission.pause_mission()
+        await drone.action.return_to_launch()
+    else:
+        log.info("-- Mission aborted, landing")
+        try:
+            await drone.offboard.stop()
+        except OffboardError as error:
+            log.warning("Stopping offboard mode failed with error code: %s", error._result.result)
+        await drone.action.land()
+
+    async for in_air in hub.samples("in_air"):
+        if not in_air:
+            log.info("-- Landed after abort")
+            break
     return True
 
+
+"""
+Start recording the drone's telemetry streams to a new binary flight log. Returns None when flight
+recording is turned off.
+"""
+async def start_recording(manager=connections, path=None, vehicle=None):
+    if not RECORD_FLIGHTS:
+        return None
+    hub = await manager.get_hub(vehicle_address(vehicle))
+    recorder = FlightRecorder(path or new_log_path(vehicle=vehicle_address(vehicle)))
+    recorder.attach(hub)
+    log.info("Recording flight to %s", recorder.path)
+    return recorder
+
+
+"""
+Stop a flight recording and write out everything still buffered.
+"""
+def stop_recording(recorder):
+    if recorder is not None:
+        recorder.close()
+
+
 """
 Get and print out mission progress.
 """
-async def print_mission_progress(drone):
-    async for mission_progress in drone.mission.mission_progress():
-        print(f"Mission progress: "
-              f"{mission_progress.current}/"
-              f"{mission_progress.total}")
+async def print_mission_progress(hub, reporter=None, ret=False):
+    async for mission_progress in hub.samples("mission_progress"):
+        log.info("Mission progress: %s/%s", mission_progress.current, mission_progress.total)
+        if reporter is not None:
+            reporter.progress(mission_progress.current, mission_progress.total)
+            if ret and mission_progress.total and mission_progress.current >= mission_progress.total:
+                reporter.phase(RETURNING)
+
+
+"""
+Estimate the time left on an outdoor mission from the drone's position: the distance to the current mission
+item, along the remaining legs and (when returning) back home, flown at the mission speed.
+"""
+async def track_eta(hub, reporter, mission, ret):
+    home = None
+    async for position in hub.samples("position"):
+        if home is None:
+            home = (position.latitude_deg, position.longitude_deg)
+        current = min(reporter.current, len(mission))
+        route = [(waypoint[0], waypoint[1]) for waypoint in mission[current:]]
+        if ret:
+            route.append(home)
+        distance = 0.0
+        here = (position.latitude_deg, position.longitude_deg)
+        for point in route:
+            distance += haversine(here[0], here[1], point[0], point[1])
+            here = point
+        reporter.eta(distance / MISSION_SPEED)
 
 
 """
 Helper function for missions.
 """
-async def observe_is_in_air(drone, running_tasks):
+async def observe_is_in_air(hub, running_tasks):
     """ Monitors whether the drone is flying or not and
     returns after landing """
     was_in_air = False
 
-    async for is_in_air in drone.telemetry.in_air():
+    async for is_in_air in hub.samples("in_air"):
         if is_in_air:
             was_in_air = is_in_air
 
@@ -216,169 +389,166 @@ async def observe_is_in_air(drone, running_tasks):
                     await task
                 except asyncio.CancelledError:
                     pass
-            await asyncio.get_event_loop().shutdown_asyncgens()
 
             return
 
 
 """
-Send a module action command to the drone.
+Send a module action command to the drone. `submitted` is the time.monotonic() time the command was issued,
+used to track its latency through to the vehicle's acknowledgement.
 """
-async def module_action(command):
-    # Init the drone
-    drone = System()
-    attempts = 0
-    await drone.connect(system_address=address)
-
-    print("Waiting for drone to connect...")
-    async for state in drone.core.connection_state():
-        await asyncio.sleep(5)
-        if state.is_connected:
-            print("Drone discovered!")
-            break
-        else:
-            return False
-
-    """Changing mode to MAVLink based control."""
-    await drone.gimbal.take_control(ControlMode.PRIMARY)
-
-    module = float(command[0])
-    action = float(command[1])
+async def module_action(command, manager=connections, timeout=CONNECTION_TIMEOUT, vehicle=None, submitted=None):
+    # Checked from the link's state rather than a new connection state stream, so that module jobs started in
+    # click order reach the channel in click order.
+    if not await manager.is_connected(vehicle_address(vehicle), timeout):
+        return False
 
     """
-    Using Gimbal protocol to send messages that can be forwarded on to module.
-    
-    Setting atitude to (module, action) e.g. 
-    
-    (0.0, 0.0) = Gripper/Close
-    (0.0, 1.0) = Gripper/Open
-    
-    (1.0, 1.0) = Seeder/Rotate
+    Queue the command on the vehicle's module channel, which takes gimbal control once per session and
+    sends commands in order (see ModuleChannel).
     """
-    await drone.gimbal.set_pitch_rate_and_yaw_rate(module, action)
+    channel = await manager.get_channel(vehicle_address(vehicle))
+    await channel.send(command, submitted)
 
     return True
 
 
 """
-Get drone telemetry data and store it in results array that is provided as a parameter.
+Get drone telemetry data and store the latest samples in the results dictionary that is provided as a 
+parameter. Samples come from the vehicle's shared telemetry hub, so no extra MAVSDK streams are opened.
 """
-async def get_telemetry(result, outdoor):
-    # Init the drone
-    drone = System()
-    attempts = 0
-    await drone.connect(system_address=address)
-    print("Waiting for drone to connect...")
-    async for state in drone.core.connection_state():
-        await asyncio.sleep(5)
-        if state.is_connected:
-            print("Drone discovered!")
-            break
-        else:
-            return False
-
+async def get_telemetry(result, outdoor, manager=connections, timeout=CONNECTION_TIMEOUT, vehicle=None):
+    # Borrow the shared link to the drone
+    drone = await manager.get_drone(vehicle_address(vehicle))
+    log.info("Waiting for drone to connect...")
+    if not await wait_connected(drone, timeout):
+        return False
+    log.info("Drone discovered!")
 
-    # Start the tasks
-    asyncio.ensure_future(print_battery(drone, result))
-    asyncio.ensure_future(print_in_air(drone, result))
+    # Subscribe to the shared streams
+    hub = await manager.get_hub(vehicle_address(vehicle))
+    streams = ["battery", "in_air"]
     if outdoor:
-        asyncio.ensure_future(print_position(drone, result))
-    return True
+        streams.append("position")
+    return [hub.subscribe(stream, partial(store_sample, result, stream)) for stream in streams]
+
+
+"""
+Stream drone telemetry for the whole session.
+
+callbacks maps a stream name to a (callback, rate_hz) pair. Each callback is subscribed once on the shared
+telemetry hub and is called from the drone event loop at no more than its rate. Returns False if the drone
+never connects. Otherwise it runs until cancelled, riding out link dropouts (see LinkWatchdog); link_state is
+called with each change of link state.
+"""
+async def stream_telemetry(callbacks, manager=connections, timeout=CONNECTION_TIMEOUT, vehicle=None,
+                           link_state=None):
+    drone = await manager.get_drone(vehicle_address(vehicle))
+    log.info("Waiting for drone to connect...")
+    if not await wait_connected(drone, timeout):
+        return False
+    log.info("Drone discovered!")
+
+    hub = await manager.get_hub(vehicle_address(vehicle))
+    subscriptions = [hub.subscribe(stream, callback, rate_hz) for stream, (callback, rate_hz) in callbacks.items()]
+    # The watchdog reconnects after a dropout, so the subscriptions are kept for the whole session.
+    watchdog = await manager.get_watchdog(vehicle_address(vehicle))
+    if link_state is not None:
+        watchdog.add_listener(link_state)
+    try:
+        await asyncio.get_running_loop().create_future()
+    finally:
+        if link_state is not None:
+            watchdog.remove_listener(link_state)
+        for subscription in subscriptions:
+            subscription.cancel()
+
+
+"""
+Telemetry hub callback that keeps the latest sample of a stream in a results dictionary.
+"""
+def store_sample(result, stream, sample):
+    result[stream] = sample
 
 
 """
 Battery telemetry.
 """
-async def get_battery(result):
-    
-    drone = System()
-    
-    await drone.connect(system_address=address)
-    async for state in drone.core.connection_state():
-        if state.is_connected:
-            print("Drone discovered!")
-            break
-    
-    async for battery in drone.telemetry.battery():
-        print(battery.remaining_percent)
-        result[0] = battery.remaining_percent
-        break
+async def get_battery(manager=connections, timeout=CONNECTION_TIMEOUT, vehicle=None):
+
+    drone = await manager.get_drone(vehicle_address(vehicle))
+    if not await wait_connected(drone, timeout):
+        return False
+    log.info("Drone discovered!")
+
+    hub = await manager.get_hub(vehicle_address(vehicle))
+    battery = await hub.first("battery")
+    log.info("Battery: %s", battery.remaining_percent)
+    return battery.remaining_percent
 
 
 """
 Get GPS information.
 """
-async def get_gps_info(drone):
-    async for gps_info in drone.telemetry.gps_info():
-        return gps_info
+async def get_gps_info(hub):
+    return await hub.first("gps_info")
 
 
 """
 Get the status of drone is in air.
 """
-async def get_in_air(drone):
-    async for in_air in drone.telemetry.in_air():
-        return in_air
+async def get_in_air(hub):
+    return await hub.first("in_air")
 
 
 """
 Get GPS latitude and longitude of the drone.
 """
-async def get_position(drone):
-    async for position in drone.telemetry.position():
-        return position
+async def get_position(hub):
+    return await hub.first("position")
 
 
 """
 Print out all telemetry data.
 """
-async def print_telemetry():
-    # Init the drone
-    drone = System()
-    await drone.connect(system_address=address)
+async def print_telemetry(manager=connections, vehicle=None):
+    # Borrow the shared telemetry hub of the drone
+    hub = await manager.get_hub(vehicle_address(vehicle))
 
     # Start the tasks
-    asyncio.ensure_future(print_battery(drone))
-    asyncio.ensure_future(print_gps_info(drone))
-    asyncio.ensure_future(print_in_air(drone))
-    asyncio.ensure_future(print_position(drone))
+    asyncio.ensure_future(print_battery(hub))
+    asyncio.ensure_future(print_gps_info(hub))
+    asyncio.ensure_future(print_in_air(hub))
+    asyncio.ensure_future(print_position(hub))
 
 
 """
 Print battery telemetry.
 """
-async def print_battery(drone, result):
-    async for battery in drone.telemetry.battery():
-        print(f"Battery: {battery.remaining_percent}")
-        result[0] = battery.remaining_percent
-        await asyncio.sleep(5)
-        # break
+async def print_battery(hub, rate_hz=PRINT_RATE):
+    async for battery in hub.samples("battery", rate_hz):
+        log.info("Battery: %s", battery.remaining_percent)
+
 
 """
 Print GPS telemetry.
 """
-async def print_gps_info(drone, result):
-    async for gps_info in drone.telemetry.gps_info():
-        print(f"GPS info: {gps_info}")
-        await asyncio.sleep(5)
-        # break
+async def print_gps_info(hub, rate_hz=PRINT_RATE):
+    async for gps_info in hub.samples("gps_info", rate_hz):
+        log.info("GPS info: %s", gps_info)
+
 
 """
 Print in air telemetry.
 """
-async def print_in_air(drone, result):
-    async for in_air in drone.telemetry.in_air():
-        print(f"In air: {in_air}")
-        result[1] = in_air
-        await asyncio.sleep(5)
-        # break
+async def print_in_air(hub, rate_hz=PRINT_RATE):
+    async for in_air in hub.samples("in_air", rate_hz):
+        log.info("In air: %s", in_air)
+
 
 """
 Print GPS position telemetry.
 """
-async def print_position(drone, result):
-    async for position in drone.telemetry.position():
-        print(position)
-        result[2] = position
-        await asyncio.sleep(5)
-        # break
+async def print_position(hub, rate_hz=PRINT_RATE):
+    async for position in hub.samples("position", rate_hz):
+        log.info("Position: %s", position)
@@ -0,0 +1,89 @@
+"""
+
+A single, long-lived asyncio event loop that runs all drone I/O for the application.
+
+The loop is started once on its own thread when the application boots. Controller code submits coroutines
+from DroneFunctions to it and gets a concurrent.futures.Future back, so no thread or event loop has to be
+created per action and every operation shares the same connections and telemetry streams.
+
+"""
+
+import asyncio
+import threading
+
+from StructuredLog import get_logger
+
+log = get_logger(__name__)
+
+
+"""
+Event loop service thread.
+"""
+class DroneLoop:
+
+    # Runs on its own thread rather than on the Qt event loop (see QtDroneLoop).
+    integrated = False
+
+    def __init__(self, name="DroneLoop"):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    """
+    Thread body. Runs the loop until stop() is called and then cleans up after it.
+    """
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+    """
+    Start the loop thread. Returns self so it can be chained on creation.
+    """
+    def start(self):
+        if not self.thread.is_alive():
+            self.thread.start()
+        return self
+
+    def is_running(self):
+        return self.thread.is_alive() and self.loop.is_running()
+
+    """
+    Schedule a coroutine on the loop from any thread. Returns a concurrent.futures.Future for its result.
+    """
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    """
+    Run a plain callable on the loop thread.
+    """
+    def call(self, callback, *args):
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    """
+    Submit a coroutine and block the calling thread until it completes.
+    """
+    def run(self, coro, timeout=None):
+        return self.submit(coro).result(timeout)
+
+    """
+    Cancel everything still running on the loop, then stop it and wait for the thread to exit.
+    """
+    def stop(self, timeout=5.0):
+        if not self.thread.is_alive():
+            return
+
+        async def cancel_all():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            self.submit(cancel_all()).result(timeout)
+        except Exception as e:
+            log.warning("Drone loop tasks did not cancel cleanly: %s", e)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
@@ -0,0 +1,393 @@
+"""
+
+Fleet registry for flying several drones at once.
+
+Each vehicle keeps its own connection, telemetry and mission state, while all of them are multiplexed as
+tasks on the one shared drone event loop (see DroneLoop.py). No thread is created per drone or per action,
+so a single ground station can run 20+ vehicles.
+
+"""
+
+import asyncio
+import threading
+
+from DroneFunctions import (
+    connections,
+    connect,
+    run_indoor,
+    run_outdoor,
+    module_action,
+    abort_mission,
+    CONNECTION_TIMEOUT
+)
+from Util import haversine
+from StructuredLog import get_logger
+
+log = get_logger(__name__)
+
+
+# Vehicle states.
+DISCONNECTED = "disconnected"
+IDLE = "idle"
+FLYING = "flying"
+RETURNING = "returning"
+LOST = "lost"
+
+
+"""
+State of one vehicle in the fleet.
+"""
+class Vehicle:
+
+    def __init__(self, name, address):
+        self.name = name
+        self.address = address
+        self.state = DISCONNECTED
+        self.mission = None
+        self.mission_task = None
+        self.aborting = False
+        self.battery = None
+        self.in_air = False
+        self.position = None
+        self.progress = None
+        self.status = None
+        self.subscriptions = []
+
+    def is_idle(self):
+        return self.state == IDLE
+
+    def __repr__(self):
+        return f"Vehicle({self.name}, {self.address}, {self.state})"
+
+
+"""
+Registry of all vehicles. Coroutines must be run on the drone loop; the synchronous methods are thread safe.
+"""
+class Fleet:
+
+    def __init__(self, manager=connections, timeout=CONNECTION_TIMEOUT):
+        self.manager = manager
+        self.timeout = timeout
+        self.vehicles = {}
+        self.listeners = []
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self.vehicles.values()))
+
+    def __len__(self):
+        return len(self.vehicles)
+
+    def get(self, name):
+        return self.vehicles[name]
+
+    """
+    Register a vehicle. Connection is made separately with connect()/connect_all().
+    """
+    def add(self, name, address):
+        with self._lock:
+            if name in self.vehicles:
+                raise ValueError(f"Vehicle {name} is already in the fleet")
+            vehicle = Vehicle(name, address)
+            self.vehicles[name] = vehicle
+        return vehicle
+
+    """
+    Remove a vehicle and drop its connection.
+    """
+    def remove(self, name):
+        with self._lock:
+            vehicle = self.vehicles.pop(name)
+        for subscription in vehicle.subscriptions:
+            subscription.cancel()
+        if vehicle.mission_task is not None:
+            vehicle.mission_task.cancel()
+        self.manager.release(vehicle.address)
+
+    def idle(self):
+        return [vehicle for vehicle in self if vehicle.is_idle()]
+
+    """
+    Register a callback(vehicle) that is called whenever a vehicle's state or telemetry changes.
+    Called from the drone loop thread.
+    """
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def _changed(self, vehicle):
+        for callback in list(self.listeners):
+            try:
+                callback(vehicle)
+            except Exception as e:
+                log.exception("Fleet listener failed: %s", e)
+
+    def _set_state(self, vehicle, state):
+        vehicle.state = state
+        self._changed(vehicle)
+
+    """
+    Connect a vehicle and start following its telemetry.
+    """
+    async def connect(self, name):
+        vehicle = self.get(name)
+        connected = await connect(self.manager, self.timeout, vehicle.address)
+        if not connected:
+            self._set_state(vehicle, LOST)
+            return False
+
+        if not vehicle.subscriptions:
+            hub = await self.manager.get_hub(vehicle.address)
+            vehicle.subscriptions = [
+                hub.subscribe("battery", lambda battery: self._telemetry(vehicle, "battery",
+                                                                          battery.remaining_percent)),
+                hub.subscribe("in_air", lambda in_air: self._telemetry(vehicle, "in_air", in_air)),
+                hub.subscribe("position", lambda position: self._telemetry(vehicle, "position", position)),
+                hub.subscribe("mission_progress", lambda progress: self._telemetry(
+                    vehicle, "progress", (progress.current, progress.total))),
+            ]
+        if vehicle.state in (DISCONNECTED, LOST):
+            self._set_state(vehicle, IDLE)
+        return True
+
+    def _telemetry(self, vehicle, field, value):
+        setattr(vehicle, field, value)
+        if field == "in_air" and not value and vehicle.state == RETURNING and not vehicle.aborting:
+            # A cancelled mission with no failsafe running is over once the vehicle is down.
+            vehicle.state = IDLE
+        self._changed(vehicle)
+
+    """
+    Connect every vehicle concurrently. Returns {name: connected}.
+    """
+    async def connect_all(self):
+        names = [vehicle.name for vehicle in self]
+        results = await asyncio.gather(*(self.connect(name) for name in names), return_exceptions=True)
+        return {name: result is True for name, result in zip(names, results)}
+
+    """
+    Fly a mission on one vehicle. Returns the drone function's result. `status` is called with MissionStatus
+    updates as the mission goes on.
+    """
+    async def run_mission(self, name, mission, outdoor, ret=True, speed=None, status=None):
+        vehicle = self.get(name)
+        if vehicle.state in (FLYING, RETURNING):
+            raise RuntimeError(f"Vehicle {name} is already flying a mission")
+
+        vehicle.mission = mission
+        vehicle.mission_task = asyncio.current_task()
+        self._set_state(vehicle, FLYING)
+
+        def report(mission_status):
+            vehicle.status = mission_status
+            self._changed(vehicle)
+            if status is not None:
+                status(mission_status)
+
+        try:
+            if outdoor:
+                result = await run_outdoor(mission, ret, self.manager, self.timeout, vehicle.address, report)
+            else:
+                result = await run_indoor(mission, self.manager, self.timeout, vehicle.address, speed, report)
+        except asyncio.CancelledError:
+            # Cancelled by the operator. The vehicle is brought down by the controller's failsafe and is not
+            # given another mission until it has landed (see abort_mission).
+            if vehicle.state == FLYING:
+                self._set_state(vehicle, RETURNING if vehicle.in_air else IDLE)
+            raise
+        except Exception:
+            self._set_state(vehicle, LOST)
+            raise
+        finally:
+            vehicle.mission_task = None
+
+        self._set_state(vehicle, IDLE if result is not False else LOST)
+        return result
+
+    """
+    Start a mission on a vehicle as a task on the running loop and return the task.
+    """
+    def start_mission(self, name, mission, outdoor, ret=True, speed=None, status=None):
+        return asyncio.ensure_future(self.run_mission(name, mission, outdoor, ret, speed, status))
+
+    """
+    Land (indoor) or return to launch (outdoor) a vehicle whose mission was cancelled. The vehicle stays
+    RETURNING, so the scheduler passes it over, until it is back on the ground.
+    """
+    async def abort_mission(self, name, outdoor):
+        vehicle = self.get(name)
+        vehicle.aborting = True
+        self._set_state(vehicle, RETURNING)
+        try:
+            result = await abort_mission(outdoor, self.manager, self.timeout, vehicle.address)
+        except Exception:
+            self._set_state(vehicle, LOST)
+            raise
+        finally:
+            vehicle.aborting = False
+
+        self._set_state(vehicle, IDLE if result is not False else LOST)
+        return result
+
+    async def module_action(self, name, command):
+        vehicle = self.get(name)
+        return await module_action(command, self.manager, self.timeout, vehicle.address)
+
+
+# Job states.
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Vehicles below this battery level are never given a mission.
+MIN_BATTERY = 0.3
+# Distance (m) that a fully drained battery is weighed as when picking a vehicle for a mission.
+BATTERY_WEIGHT = 500.0
+
+
+"""
+A queued mission.
+"""
+class MissionJob:
+
+    def __init__(self, name, mission, outdoor, ret=True, speed=None):
+        self.name = name
+        self.mission = mission
+        self.outdoor = outdoor
+        self.ret = ret
+        self.speed = speed
+        self.state = QUEUED
+        self.vehicle = None
+        self.result = None
+
+    def __repr__(self):
+        return f"MissionJob({self.name}, {self.state}, {self.vehicle})"
+
+
+"""
+Assigns queued missions to idle vehicles in the fleet.
+
+Jobs are handed out in the order they were queued. Each one goes to the idle vehicle with the lowest cost,
+where cost is the distance from the vehicle to the mission's first waypoint plus a penalty for a low
+battery. Every dispatched mission runs as its own task, so uploads to different vehicles happen
+concurrently.
+"""
+class MissionScheduler:
+
+    def __init__(self, fleet, min_battery=MIN_BATTERY, battery_weight=BATTERY_WEIGHT):
+        self.fleet = fleet
+        self.min_battery = min_battery
+        self.battery_weight = battery_weight
+        self.queue = []
+        self.jobs = []
+        self.listeners = []
+        self.loop = None
+        self.wakeup = None
+        self._lock = threading.Lock()
+        fleet.add_listener(lambda vehicle: self._wake())
+
+    """
+    Queue a mission. Safe to call from any thread.
+    """
+    def submit(self, name, mission, outdoor, ret=True, speed=None):
+        job = MissionJob(name, mission, outdoor, ret, speed)
+        with self._lock:
+            self.queue.append(job)
+            self.jobs.append(job)
+        self._wake()
+        return job
+
+    """
+    Register a callback(job) that is called on the drone loop whenever a job changes state.
+    """
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def _changed(self, job):
+        for callback in list(self.listeners):
+            try:
+                callback(job)
+            except Exception as e:
+                log.exception("Scheduler listener failed: %s", e)
+
+    def _wake(self):
+        if self.loop is None or self.wakeup is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self.wakeup.set()
+        else:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    """
+    Cost of flying a job on a vehicle, or None if the vehicle cannot take it.
+    """
+    def cost(self, vehicle, job):
+        if not vehicle.is_idle():
+            return None
+        if vehicle.battery is None:
+            # No battery sample yet, so it cannot be checked: the vehicle is passed over until one arrives (every
+            # telemetry update wakes the scheduler again).
+            return None
+        if vehicle.battery < self.min_battery:
+            return None
+
+        distance = 0.0
+        if job.outdoor and job.mission and vehicle.position is not None:
+            first = job.mission[0]
+            distance = haversine(vehicle.position.latitude_deg, vehicle.position.longitude_deg, first[0], first[1])
+        return distance + self.battery_weight * (1.0 - vehicle.battery)
+
+    """
+    Hand out as many queued jobs as there are suitable idle vehicles.
+    """
+    def dispatch(self):
+        started = []
+        free = self.fleet.idle()
+        with self._lock:
+            queue = list(self.queue)
+        for job in queue:
+            costs = [(self.cost(vehicle, job), vehicle) for vehicle in free]
+            costs = [(cost, vehicle) for cost, vehicle in costs if cost is not None]
+            if not costs:
+                continue
+            _, vehicle = min(costs, key=lambda entry: entry[0])
+            free.remove(vehicle)
+            with self._lock:
+                self.queue.remove(job)
+            started.append(asyncio.ensure_future(self._run(job, vehicle)))
+        return started
+
+    async def _run(self, job, vehicle):
+        job.vehicle = vehicle.name
+        job.state = RUNNING
+        self._changed(job)
+        try:
+            job.result = await self.fleet.run_mission(vehicle.name, job.mission, job.outdoor,
+                                                        job.ret, job.speed)
+            job.state = DONE if job.result is not False else FAILED
+        except asyncio.CancelledError:
+            job.state = FAILED
+            raise
+        except Exception as e:
+            log.exception("Mission %s failed on %s: %s", job.name, vehicle.name, e)
+            job.state = FAILED
+        finally:
+            self._changed(job)
+            self._wake()
+
+    """
+    Scheduler task. Runs on the drone loop until cancelled, dispatching whenever a job is queued or a
+    vehicle changes state.
+    """
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        while True:
+            self.wakeup.clear()
+            self.dispatch()
+            await self.wakeup.wait()
@@ -0,0 +1,242 @@
+"""
+
+Binary flight telemetry recorder with memory-mapped replay.
+
+A flight log is a single append-only file:
+
+    file header     b"MDFR", version, header length, then a JSON table of the recorded streams and their
+                    record layouts (padded to 8 bytes).
+    chunks          each chunk holds up to CHUNK_RECORDS samples of one stream, stored column by column:
+                    b"MDCK", stream index, record count, then one contiguous array per field (8 byte aligned).
+
+Samples are buffered per stream in a preallocated array and written out as a chunk once it fills up (or when
+the recorder is closed). Reading a log memory-maps the file and hands out numpy views straight into it, so
+scanning many flights never parses text or copies data it does not need.
+
+"""
+
+import json
+import os
+import re
+import struct
+import time
+
+import numpy as np
+
+from TelemetryBuffer import DTYPES, to_record
+
+
+FILE_MAGIC = b"MDFR"
+CHUNK_MAGIC = b"MDCK"
+VERSION = 2
+
+# magic, version, header length (bytes, including this struct and the padded stream table)
+FILE_HEADER = struct.Struct("<4sHxxI")
+# magic, stream index, record count, padded to 16 bytes so that the columns after it are 8 byte aligned
+CHUNK_HEADER = struct.Struct("<4sHxxIxxxx")
+
+# Samples per stream buffered before a chunk is written.
+CHUNK_RECORDS = 4096
+
+# Directory that flight logs are written to by default.
+FLIGHT_LOG_DIR = "flights"
+
+
+def _pad(size):
+    return (size + 7) & ~7
+
+
+"""
+Size in bytes of a chunk holding `count` records of `dtype`.
+"""
+def chunk_size(dtype, count):
+    return CHUNK_HEADER.size + sum(_pad(dtype[name].itemsize * count) for name in dtype.names)
+
+
+"""
+Default path for a new flight log, named after the current time and (optionally) the vehicle.
+"""
+def new_log_path(directory=FLIGHT_LOG_DIR, name=None, vehicle=None):
+    if name is None:
+        name = time.strftime("flight_%Y%m%d_%H%M%S")
+        if vehicle:
+            name += "_" + re.sub(r"\W+", "_", vehicle).strip("_")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name + ".mdf")
+    suffix = 1
+    while os.path.exists(path):
+        path = os.path.join(directory, f"{name}_{suffix}.mdf")
+        suffix += 1
+    return path
+
+
+"""
+Writes telemetry samples to a flight log.
+"""
+class FlightRecorder:
+
+    def __init__(self, path, streams=tuple(DTYPES), chunk_records=CHUNK_RECORDS):
+        self.path = path
+        self.streams = list(streams)
+        self.chunk_records = chunk_records
+        self.pending = {stream: np.zeros(chunk_records, dtype=DTYPES[stream]) for stream in self.streams}
+        self.counts = {stream: 0 for stream in self.streams}
+        self.subscriptions = []
+
+        self.file = open(path, "wb")
+        table = json.dumps({"streams": [[stream, DTYPES[stream].descr] for stream in self.streams]}).encode()
+        header_length = _pad(FILE_HEADER.size + len(table))
+        self.file.write(FILE_HEADER.pack(FILE_MAGIC, VERSION, header_length))
+        self.file.write(table.ljust(header_length - FILE_HEADER.size, b" "))
+
+    """
+    Record every stream from a vehicle's telemetry hub.
+    """
+    def attach(self, hub):
+        self.detach()
+        for stream in self.streams:
+            self.subscriptions.append(hub.subscribe(stream, lambda sample, s=stream: self.append(s, sample)))
+
+    def detach(self):
+        for subscription in self.subscriptions:
+            subscription.cancel()
+        self.subscriptions = []
+
+    """
+    Buffer a MAVSDK sample, writing the stream's chunk out once it is full.
+    """
+    def append(self, stream, sample, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        self.append_record(stream, to_record(stream, sample, timestamp))
+
+    def append_record(self, stream, record):
+        if self.file is None:
+            return
+        count = self.counts[stream]
+        self.pending[stream][count] = record
+        self.counts[stream] = count + 1
+        if count + 1 == self.chunk_records:
+            self._write_chunk(stream)
+
+    """
+    Write out all partially filled chunks.
+    """
+    def flush(self):
+        for stream in self.streams:
+            if self.counts[stream]:
+                self._write_chunk(stream)
+        self.file.flush()
+
+    def close(self):
+        if self.file is None:
+            return
+        self.detach()
+        self.flush()
+        self.file.close()
+        self.file = None
+
+    def _write_chunk(self, stream):
+        count = self.counts[stream]
+        records = self.pending[stream][:count]
+        self.file.write(CHUNK_HEADER.pack(CHUNK_MAGIC, self.streams.index(stream), count))
+        for name in records.dtype.names:
+            column = np.ascontiguousarray(records[name]).tobytes()
+            self.file.write(column.ljust(_pad(len(column)), b"\0"))
+        self.counts[stream] = 0
+
+
+"""
+Read-only, memory-mapped view of a flight log.
+"""
+class FlightLog:
+
+    def __init__(self, path):
+        self.path = path
+        self.map = np.memmap(path, dtype=np.uint8, mode="r")
+
+        magic, version, header_length = FILE_HEADER.unpack_from(self.map, 0)
+        if magic != FILE_MAGIC:
+            raise ValueError(f"{path} is not a flight log")
+        if version != VERSION:
+            raise ValueError(f"Unsupported flight log version {version} in {path}")
+
+        table = json.loads(bytes(self.map[FILE_HEADER.size:header_length]).decode())
+        self.streams = [stream for stream, _ in table["streams"]]
+        self.dtypes = {stream: np.dtype([tuple(field) for field in descr]) for stream, descr in table["streams"]}
+        self.chunks = {stream: [] for stream in self.streams}
+        self._index(header_length)
+
+    """
+    Walk the chunk headers once, recording where each chunk's columns live. A truncated final chunk (from a
+    recorder that never closed) is ignored.
+    """
+    def _index(self, offset):
+        end = len(self.map)
+        while offset + CHUNK_HEADER.size <= end:
+            magic, index, count = CHUNK_HEADER.unpack_from(self.map, offset)
+            if magic != CHUNK_MAGIC or index >= len(self.streams):
+                break
+            stream = self.streams[index]
+            dtype = self.dtypes[stream]
+            size = chunk_size(dtype, count)
+            if offset + size > end:
+                break
+
+            columns = {}
+            position = offset + CHUNK_HEADER.size
+            for name in dtype.names:
+                field = dtype[name]
+                columns[name] = np.ndarray((count,), dtype=field, buffer=self.map, offset=position)
+                position += _pad(field.itemsize * count)
+            self.chunks[stream].append(columns)
+            offset += size
+
+    def count(self, stream):
+        return sum(len(chunk["timestamp"]) for chunk in self.chunks.get(stream, []))
+
+    """
+    One field of a stream as a single array. Zero-copy when the stream fits in one chunk.
+    """
+    def column(self, stream, field):
+        parts = [chunk[field] for chunk in self.chunks.get(stream, [])]
+        if not parts:
+            return np.zeros(0, dtype=self.dtypes[stream][field])
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts)
+
+    """
+    A stream as a structured array with the same layout as the telemetry ring buffers.
+    """
+    def records(self, stream):
+        dtype = self.dtypes[stream]
+        table = np.zeros(self.count(stream), dtype=dtype)
+        for name in dtype.names:
+            table[name] = self.column(stream, name)
+        return table
+
+    """
+    Records of every stream merged in time order, as (timestamp, stream, record) tuples. Used to play a
+    flight back through the same code that consumes live telemetry.
+    """
+    def replay(self, streams=None):
+        streams = list(self.streams if streams is None else streams)
+        tables = [self.records(stream) for stream in streams]
+        if not tables:
+            return
+        times = np.concatenate([table["timestamp"] for table in tables])
+        which = np.concatenate([np.full(len(table), k) for k, table in enumerate(tables)])
+        rows = np.concatenate([np.arange(len(table)) for table in tables])
+        for i in np.argsort(times, kind="stable"):
+            yield float(times[i]), streams[which[i]], tables[which[i]][rows[i]]
+
+
+"""
+Open every flight log in a directory, oldest first.
+"""
+def open_flights(directory=FLIGHT_LOG_DIR):
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory) if name.endswith(".mdf"))
+    return [FlightLog(os.path.join(directory, name)) for name in names]
@@ -17,11 +17,12 @@ from PyQt5.QtWidgets import QComboBox
 from PyQt5.QtWidgets import QLabel
 from PyQt5.QtWidgets import QTabWidget
 from PyQt5.QtWidgets import QStackedWidget
+from PyQt5.QtWidgets import QProgressBar
+from PyQt5.QtWidgets import QShortcut
 from PyQt5.QtGui import QIcon
+from PyQt5.QtGui import QKeySequence
 from PyQt5.QtGui import QFont
 
-telemetry = [-1.0, False, []]
-
 
 """
 View Class
@@ -110,6 +111,17 @@ class PlannerView(QMainWindow):
         self.armedStatus.setText("Disconnected")
         self.armedStatus.setStyleSheet("color:#DFD9E8;")
         self.topBar.addWidget(self.armedStatus)
+        self.topBar.addSpacerItem(QSpacerItem(30, 10))
+
+        self.missionProgress = QProgressBar()
+        self.missionProgress.setMaximumWidth(120)
+        self.missionProgress.setFormat("%v/%m")
+        self.missionProgress.hide()
+        self.topBar.addWidget(self.missionProgress)
+
+        self.missionStatus = QLabel()
+        self.missionStatus.setStyleSheet("color:#DFD9E8;")
+        self.topBar.addWidget(self.missionStatus)
         self.topBar.addSpacerItem(QSpacerItem(75, 5))
 
         self.generalLayout.addLayout(self.topBar)
@@ -161,7 +173,8 @@ class PlannerView(QMainWindow):
         buttonsLayout = QHBoxLayout()
         # Button text.
         buttons = [
-            " Add Waypoint", "  Clear Mission", "  Save Mission", "Run Mission  "
+            " Add Waypoint", "  Clear Mission", "  Save Mission", "Queue Mission  ", "Run Mission  ",
+            "Cancel Mission  "
         ]
         # Create the buttons and add them to the layout.
         for btnText in buttons:
@@ -177,16 +190,43 @@ class PlannerView(QMainWindow):
             if btnText == "  Clear Mission":
                 self.buttons[btnText].setIcon(QIcon("images/clear.png"))
 
+            if btnText == "Queue Mission  ":
+                self.buttons[btnText].setIcon(QIcon("images/run.png"))
+                self.buttons[btnText].setLayoutDirection(Qt.RightToLeft)
+
             if btnText == "Run Mission  ":
                 self.buttons[btnText].setStyleSheet("background-color:#3186CC;")
                 self.buttons[btnText].setIcon(QIcon("images/run.png"))
                 self.buttons[btnText].setLayoutDirection(Qt.RightToLeft)
 
+            if btnText == "Cancel Mission  ":
+                self.buttons[btnText].setIcon(QIcon("images/remove.png"))
+                self.buttons[btnText].setLayoutDirection(Qt.RightToLeft)
+
             buttonsLayout.addWidget(self.buttons[btnText])
 
         self.buttons[" Add Waypoint"].hide()
+        self.buttons["Cancel Mission  "].setEnabled(False)
+
+        """Create the waypoint edit buttons (also bound to the usual undo/redo/delete keys)."""
+        editLayout = QHBoxLayout()
+        self.undoButton = QPushButton("Undo")
+        self.redoButton = QPushButton("Redo")
+        self.deleteButton = QPushButton("Delete Selected")
+        for button in (self.undoButton, self.redoButton, self.deleteButton):
+            button.setEnabled(False)
+            editLayout.addWidget(button)
+        editLayout.addStretch()
+        self.importButton = QPushButton("Import Waypoints")
+        editLayout.addWidget(self.importButton)
+        self.exportButton = QPushButton("Export Waypoints")
+        editLayout.addWidget(self.exportButton)
+        self.undoShortcut = QShortcut(QKeySequence.Undo, self)
+        self.redoShortcut = QShortcut(QKeySequence.Redo, self)
+        self.deleteShortcut = QShortcut(QKeySequence.Delete, self)
 
         # Add buttonsLayout to the general layout.
+        self.missionLayout.addLayout(editLayout)
         self.missionLayout.addLayout(buttonsLayout)
         self.mainLayout.addLayout(self.missionLayout)
         self.mainLayout.addSpacerItem(QSpacerItem(10, 100))
@@ -412,6 +452,22 @@ class PlannerView(QMainWindow):
         self.moduleTabs.setMaximumWidth(275)
 
         self.moduleLayout.addWidget(self.moduleTabs)
+
+        """Module command acknowledgement latency."""
+        self.latencyTitle = QLabel()
+        self.latencyTitle.setText("Command Latency")
+        self.latencyTitle.setFont(self.subheading)
+        self.moduleLayout.addWidget(self.latencyTitle)
+        self.latencyText = QLabel()
+        self.latencyText.setText("No acknowledged commands")
+        self.latencyText.setStyleSheet("color:#DFD9E8;")
+        self.latencyText.setWordWrap(True)
+        self.latencyText.setMaximumWidth(275)
+        self.moduleLayout.addWidget(self.latencyText)
+        self.latencyExportButton = QPushButton("Export Latency")
+        self.latencyExportButton.setMaximumWidth(275)
+        self.moduleLayout.addWidget(self.latencyExportButton)
+
         self.controlsLayout.addLayout(self.moduleLayout)
 
     """Specific controls for seeder module."""
@@ -558,6 +614,34 @@ class PlannerView(QMainWindow):
         """Set drone status information text."""
         self.armedStatus.setText(text)
 
+    def setMissionStatus(self, status):
+        """Show mission phase, waypoint progress and ETA."""
+        if status.total:
+            self.missionProgress.setMaximum(status.total)
+            self.missionProgress.setValue(min(status.current, status.total))
+            self.missionProgress.show()
+        text = status.phase
+        if status.eta is not None:
+            minutes, seconds = divmod(int(round(status.eta)), 60)
+            text += f"   ETA {minutes}:{seconds:02d}"
+        self.missionStatus.setText(text)
+
+    def setTaskState(self, name, state):
+        """Report a drone task that was cancelled or failed."""
+        if state in ("cancelled", "failed"):
+            self.setStatusText(name + " " + state)
+
+    def setHistoryState(self, can_undo, can_redo, selected):
+        """Enable the waypoint edit buttons that apply."""
+        self.undoButton.setEnabled(can_undo)
+        self.redoButton.setEnabled(can_redo)
+        self.deleteButton.setEnabled(selected > 0)
+        self.deleteButton.setText(f"Delete Selected ({selected})" if selected else "Delete Selected")
+
+    def setLatencyText(self, text):
+        """Show module command latency summary."""
+        self.latencyText.setText(text)
+
     def setDimensions(self, dimensions):
         """Set dimension information regarding blueprints and grid."""
         width = round(dimensions[0], 1)
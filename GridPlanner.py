@@ -15,6 +15,11 @@ class Grid(FigureCanvas):
 
     newWaypoint = pyqtSignal(float, float, name="newWaypoint")
     removeWaypoint = pyqtSignal(name="removeWaypoint")
+    selectWaypoint = pyqtSignal(float, float, name="selectWaypoint")
+    moveWaypoints = pyqtSignal(float, float, float, float, name="moveWaypoints")
+
+    # Distance (grid units) from a waypoint that a click picks it up at.
+    PICK_RADIUS = 0.6
 
     def __init__(self, parent):
 
@@ -58,6 +63,9 @@ class Grid(FigureCanvas):
                                mec="#3186cc", mfc=(0.45490196, 0.58039216, 0.91764706, 0.5))
         self.p, = self.ax.plot([], [], lw=0, marker='.', c='r', alpha=0.25, )
         self.p_round, = self.ax.plot([], [], lw=0, marker='o', c='r', markersize=1)
+        self.s, = self.ax.plot([], [], lw=0, marker='o', markersize=9, mew=1.2, mec='r', mfc='none')
+        # Position a waypoint drag started from, while one is in progress.
+        self.drag = None
 
         # Get a dict to store the values you need to change during runtime.
         self.rectdict = dict(
@@ -68,6 +76,7 @@ class Grid(FigureCanvas):
 
         # connect the callbacks to the figure
         self.f.canvas.mpl_connect('button_press_event', self.on_click)
+        self.f.canvas.mpl_connect('button_release_event', self.on_release)
         # self.f.canvas.mpl_connect('motion_notify_event', self.on_move)
 
     """
@@ -77,14 +86,22 @@ class Grid(FigureCanvas):
         if event.inaxes != self.ax:
             return
 
+        # Select a waypoint.
+        if event.button == 1 and event.key == 'shift':  # (shift + left-click)
+            self.selectWaypoint.emit(float(event.xdata), float(event.ydata))
+
+        # Start dragging a waypoint.
+        elif event.button == 1 and self.near_point(event.xdata, event.ydata):
+            self.drag = (float(event.xdata), float(event.ydata))
+
         # Add a waypoint.
-        if event.button == 1:  # (left-click)
+        elif event.button == 1:  # (left-click)
             if self.rectdict['round_to_int']:
                 self.newWaypoint.emit(float(round(event.xdata)), float(round(event.ydata)))
             else:
                 self.newWaypoint.emit(float(event.xdata), float(event.ydata))
 
-        # Remove last waypoint.
+        # Remove selected (or last) waypoint.
         elif event.button == 3:  # (right-click)
             if len(self.rectdict['points']) >= 1:
                 self.removeWaypoint.emit()
@@ -107,6 +124,30 @@ class Grid(FigureCanvas):
         else:
             self.l.set_visible(False)
 
+    """
+    On release listener. Finishes a waypoint drag, moving the waypoint (and any others selected with it).
+    """
+    def on_release(self, event):
+        if self.drag is None:
+            return
+        start, self.drag = self.drag, None
+        if event.inaxes != self.ax:
+            return
+
+        dx = event.xdata - start[0]
+        dy = event.ydata - start[1]
+        if self.rectdict['round_to_int']:
+            dx = round(dx)
+            dy = round(dy)
+        if dx or dy:
+            self.moveWaypoints.emit(start[0], start[1], float(dx), float(dy))
+
+    """
+    Whether there is a waypoint within PICK_RADIUS of a point.
+    """
+    def near_point(self, x, y):
+        return any((px - x) ** 2 + (py - y) ** 2 <= self.PICK_RADIUS ** 2 for px, py in self.rectdict['points'])
+
     """
     On move listener. Not currently used due to poor responsiveness.
     """
@@ -122,12 +163,13 @@ class Grid(FigureCanvas):
         plt.draw()
 
     """
-    Load a saved mission onto the map.
+    Draw a mission's waypoints, circling the selected ones.
     """
-    def set_plot(self, plot):
+    def set_plot(self, plot, selected=()):
         self.rectdict['points'] = plot
-        self.l.set_visible(True)
-        self.l.set_data(list(zip(*self.rectdict['points'])))
+        self.l.set_visible(bool(plot))
+        self.l.set_data(list(zip(*self.rectdict['points'])) or ([], []))
+        self.s.set_data(list(zip(*[plot[i] for i in selected])) or ([], []))
         plt.draw()
 
     """
@@ -148,6 +190,7 @@ class Grid(FigureCanvas):
     def clear_plot(self):
         self.rectdict['points'] = []
         self.l.set_visible(False)
+        self.s.set_data([], [])
         plt.draw()
 
     """
@@ -0,0 +1,278 @@
+"""
+
+Link health watchdog.
+
+Timestamps every heartbeat and every telemetry sample received from a vehicle, and keeps inter-arrival statistics
+for each: mean interval, jitter and the number and length of gaps. MAVSDK does not pass heartbeats on as such, so
+the telemetry health stream, which it updates for every status message the vehicle sends, stands in for them. The
+connection state stream only reports changes, so it is used for link up/down and never timed. If MAVSDK reports the
+vehicle disconnected, or nothing at all arrives for STALE_TIMEOUT seconds, the link is declared lost straight away.
+That is well before the flight controller's own data link loss failsafe, so listeners can act on it first. The
+watchdog then waits for the link with exponential backoff.
+
+Reconnecting never tears anything down: telemetry subscribers stay registered with the hub, any telemetry stream
+that ended during the dropout is reopened, and module channels take gimbal control again on their next command.
+
+"""
+
+import asyncio
+import math
+import time
+
+from StructuredLog import get_logger, fields
+
+log = get_logger(__name__)
+
+
+# Link states.
+CONNECTED = "connected"
+LOST = "lost"
+RECONNECTING = "reconnecting"
+
+# Seconds without any heartbeat or telemetry before the link counts as lost.
+STALE_TIMEOUT = 3.0
+# How often (s) the link is checked.
+CHECK_INTERVAL = 0.25
+# Reconnect backoff: first wait (s), growth factor and longest wait.
+BACKOFF_INITIAL = 0.5
+BACKOFF_FACTOR = 2.0
+BACKOFF_MAX = 30.0
+# An interval more than this many times the mean interval counts as a gap (dropped samples).
+GAP_FACTOR = 2.5
+# Intervals collected before gaps are counted. They are then judged against their median, so a dropout while
+# warming up does not inflate the mean that later gaps are measured against.
+MIN_INTERVALS = 5
+
+
+"""
+Inter-arrival statistics of one source.
+"""
+class ArrivalStats:
+
+    def __init__(self, gap_factor=GAP_FACTOR):
+        self.gap_factor = gap_factor
+        self.count = 0
+        self.first = None
+        self.last = None
+        self.intervals = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.jitter = 0.0
+        self.gaps = 0
+        self.max_gap = 0.0
+        # First intervals, held back until there are enough of them to tell gaps apart.
+        self.warmup = []
+
+    """
+    Record an arrival at time `now` (time.monotonic seconds).
+    """
+    def add(self, now):
+        self.count += 1
+        if self.last is None:
+            self.first = self.last = now
+            return
+
+        interval = now - self.last
+        self.last = now
+        if self.warmup is not None:
+            self.warmup.append(interval)
+            if len(self.warmup) < MIN_INTERVALS:
+                return
+            warmup, self.warmup = self.warmup, None
+            typical = sorted(warmup)[len(warmup) // 2]
+            for interval in warmup:
+                if interval > self.gap_factor * typical:
+                    self._gap(interval)
+                else:
+                    self._interval(interval)
+            return
+
+        if interval > self.gap_factor * self.mean:
+            # Gaps are kept out of the mean and jitter so that one dropout does not hide the next.
+            self._gap(interval)
+            return
+        self._interval(interval)
+
+    def _gap(self, interval):
+        self.gaps += 1
+        self.max_gap = max(self.max_gap, interval)
+
+    def _interval(self, interval):
+        # Running mean/variance (Welford) and smoothed mean deviation of the interval (RFC 3550 style jitter).
+        self.intervals += 1
+        delta = interval - self.mean
+        self.mean += delta / self.intervals
+        self.m2 += delta * (interval - self.mean)
+        if self.intervals > 1:
+            self.jitter += (abs(delta) - self.jitter) / 16.0
+
+    def stddev(self):
+        if self.intervals < 2:
+            return 0.0
+        return math.sqrt(self.m2 / (self.intervals - 1))
+
+    def age(self, now=None):
+        if self.last is None:
+            return math.inf
+        return (time.monotonic() if now is None else now) - self.last
+
+    def snapshot(self, now=None):
+        mean = self.mean
+        if self.warmup:
+            # Not yet warmed up: the median so far, which a dropout cannot drag out.
+            mean = sorted(self.warmup)[len(self.warmup) // 2]
+        return {
+            "count": self.count,
+            "rate_hz": 1.0 / mean if mean else 0.0,
+            "mean_interval": mean,
+            "stddev": self.stddev(),
+            "jitter": self.jitter,
+            "gaps": self.gaps,
+            "max_gap": self.max_gap,
+            "age": self.age(now),
+        }
+
+
+"""
+Watchdog for one vehicle. Must be started on the event loop that owns the vehicle's System and hub.
+"""
+class LinkWatchdog:
+
+    def __init__(self, drone, hub, channel=None, stale_timeout=STALE_TIMEOUT, backoff_initial=BACKOFF_INITIAL,
+                 backoff_max=BACKOFF_MAX):
+        self.drone = drone
+        self.hub = hub
+        self.channel = channel
+        self.stale_timeout = stale_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+
+        self.stats = {"heartbeat": ArrivalStats()}
+        self.state = CONNECTED
+        self.last = time.monotonic()
+        self.vehicle_connected = True
+        self.dropouts = 0
+        self.listeners = []
+        self.tasks = []
+        self.loop = None
+        self.sample = None
+
+    """
+    Register a callback(state) called on the drone loop whenever the link state changes.
+    """
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def start(self):
+        if self.tasks:
+            return self
+        self.loop = asyncio.get_running_loop()
+        self.sample = asyncio.Event()
+        self.last = time.monotonic()
+        self.hub.add_observer(self.observe)
+        self.tasks = [self.loop.create_task(self._follow("Connection state", self.drone.core.connection_state,
+                                                         self._connection_state)),
+                      self.loop.create_task(self._follow("Health", self.drone.telemetry.health,
+                                                         lambda health: self.observe("heartbeat"))),
+                      self.loop.create_task(self._monitor())]
+        return self
+
+    def stop(self):
+        self.hub.remove_observer(self.observe)
+        for task in self.tasks:
+            task.cancel()
+        self.tasks = []
+
+    """
+    Timestamp an arrival from a source (a telemetry stream, or "heartbeat").
+    """
+    def observe(self, source, now=None):
+        if now is None:
+            now = time.monotonic()
+        stats = self.stats.get(source)
+        if stats is None:
+            stats = self.stats[source] = ArrivalStats()
+        stats.add(now)
+        self.last = now
+        if self.sample is not None:
+            self.sample.set()
+
+    """
+    Statistics of every source, e.g. {"heartbeat": {...}, "position": {...}}.
+    """
+    def snapshot(self):
+        now = time.monotonic()
+        return {source: stats.snapshot(now) for source, stats in self.stats.items()}
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        self.state = state
+        for callback in list(self.listeners):
+            try:
+                callback(state)
+            except Exception as e:
+                log.exception("Link state listener failed: %s", e)
+
+    def _connection_state(self, state):
+        self.vehicle_connected = state.is_connected
+
+    """
+    Pass every sample of a MAVSDK stream to callback, opening the stream again if it fails.
+    """
+    async def _follow(self, name, stream, callback):
+        while True:
+            try:
+                async for sample in stream():
+                    callback(sample)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("%s stream failed: %s", name, e)
+            await asyncio.sleep(self.backoff_initial)
+
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(CHECK_INTERVAL)
+            silent = time.monotonic() - self.last
+            if self.vehicle_connected and silent < self.stale_timeout:
+                continue
+
+            self.dropouts += 1
+            log.warning("Link lost", extra=fields(silent=round(silent, 2), vehicle_connected=self.vehicle_connected,
+                                                  dropouts=self.dropouts))
+            lost_at = time.monotonic()
+            self._set_state(LOST)
+            await self._reconnect()
+            log.info("Link restored", extra=fields(outage=round(time.monotonic() - lost_at, 2)))
+            self._set_state(CONNECTED)
+
+    """
+    Wait for the link to come back, backing off exponentially between attempts. The link is only restored once
+    the vehicle reports itself connected and fresh data is arriving again.
+    """
+    async def _reconnect(self):
+        delay = self.backoff_initial
+        attempt = 0
+        while True:
+            attempt += 1
+            self._set_state(RECONNECTING)
+            log.info("Reconnecting", extra=fields(attempt=attempt, wait=delay))
+            self.sample.clear()
+            # Restart any telemetry stream that ended during the dropout; subscribers are kept.
+            self.hub.reopen()
+            try:
+                await asyncio.wait_for(self.sample.wait(), delay)
+                if self.vehicle_connected:
+                    break
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * BACKOFF_FACTOR, self.backoff_max)
+
+        if self.channel is not None:
+            # Gimbal control may have been lost with the link.
+            self.channel.controlled = False
@@ -6,6 +6,8 @@ from PyQt5.QtWidgets import QApplication
 import breeze_resources
 from GUI import PlannerView
 from Controller import PlannerControl
+from QtDroneLoop import create_drone_loop, run_application
+from StructuredLog import setup_logging, shutdown_logging, LOG_LEVEL, BINARY_LOG
 
 
 """
@@ -26,13 +28,20 @@ def main():
     file.open(QFile.ReadOnly | QFile.Text)
     stream = QTextStream(file)
     planner.setStyleSheet(stream.readAll())
+    # Log through a background thread so no loop ever waits on console output
+    setup_logging(LOG_LEVEL, BINARY_LOG)
+    # Start the single event loop that all drone I/O runs on (the Qt event loop itself if qasync is installed)
+    drone_loop = create_drone_loop(planner)
     # Show the planner's GUI
     view = PlannerView()
     view.show()
     # Create instances of the model and the controller
-    PlannerControl(view=view)
-    # Execute planner's main loop
-    sys.exit(planner.exec_())
+    PlannerControl(view=view, drone_loop=drone_loop)
+    # Execute planner's main loop. Logging is shut down only once the drone loop and its links have been torn
+    # down, so that records from the teardown are kept.
+    status = run_application(planner, drone_loop)
+    shutdown_logging()
+    sys.exit(status)
 
 
 if __name__ == "__main__":
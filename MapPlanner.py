@@ -11,6 +11,10 @@ from PyQt5.QtCore import pyqtSignal
 from PyQt5.QtWidgets import QVBoxLayout
 from PyQt5.QtWidgets import QWidget
 
+from StructuredLog import get_logger, fields
+
+log = get_logger(__name__)
+
 
 """
 Class to create the custom MapPlanner widget, allowing users to plot an outdoor GPS-based 
@@ -20,6 +24,8 @@ mission on an interactive Open-Source map.
 class FoliumDisplay(QWidget):
 
     newWaypoint = pyqtSignal(float, float, name="newWaypoint")
+    selectWaypoint = pyqtSignal(int, name="selectWaypoint")
+    moveWaypoint = pyqtSignal(int, float, float, name="moveWaypoint")
 
     def __init__(self):
         super().__init__()
@@ -217,6 +223,58 @@ class FoliumDisplay(QWidget):
         self.webView.setHtml(data.getvalue().decode())  # give html of folium map to webengine
         self.layout.addWidget(self.webView)
 
+    """
+    Draw a mission being edited: the start location, then every waypoint as a draggable marker (selected ones
+    in red) joined up in order. Shift-clicking a waypoint selects it and dragging it moves it.
+    """
+    def showMission(self, waypoints, selected=()):
+        self.layout.removeWidget(self.webView)
+        self.webView.deleteLater()
+        self.waypoints = [tuple(self.drone_start)]
+        self.layers = []
+        centre = (waypoints[0][0], waypoints[0][1]) if len(waypoints) else self.drone_start
+
+        self.m = folium.Map(
+            tiles='OpenStreetMap',  # 'Stamen Terrain',
+            max_zoom=18,
+            zoom_start=19,
+            location=centre)
+
+        folium.CircleMarker(
+            location=self.drone_start,
+            radius=10,
+            popup="Start Location",
+            tooltip="Start Location",
+            color="#3186cc",
+            fill=True,
+            fill_color="#3186cc"
+        ).add_to(self.m)
+
+        for i, wp in enumerate(waypoints):
+            lat = wp[0]
+            lon = wp[1]
+            self.waypoints.append((lat, lon))
+            folium.Marker(
+                (lat, lon),
+                popup=f"<i><h6>Waypoint {i + 1}</h6>"
+                      f"N:{round(lat, 8)}<br>"
+                      f"W:{round(lon, 8)}<br>\n"
+                      f"Altitude: {wp[2]}m</i>",
+                tooltip=f"Waypoint {i + 1}",
+                icon=folium.Icon(color="red" if i in selected else "blue"),
+                draggable=True
+            ).add_to(self.m)
+
+        self.waypoint_count = len(waypoints)
+        if len(waypoints):
+            folium.PolyLine(
+                self.waypoints
+            ).add_to(self.m)
+
+        # Add Custom JS to folium map
+        self.m = self.addCustomJS(self.m)
+        self.refreshMap()
+
     """
     Refresh the map to reflect most recent changes.
     """
@@ -230,29 +288,6 @@ class FoliumDisplay(QWidget):
         self.webView.setHtml(data.getvalue().decode())  # give html of folium map to webengine
         self.layout.insertWidget(0, self.webView)
 
-    """
-    Add a marker for new waypoint.
-    """
-    def addMarker(self, lat, lng, alt):
-
-        folium.Marker(
-            [lat, lng],
-            popup=f"<i><h6>Waypoint {self.waypoint_count}</h6>"
-                  f"N:{round(lat, 8)}<br>"
-                  f"W:{round(lng, 8)}<br>\n"
-                  f"Altitude: {alt}m</i>",
-            tooltip=f"Waypoint {self.waypoint_count}"
-        ).add_to(self.m)
-
-        self.waypoints.append((lat, lng))
-
-        folium.PolyLine(
-            self.waypoints
-        ).add_to(self.m)
-
-        self.layout.removeWidget(self.webView)
-        self.refreshMap()
-
     """
     Add custom JavaScript to the Leaflet.js library to allow clicks to return 
     GPS co-ordinates.
@@ -262,7 +297,28 @@ class FoliumDisplay(QWidget):
         my_js = f"""{map_object.get_name()}.on("click",
                  function (e) {{
                     var data = `{{"coordinates": ${{JSON.stringify(e.latlng)}}, "click": "one"}}`;
-                    console.log(data)}});"""
+                    console.log(data)}});
+                 setTimeout(function () {{
+                    {map_object.get_name()}.eachLayer(function (layer) {{
+                        if (!(layer instanceof L.Marker) || !layer.options.draggable) {{
+                            return;
+                        }}
+                        var index = function () {{
+                            return parseInt(/Waypoint (\\d+)/.exec(layer.getTooltip().getContent())[1]) - 1;
+                        }};
+                        layer.on("click", function (e) {{
+                            if (!e.originalEvent.shiftKey) {{
+                                return;
+                            }}
+                            var data = `{{"coordinates": ${{JSON.stringify(layer.getLatLng())}}, ` +
+                                       `"click": "select", "index": ${{index()}}}}`;
+                            console.log(data)}});
+                        layer.on("dragend", function (e) {{
+                            var data = `{{"coordinates": ${{JSON.stringify(layer.getLatLng())}}, ` +
+                                       `"click": "drag", "index": ${{index()}}}}`;
+                            console.log(data)}});
+                    }});
+                 }}, 0);"""
 
         e = Element(my_js)
         html = map_object.get_root()
@@ -285,6 +341,14 @@ class FoliumDisplay(QWidget):
 
             self.newWaypoint.emit(float(lat), float(lng))
 
+        elif data['click'] == "select":
+            self.selectWaypoint.emit(int(data['index']))
+
+        elif data['click'] == "drag":
+            lat = data['coordinates']['lat']
+            lng = data['coordinates']['lng']
+            self.moveWaypoint.emit(int(data['index']), float(lat), float(lng))
+
 
 """
 Define overall QWebPage.
@@ -295,6 +359,6 @@ class WebEnginePage(QWebEnginePage):
         self.parent = parent
 
     def javaScriptConsoleMessage(self, level, msg, line, source_id):
-        print(msg)  # Check js errors
+        log.debug("JS console: %s", msg, extra=fields(line=line, source=source_id))  # Check js errors
         if 'coordinates' in msg:
             self.parent.handleClick(msg)
@@ -0,0 +1,271 @@
+"""
+
+Mission model backed by a contiguous numpy structured array.
+
+Waypoints are stored as records of MISSION_DTYPE in one preallocated array that doubles in size when it fills
+up, so appending or popping a waypoint is amortised O(1) and never copies the mission. Plotting, MissionItem
+building and whole-mission transforms (moving, scaling, rotating, changing altitude or speed) work on column
+views of that array rather than on per-waypoint Python lists.
+
+For the drone functions a Mission still looks like the old list of waypoints: indexing or iterating it gives
+[x, y, z, yaw] lists for indoor missions and [lat, lon, alt] lists for outdoor ones.
+
+"""
+
+import numpy as np
+
+
+# Record layout of one waypoint. position is (x, y) in metres indoors and (lat, lon) in degrees outdoors, and
+# altitude is z (NED, negative up) indoors and relative altitude in metres outdoors. A NaN speed or yaw means
+# the default for the mission, and hold is the time (s) to wait at the waypoint.
+MISSION_DTYPE = np.dtype([("position", "f8", (2,)),
+                          ("altitude", "f4"),
+                          ("speed", "f4"),
+                          ("yaw", "f4"),
+                          ("hold", "f4"),
+                          ("action", "i2")])
+
+# Payload actions carried out at a waypoint.
+NO_ACTION = 0
+GRIPPER_OPEN = 1
+GRIPPER_CLOSE = 2
+SEED_DROP = 3
+
+# Waypoints allocated for a new, empty mission.
+INITIAL_CAPACITY = 16
+
+
+"""
+Return waypoints as a Mission, converting from the old list of waypoints format if needed.
+"""
+def as_mission(waypoints, outdoor):
+    if isinstance(waypoints, Mission):
+        return waypoints
+    return Mission.from_list(waypoints, outdoor)
+
+
+"""
+A growable array of waypoints.
+"""
+class Mission:
+
+    def __init__(self, outdoor, capacity=INITIAL_CAPACITY):
+        self.outdoor = outdoor
+        self.data = np.zeros(max(capacity, 1), dtype=MISSION_DTYPE)
+        self.count = 0
+
+    """
+    Build a mission from the old list of waypoints format ([x, y, z, yaw] indoors, [lat, lon, alt] outdoors).
+    """
+    @classmethod
+    def from_list(cls, waypoints, outdoor):
+        mission = cls(outdoor, len(waypoints))
+        mission.extend(waypoints)
+        return mission
+
+    """
+    Build a mission from an array of MISSION_DTYPE records. The records are copied.
+    """
+    @classmethod
+    def from_records(cls, records, outdoor):
+        mission = cls(outdoor, len(records))
+        mission.data[:len(records)] = records
+        mission.count = len(records)
+        return mission
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self._waypoint(self.data[i])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._waypoint(record) for record in self.records[index]]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("Mission index out of range")
+        return self._waypoint(self.data[index])
+
+    def __repr__(self):
+        return f"Mission({'outdoor' if self.outdoor else 'indoor'}, {self.count} waypoints)"
+
+    def _waypoint(self, record):
+        x, y = record["position"]
+        if self.outdoor:
+            return [float(x), float(y), float(record["altitude"])]
+        yaw = float(record["yaw"])
+        return [float(x), float(y), float(record["altitude"]), 0.0 if np.isnan(yaw) else yaw]
+
+    """
+    The stored waypoints as a structured array. This is a view, so no data is copied; it is only valid until
+    the mission next grows.
+    """
+    @property
+    def records(self):
+        return self.data[:self.count]
+
+    """
+    A view of one field of every waypoint, e.g. column("position") is an (n, 2) array.
+    """
+    def column(self, name):
+        return self.data[name][:self.count]
+
+    @property
+    def position(self):
+        return self.column("position")
+
+    @property
+    def altitude(self):
+        return self.column("altitude")
+
+    @property
+    def speed(self):
+        return self.column("speed")
+
+    @property
+    def yaw(self):
+        return self.column("yaw")
+
+    @property
+    def hold(self):
+        return self.column("hold")
+
+    @property
+    def action(self):
+        return self.column("action")
+
+    def _reserve(self, size):
+        if size <= len(self.data):
+            return
+        capacity = len(self.data)
+        while capacity < size:
+            capacity *= 2
+        data = np.zeros(capacity, dtype=MISSION_DTYPE)
+        data[:self.count] = self.data[:self.count]
+        self.data = data
+
+    """
+    Add a waypoint to the end of the mission.
+    """
+    def append(self, waypoint, speed=np.nan, hold=0.0, action=NO_ACTION):
+        self._reserve(self.count + 1)
+        self.data[self.count] = self._record(waypoint, speed, hold, action)
+        self.count += 1
+
+    def _record(self, waypoint, speed=np.nan, hold=0.0, action=NO_ACTION):
+        if self.outdoor or len(waypoint) < 4:
+            yaw = np.nan
+        else:
+            yaw = waypoint[3]
+        return ((waypoint[0], waypoint[1]), waypoint[2], speed, yaw, hold, action)
+
+    """
+    Add waypoints in the old list format, or records of MISSION_DTYPE, to the end of the mission.
+    """
+    def extend(self, waypoints):
+        if isinstance(waypoints, np.ndarray) and waypoints.dtype == MISSION_DTYPE:
+            records = waypoints
+        else:
+            records = np.array([self._record(waypoint) for waypoint in waypoints], dtype=MISSION_DTYPE)
+        self._reserve(self.count + len(records))
+        self.data[self.count:self.count + len(records)] = records
+        self.count += len(records)
+
+    """
+    Insert a waypoint before index. O(n) as the later waypoints are moved along.
+    """
+    def insert(self, index, waypoint, speed=np.nan, hold=0.0, action=NO_ACTION):
+        index = max(0, min(index if index >= 0 else index + self.count, self.count))
+        self._reserve(self.count + 1)
+        self.data[index + 1:self.count + 1] = self.data[index:self.count]
+        self.data[index] = self._record(waypoint, speed, hold, action)
+        self.count += 1
+
+    """
+    Remove and return a waypoint (the last one by default).
+    """
+    def pop(self, index=-1):
+        if not self.count:
+            raise IndexError("pop from empty mission")
+        if index < 0:
+            index += self.count
+        waypoint = self[index]
+        self.data[index:self.count - 1] = self.data[index + 1:self.count]
+        self.count -= 1
+        return waypoint
+
+    def clear(self):
+        self.count = 0
+
+    def copy(self):
+        return Mission.from_records(self.records, self.outdoor)
+
+    """
+    The mission in the old list of waypoints format (as saved to missions.txt).
+    """
+    def to_list(self):
+        return list(self)
+
+    """
+    Waypoint positions moved by an offset, e.g. from mission to grid coordinates for plotting.
+    """
+    def plot(self, offset=(0.0, 0.0)):
+        return self.position + np.asarray(offset, dtype="f8")
+
+    """
+    Move every waypoint by (dx, dy).
+    """
+    def translate(self, dx, dy):
+        self.position[:] += (dx, dy)
+        return self
+
+    """
+    Scale every waypoint's position about an origin.
+    """
+    def scale(self, factor, origin=(0.0, 0.0)):
+        origin = np.asarray(origin, dtype="f8")
+        self.position[:] = origin + (self.position - origin) * factor
+        return self
+
+    """
+    Rotate every waypoint's position by angle (degrees, clockwise from north as with yaw) about an origin.
+    Yaw is rotated with it. Only meaningful for indoor (metric) missions.
+    """
+    def rotate(self, angle, origin=(0.0, 0.0)):
+        theta = np.radians(angle)
+        c, s = np.cos(theta), np.sin(theta)
+        origin = np.asarray(origin, dtype="f8")
+        relative = self.position - origin
+        self.position[:] = origin + relative @ np.array([[c, s], [-s, c]])
+        self.yaw[:] = (self.yaw + angle + 180.0) % 360.0 - 180.0
+        return self
+
+    """
+    Set the altitude of every waypoint, or of those selected by a mask or index array.
+    """
+    def set_altitude(self, altitude, where=slice(None)):
+        self.altitude[where] = altitude
+        return self
+
+    """
+    Set the speed of every waypoint, or of those selected by a mask or index array. NaN flies at the default.
+    """
+    def set_speed(self, speed, where=slice(None)):
+        self.speed[where] = speed
+        return self
+
+    """
+    Speed of every waypoint, with those left at NaN filled in with a default.
+    """
+    def speeds(self, default):
+        return np.where(np.isnan(self.speed), default, self.speed)
+
+    """
+    Length (m) of each leg of an indoor mission.
+    """
+    def leg_lengths(self):
+        points = np.column_stack((self.position, self.altitude))
+        return np.linalg.norm(np.diff(points, axis=0), axis=1)
@@ -0,0 +1,321 @@
+"""
+
+Undo/redo history of waypoint edits.
+
+Each version of a mission is kept as the root of a persistent sequence: an implicit treap whose nodes are never
+changed once built. An edit copies only the O(log n) nodes on its path and shares the rest of the tree with the
+previous version, so recording a version costs O(log n) rather than a copy of the mission, and undo/redo just
+switch back to an older root. The Mission array being edited is updated alongside each edit, and rebuilt from
+the tree on undo/redo.
+
+"""
+
+import random
+
+import numpy as np
+
+from Mission import MISSION_DTYPE, NO_ACTION
+
+
+# Most edits kept for undo.
+HISTORY_LIMIT = 500
+
+
+class _Node:
+    __slots__ = ("value", "priority", "left", "right", "size")
+
+    def __init__(self, value, priority, left=None, right=None):
+        self.value = value
+        self.priority = priority
+        self.left = left
+        self.right = right
+        self.size = 1 + _size(left) + _size(right)
+
+
+def _size(node):
+    return node.size if node is not None else 0
+
+
+def _with(node, left, right):
+    return _Node(node.value, node.priority, left, right)
+
+
+"""
+Split a tree into its first k values and the rest.
+"""
+def _split(node, k):
+    if node is None:
+        return None, None
+    if k <= _size(node.left):
+        left, right = _split(node.left, k)
+        return left, _with(node, right, node.right)
+    left, right = _split(node.right, k - _size(node.left) - 1)
+    return _with(node, node.left, left), right
+
+
+def _merge(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        return _with(left, left.left, _merge(left.right, right))
+    return _with(right, _merge(left, right.left), right.right)
+
+
+def _set(node, index, value):
+    size = _size(node.left)
+    if index < size:
+        return _with(node, _set(node.left, index, value), node.right)
+    if index > size:
+        return _with(node, node.left, _set(node.right, index - size - 1, value))
+    return _Node(value, node.priority, node.left, node.right)
+
+
+"""
+Immutable sequence with O(log n) indexing, insertion, deletion and replacement. Every edit returns a new
+sequence that shares all unchanged nodes with the old one.
+"""
+class PersistentSequence:
+
+    def __init__(self, root=None):
+        self.root = root
+
+    """
+    Build a sequence in O(n) (a Cartesian tree over random priorities).
+    """
+    @classmethod
+    def from_values(cls, values):
+        stack = []
+        for value in values:
+            node = _Node(value, random.random())
+            last = None
+            while stack and stack[-1].priority < node.priority:
+                last = stack.pop()
+            node.left = last
+            if stack:
+                stack[-1].right = node
+            stack.append(node)
+        root = stack[0] if stack else None
+        _resize(root)
+        return cls(root)
+
+    def __len__(self):
+        return _size(self.root)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Sequence index out of range")
+        node = self.root
+        while True:
+            size = _size(node.left)
+            if index < size:
+                node = node.left
+            elif index > size:
+                index -= size + 1
+                node = node.right
+            else:
+                return node.value
+
+    def __iter__(self):
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.value
+            node = node.right
+
+    def insert(self, index, value):
+        left, right = _split(self.root, index)
+        return PersistentSequence(_merge(_merge(left, _Node(value, random.random())), right))
+
+    def delete(self, index):
+        left, right = _split(self.root, index)
+        _, right = _split(right, 1)
+        return PersistentSequence(_merge(left, right))
+
+    def set(self, index, value):
+        return PersistentSequence(_set(self.root, index, value))
+
+
+"""
+Fill in subtree sizes of a freshly built (not yet shared) tree.
+"""
+def _resize(root):
+    order = []
+    stack = [root] if root is not None else []
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        if node.left is not None:
+            stack.append(node.left)
+        if node.right is not None:
+            stack.append(node.right)
+    for node in reversed(order):
+        node.size = 1 + _size(node.left) + _size(node.right)
+
+
+def _record(record):
+    x, y = record["position"].tolist()
+    return ((x, y), float(record["altitude"]), float(record["speed"]), float(record["yaw"]),
+            float(record["hold"]), int(record["action"]))
+
+
+"""
+The waypoints of a mission (from index start on) as record tuples, read column by column.
+"""
+def _records(mission, start=0):
+    return zip(map(tuple, mission.position[start:].tolist()), mission.altitude[start:].tolist(),
+               mission.speed[start:].tolist(), mission.yaw[start:].tolist(), mission.hold[start:].tolist(),
+               mission.action[start:].tolist())
+
+
+"""
+Edit history of one mission. All edits should go through here so that they can be undone; each one also
+updates the Mission in place. Indices refer to waypoints in the mission, and a set of selected waypoints is kept
+for the multi-waypoint edits.
+"""
+class MissionHistory:
+
+    def __init__(self, mission, limit=HISTORY_LIMIT):
+        self.limit = limit
+        self.reset(mission)
+
+    """
+    Start a new history for a mission (e.g. after loading a saved one). Nothing before it can be undone.
+    """
+    def reset(self, mission):
+        self.mission = mission
+        self.current = PersistentSequence.from_values(_records(mission))
+        self.undo_stack = []
+        self.redo_stack = []
+        self.selected = set()
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def _push(self, sequence):
+        self.undo_stack.append(self.current)
+        if len(self.undo_stack) > self.limit:
+            del self.undo_stack[0]
+        self.redo_stack = []
+        self.current = sequence
+
+    def _restore(self, sequence):
+        self.current = sequence
+        self.selected = set()
+        records = np.array(list(sequence), dtype=MISSION_DTYPE)
+        self.mission.clear()
+        self.mission.extend(records)
+
+    def undo(self):
+        if not self.undo_stack:
+            return False
+        self.redo_stack.append(self.current)
+        self._restore(self.undo_stack.pop())
+        return True
+
+    def redo(self):
+        if not self.redo_stack:
+            return False
+        self.undo_stack.append(self.current)
+        self._restore(self.redo_stack.pop())
+        return True
+
+    """
+    Insert a waypoint (in the old list format) before index, or at the end. Waypoints after it keep their
+    selection.
+    """
+    def insert(self, waypoint, index=None, speed=np.nan, hold=0.0, action=NO_ACTION):
+        if index is None:
+            index = len(self.mission)
+        self.mission.insert(index, waypoint, speed, hold, action)
+        self._push(self.current.insert(index, _record(self.mission.data[index])))
+        self.selected = {i + 1 if i >= index else i for i in self.selected}
+
+    """
+    Append a block of MISSION_DTYPE records (e.g. an imported route) as a single edit. Only the new waypoints are
+    built into the tree, which is then joined onto the current one.
+    """
+    def extend(self, records):
+        if not len(records):
+            return
+        start = len(self.mission)
+        self.mission.extend(records)
+        added = PersistentSequence.from_values(_records(self.mission, start))
+        self._push(PersistentSequence(_merge(self.current.root, added.root)))
+
+    """
+    Move waypoints (the selected ones by default) by (dx, dy).
+    """
+    def move(self, dx, dy, indices=None):
+        indices = sorted(self.selected if indices is None else indices)
+        if not indices:
+            return
+        self.mission.position[indices] += (dx, dy)
+        sequence = self.current
+        for index in indices:
+            sequence = sequence.set(index, _record(self.mission.data[index]))
+        self._push(sequence)
+
+    """
+    Delete waypoints (the selected ones by default) and clear the selection.
+    """
+    def delete(self, indices=None):
+        indices = sorted(self.selected if indices is None else indices, reverse=True)
+        if not indices:
+            return
+        sequence = self.current
+        for index in indices:
+            self.mission.pop(index)
+            sequence = sequence.delete(index)
+        self._push(sequence)
+        self.selected = set()
+
+    """
+    Delete the last waypoint.
+    """
+    def pop(self):
+        if len(self.mission):
+            self.delete([len(self.mission) - 1])
+
+    """
+    Remove every waypoint.
+    """
+    def clear(self):
+        if not len(self.mission):
+            return
+        self.mission.clear()
+        self._push(PersistentSequence())
+        self.selected = set()
+
+    """
+    Add or remove a waypoint from the selection. Returns whether it is now selected.
+    """
+    def toggle(self, index):
+        if index in self.selected:
+            self.selected.discard(index)
+            return False
+        self.selected.add(index)
+        return True
+
+    def select(self, indices):
+        self.selected = set(indices)
+
+    """
+    Index of the waypoint nearest to (x, y) within radius, or None.
+    """
+    def nearest(self, x, y, radius):
+        if not len(self.mission):
+            return None
+        distances = np.hypot(*(self.mission.position - (x, y)).T)
+        index = int(np.argmin(distances))
+        return index if distances[index] <= radius else None
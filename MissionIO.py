@@ -0,0 +1,470 @@
+"""
+
+Bulk waypoint import and export.
+
+Reads waypoints from CSV, GeoJSON, KML and QGroundControl .plan files straight into a Mission. Each reader
+streams waypoints out of its file as record tuples; they are gathered into fixed-size chunks of MISSION_DTYPE
+records, each chunk is validated with vectorised checks and appended to the mission in one go. A route of
+thousands of points never goes through the GUI one waypoint at a time.
+
+CSV files may have a header naming their columns (lat/lon/alt outdoors, x/y/z indoors, plus optional speed,
+yaw, hold and action); without one the first three columns are taken as the position and altitude. GeoJSON,
+KML and .plan files hold GPS coordinates and are only read into outdoor missions.
+
+Missions are exported as QGroundControl .plan JSON or as MAVLink "QGC WPL 110" waypoint text. Both are written
+out EXPORT_CHUNK waypoints at a time from the mission's columns, to a temporary file that replaces the target
+once it is complete.
+
+"""
+
+import csv
+import json
+import math
+import os
+import xml.etree.ElementTree as ElementTree
+
+import numpy as np
+
+from Mission import Mission, MISSION_DTYPE, NO_ACTION
+
+
+# Waypoints validated and appended to the mission at a time.
+IMPORT_CHUNK = 4096
+
+# Altitude (m) given to waypoints whose file has none.
+DEFAULT_ALTITUDE = 2.5
+
+# Same limits as the planner's altitude and speed inputs (see Util.checkAltitude and Util.checkSpeed).
+MIN_ALTITUDE = 0.9
+MAX_ALTITUDE = 25.1
+MIN_SPEED = 0.1
+MAX_SPEED = 5.1
+
+# Waypoints formatted and written out at a time.
+EXPORT_CHUNK = 4096
+
+# MAVLink commands read from and written to mission files.
+MAV_CMD_NAV_WAYPOINT = 16
+MAV_CMD_NAV_LOITER_TIME = 19
+MAV_CMD_DO_CHANGE_SPEED = 178
+
+# MAVLink frames written to mission files.
+MAV_FRAME_LOCAL_NED = 1
+MAV_FRAME_MISSION = 2
+MAV_FRAME_GLOBAL_RELATIVE_ALT = 3
+
+# Vehicle described in exported .plan files (PX4 multicopter).
+MAV_AUTOPILOT_PX4 = 12
+MAV_TYPE_QUADROTOR = 2
+
+# Header names accepted for each waypoint field in CSV files.
+CSV_COLUMNS = {
+    "a": ("lat", "latitude", "x", "north"),
+    "b": ("lon", "lng", "long", "longitude", "y", "east"),
+    "altitude": ("alt", "altitude", "z", "height", "down"),
+    "speed": ("speed", "speed_m_s"),
+    "yaw": ("yaw", "heading", "yaw_deg"),
+    "hold": ("hold", "hold_s", "loiter", "loiter_time"),
+    "action": ("action",),
+}
+
+
+def _float(value, default=np.nan):
+    if value is None or value == "":
+        return default
+    return float(value)
+
+
+"""
+Stream (a, b, altitude, speed, yaw, hold, action) tuples out of a CSV file. a and b are lat and lon outdoors
+and x and y indoors.
+"""
+def read_csv(path, default_altitude=DEFAULT_ALTITUDE):
+    with open(path, newline="") as file:
+        rows = csv.reader(file)
+        columns = None
+        for number, row in enumerate(rows, 1):
+            if not row or not "".join(row).strip() or row[0].lstrip().startswith("#"):
+                continue
+            if columns is None:
+                columns = _csv_columns(row)
+                if columns is not None:
+                    continue
+                columns = {"a": 0, "b": 1, "altitude": 2}
+            try:
+                yield tuple(_csv_field(row, columns, field, default)
+                            for field, default in (("a", np.nan), ("b", np.nan), ("altitude", default_altitude),
+                                                   ("speed", np.nan), ("yaw", np.nan), ("hold", 0.0),
+                                                   ("action", NO_ACTION)))
+            except ValueError:
+                raise ValueError(f"{path}, line {number}: could not read waypoint from {','.join(row)!r}")
+
+
+"""
+Map waypoint fields to column indices from a header row, or return None if the row is not a header.
+"""
+def _csv_columns(row):
+    names = [name.strip().lower() for name in row]
+    try:
+        [float(name) for name in names if name]
+        return None
+    except ValueError:
+        pass
+
+    columns = {}
+    for field, accepted in CSV_COLUMNS.items():
+        for i, name in enumerate(names):
+            if name in accepted:
+                columns[field] = i
+                break
+    if "a" not in columns or "b" not in columns:
+        raise ValueError(f"CSV header {row} has no position columns (lat/lon or x/y)")
+    return columns
+
+
+def _csv_field(row, columns, field, default):
+    index = columns.get(field)
+    if index is None or index >= len(row):
+        return default
+    return _float(row[index].strip(), default)
+
+
+"""
+Stream waypoints out of a GeoJSON file: every Point, and every vertex of every LineString, in file order. A
+Point feature may give its altitude, speed and hold in its properties.
+"""
+def read_geojson(path, default_altitude=DEFAULT_ALTITUDE):
+    with open(path) as file:
+        data = json.load(file)
+    yield from _geojson(data, {}, default_altitude)
+
+
+def _geojson(data, properties, default_altitude):
+    kind = data.get("type")
+    if kind == "FeatureCollection":
+        for feature in data.get("features", []):
+            yield from _geojson(feature, {}, default_altitude)
+    elif kind == "Feature":
+        if data.get("geometry"):
+            yield from _geojson(data["geometry"], data.get("properties") or {}, default_altitude)
+    elif kind == "GeometryCollection":
+        for geometry in data.get("geometries", []):
+            yield from _geojson(geometry, properties, default_altitude)
+    elif kind == "Point":
+        yield _geojson_point(data["coordinates"], properties, default_altitude)
+    elif kind in ("MultiPoint", "LineString"):
+        for coordinates in data["coordinates"]:
+            yield _geojson_point(coordinates, {}, default_altitude)
+    elif kind == "MultiLineString":
+        for line in data["coordinates"]:
+            for coordinates in line:
+                yield _geojson_point(coordinates, {}, default_altitude)
+    else:
+        raise ValueError(f"Unsupported GeoJSON type: {kind}")
+
+
+def _geojson_point(coordinates, properties, default_altitude):
+    altitude = coordinates[2] if len(coordinates) > 2 else properties.get("altitude", default_altitude)
+    return (_float(coordinates[1]), _float(coordinates[0]), _float(altitude, default_altitude),
+            _float(properties.get("speed")), _float(properties.get("yaw")), _float(properties.get("hold"), 0.0),
+            NO_ACTION)
+
+
+"""
+Stream waypoints out of a KML file: every coordinate of every Point, LineString and LinearRing, in file order.
+The file is parsed incrementally and each element is freed once read.
+"""
+def read_kml(path, default_altitude=DEFAULT_ALTITUDE):
+    for _, element in ElementTree.iterparse(path, events=("end",)):
+        if element.tag.rsplit("}", 1)[-1] != "coordinates":
+            continue
+        for coordinate in (element.text or "").split():
+            values = coordinate.split(",")
+            if len(values) < 2:
+                raise ValueError(f"{path}: could not read KML coordinate {coordinate!r}")
+            altitude = _float(values[2], default_altitude) if len(values) > 2 else default_altitude
+            yield (_float(values[1]), _float(values[0]), altitude, np.nan, np.nan, 0.0, NO_ACTION)
+        element.clear()
+
+
+"""
+Stream waypoints out of a QGroundControl .plan file. Waypoint and loiter items become waypoints (with the
+loiter time as their hold), change speed items set the speed of the waypoints after them, and the items inside
+complex items (surveys, corridor scans) are read in order. Other commands are skipped.
+"""
+def read_plan(path, default_altitude=DEFAULT_ALTITUDE):
+    with open(path) as file:
+        plan = json.load(file)
+    if plan.get("fileType") != "Plan" or "mission" not in plan:
+        raise ValueError(f"{path} is not a QGroundControl plan")
+
+    # Waypoints before the first change speed item fly at the mission's default speed.
+    speed = np.nan
+    for item in _plan_items(plan["mission"].get("items", [])):
+        command = item.get("command")
+        params = [_float(param) for param in item.get("params", [])] + [np.nan] * 7
+        if command == MAV_CMD_DO_CHANGE_SPEED:
+            if params[1] > 0:
+                speed = params[1]
+        elif command in (MAV_CMD_NAV_WAYPOINT, MAV_CMD_NAV_LOITER_TIME):
+            hold = params[0] if params[0] > 0 else 0.0
+            altitude = params[6] if not math.isnan(params[6]) else _float(item.get("Altitude"), default_altitude)
+            yield (params[4], params[5], altitude, speed, params[3], hold, NO_ACTION)
+
+
+def _plan_items(items):
+    for item in items:
+        if item.get("type") == "ComplexItem":
+            transects = item.get("TransectStyleComplexItem", {})
+            yield from _plan_items(transects.get("Items", []))
+        else:
+            yield item
+
+
+# File readers by format.
+READERS = {
+    "csv": read_csv,
+    "geojson": read_geojson,
+    "kml": read_kml,
+    "plan": read_plan,
+}
+
+# Formats by file extension.
+EXTENSIONS = {
+    ".csv": "csv",
+    ".txt": "csv",
+    ".geojson": "geojson",
+    ".json": "geojson",
+    ".kml": "kml",
+    ".plan": "plan",
+}
+
+
+def file_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXTENSIONS:
+        raise ValueError(f"Unsupported waypoint file type: {extension or path}")
+    return EXTENSIONS[extension]
+
+
+"""
+Check a chunk of imported records. Returns a boolean mask of the valid ones and, for the first invalid one, a
+reason (None if all are valid).
+"""
+def validate_chunk(records, outdoor):
+    position = records["position"]
+    altitude = records["altitude"] if outdoor else -records["altitude"]
+    speed = records["speed"]
+    checks = [
+        (np.isfinite(position).all(axis=1), "position is not a number"),
+        ((MIN_ALTITUDE < altitude) & (altitude < MAX_ALTITUDE),
+         f"altitude must be between {MIN_ALTITUDE:g} and {MAX_ALTITUDE:g} metres"),
+        (np.isnan(speed) | ((MIN_SPEED < speed) & (speed < MAX_SPEED)),
+         f"speed must be between {MIN_SPEED:g} and {MAX_SPEED:g} metres per second"),
+        (records["hold"] >= 0, "hold time is negative"),
+    ]
+    if outdoor:
+        checks += [
+            (np.abs(position[:, 0]) <= 90, "latitude is out of range"),
+            (np.abs(position[:, 1]) <= 180, "longitude is out of range"),
+        ]
+
+    valid = np.ones(len(records), dtype=bool)
+    for ok, _ in checks:
+        valid &= ok
+    if valid.all():
+        return valid, None
+    first = int(np.argmin(valid))
+    return valid, (first, next(message for ok, message in checks if not ok[first]))
+
+
+"""
+Read a waypoint file into a new Mission, validating every IMPORT_CHUNK waypoints as a block. An invalid
+waypoint stops the import with a ValueError naming it, unless skip_invalid is set, in which case invalid
+waypoints are left out. Returns (mission, number of waypoints skipped).
+"""
+def import_mission(path, outdoor, fmt=None, default_altitude=DEFAULT_ALTITUDE, skip_invalid=False,
+                   chunk_size=IMPORT_CHUNK):
+    fmt = fmt or file_format(path)
+    if fmt not in READERS:
+        raise ValueError(f"Unsupported waypoint file format: {fmt}")
+    if fmt != "csv" and not outdoor:
+        raise ValueError(f"{os.path.basename(path)} holds GPS coordinates and can only be imported outdoors")
+
+    mission = Mission(outdoor, chunk_size)
+    chunk = np.zeros(chunk_size, dtype=MISSION_DTYPE)
+    count = 0
+    read = 0
+    skipped = 0
+
+    def flush():
+        nonlocal skipped
+        records = chunk[:count]
+        if not outdoor:
+            # Indoor altitudes are stored NED (negative up), whichever sign the file used.
+            records["altitude"] = -np.abs(records["altitude"])
+        valid, reason = validate_chunk(records, outdoor)
+        if reason is not None and not skip_invalid:
+            index, message = reason
+            raise ValueError(f"{os.path.basename(path)}: waypoint {read - count + index + 1}: {message}")
+        skipped += len(records) - int(valid.sum())
+        mission.extend(records[valid])
+
+    for a, b, altitude, speed, yaw, hold, action in READERS[fmt](path, default_altitude):
+        chunk[count] = ((a, b), altitude, speed, yaw, hold, action)
+        count += 1
+        read += 1
+        if count == chunk_size:
+            flush()
+            count = 0
+    if count:
+        flush()
+    return mission, skipped
+
+
+"""
+The mission as MAVLink mission items, EXPORT_CHUNK waypoints at a time: lists of (command, frame, params)
+where params are the seven item parameters (NaN for unset). A change speed item is put in front of each
+waypoint whose speed differs from the one before it; waypoints without a speed fly at default_speed, or at the
+vehicle's own default if that is None.
+"""
+def mission_items(mission, default_speed=None, chunk_size=EXPORT_CHUNK):
+    frame = MAV_FRAME_GLOBAL_RELATIVE_ALT if mission.outdoor else MAV_FRAME_LOCAL_NED
+    speeds = mission.speed if default_speed is None else mission.speeds(default_speed)
+    current_speed = np.nan
+    for start in range(0, len(mission), chunk_size):
+        end = min(start + chunk_size, len(mission))
+        items = []
+        for (a, b), altitude, speed, yaw, hold in zip(mission.position[start:end].tolist(),
+                                                       mission.altitude[start:end].tolist(),
+                                                       speeds[start:end].tolist(),
+                                                       mission.yaw[start:end].tolist(),
+                                                       mission.hold[start:end].tolist()):
+            if not math.isnan(speed) and speed != current_speed:
+                items.append((MAV_CMD_DO_CHANGE_SPEED, MAV_FRAME_MISSION, [1.0, speed, -1.0, 0.0, 0.0, 0.0, 0.0]))
+                current_speed = speed
+            items.append((MAV_CMD_NAV_WAYPOINT, frame, [hold, 0.0, 0.0, yaw, a, b, altitude]))
+        yield items
+
+
+"""
+Write a file through a temporary one, so that a failed export never leaves a half-written file in place.
+"""
+def _write_atomic(path, write):
+    temporary = path + ".tmp"
+    try:
+        with open(temporary, "w", newline="\n") as file:
+            write(file)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+"""
+Write a mission as MAVLink "QGC WPL 110" text. Item 0 is the home position (the first waypoint if none is
+given), in the same frame as the waypoints: relative to home's altitude outdoors and local NED indoors. Unset
+parameters, such as a waypoint's yaw, are written as nan so that the vehicle keeps its own default.
+"""
+def export_wpl(mission, path, home=None, default_speed=None, chunk_size=EXPORT_CHUNK):
+    if home is None:
+        home = mission[0][:2] + [0.0] if len(mission) else [0.0, 0.0, 0.0]
+    home = list(home) + [0.0] * (3 - len(home))
+    frame = MAV_FRAME_GLOBAL_RELATIVE_ALT if mission.outdoor else MAV_FRAME_LOCAL_NED
+    if mission.outdoor:
+        # Home is at zero altitude relative to itself.
+        home[2] = 0.0
+
+    def write(file):
+        file.write("QGC WPL 110\n")
+        file.write(f"0\t1\t{frame}\t{MAV_CMD_NAV_WAYPOINT}\t0\t0\t0\t0\t"
+                   f"{home[0]:.8f}\t{home[1]:.8f}\t{home[2]:.6f}\t1\n")
+        index = 1
+        for items in mission_items(mission, default_speed, chunk_size):
+            lines = []
+            for command, item_frame, params in items:
+                lines.append(f"{index}\t0\t{item_frame}\t{command}\t{params[0]:g}\t{params[1]:g}\t{params[2]:g}\t"
+                             f"{params[3]:g}\t{params[4]:.8f}\t{params[5]:.8f}\t{params[6]:.6f}\t1\n")
+                index += 1
+            file.writelines(lines)
+
+    _write_atomic(path, write)
+
+
+"""
+Write an outdoor mission as a QGroundControl .plan file. The home position defaults to the first waypoint.
+"""
+def export_plan(mission, path, home=None, default_speed=None, chunk_size=EXPORT_CHUNK):
+    if not mission.outdoor:
+        raise ValueError("Only outdoor (GPS) missions can be exported as a QGroundControl plan")
+    if home is None:
+        home = mission[0][:2] + [0.0] if len(mission) else [0.0, 0.0, 0.0]
+    home = list(home) + [0.0] * (3 - len(home))
+
+    def write(file):
+        file.write('{\n    "fileType": "Plan",\n'
+                   '    "geoFence": {"circles": [], "polygons": [], "version": 2},\n'
+                   '    "groundStation": "QGroundControl",\n'
+                   '    "mission": {\n')
+        if default_speed is not None:
+            file.write(f'        "hoverSpeed": {json.dumps(default_speed)},\n')
+        file.write(f'        "firmwareType": {MAV_AUTOPILOT_PX4},\n'
+                   f'        "vehicleType": {MAV_TYPE_QUADROTOR},\n'
+                   f'        "plannedHomePosition": {json.dumps(home)},\n'
+                   '        "items": [')
+        jump = 1
+        for items in mission_items(mission, default_speed, chunk_size):
+            entries = []
+            for command, frame, params in items:
+                item = {
+                    "autoContinue": True,
+                    "command": command,
+                    "doJumpId": jump,
+                    "frame": frame,
+                    "params": [None if math.isnan(param) else param for param in params],
+                    "type": "SimpleItem",
+                }
+                if command == MAV_CMD_NAV_WAYPOINT:
+                    item["Altitude"] = params[6]
+                    item["AltitudeMode"] = 1
+                    item["AMSLAltAboveTerrain"] = None
+                entries.append(("\n            " if jump == 1 else ",\n            ") + json.dumps(item))
+                jump += 1
+            file.writelines(entries)
+        file.write('\n        ],\n'
+                   '        "version": 2\n'
+                   '    },\n'
+                   '    "rallyPoints": {"points": [], "version": 2},\n'
+                   '    "version": 1\n'
+                   '}\n')
+
+    _write_atomic(path, write)
+
+
+# File writers by format.
+WRITERS = {
+    "plan": export_plan,
+    "wpl": export_wpl,
+}
+
+# Export formats by file extension.
+EXPORT_EXTENSIONS = {
+    ".plan": "plan",
+    ".waypoints": "wpl",
+    ".txt": "wpl",
+}
+
+
+"""
+Write a mission to a file, in the format given by its extension unless fmt is set.
+"""
+def export_mission(mission, path, fmt=None, home=None, default_speed=None, chunk_size=EXPORT_CHUNK):
+    if fmt is None:
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in EXPORT_EXTENSIONS:
+            raise ValueError(f"Unsupported mission file type: {extension or path}")
+        fmt = EXPORT_EXTENSIONS[extension]
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported mission file format: {fmt}")
+    WRITERS[fmt](mission, path, home, default_speed, chunk_size)
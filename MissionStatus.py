@@ -0,0 +1,116 @@
+"""
+
+Mission status reporting.
+
+The mission functions report where a mission stands (flight phase, mission item current/total and an ETA) to a
+StatusReporter, which passes MissionStatus snapshots on to a callback, e.g. a worker signal into the GUI.
+Updates are coalesced to at most one every STATUS_INTERVAL seconds, so a high-rate telemetry stream never floods
+the GUI thread. A phase change is always passed on straight away, and the newest state is never lost.
+
+"""
+
+import asyncio
+import time
+
+from StructuredLog import get_logger
+
+log = get_logger(__name__)
+
+
+# Flight phases.
+UPLOADING = "Uploading"
+ARMING = "Arming"
+FLYING = "Flying"
+RETURNING = "Returning"
+LANDING = "Landing"
+LANDED = "Landed"
+FAILED = "Failed"
+ABORTED = "Aborted"
+
+# Minimum time (s) between status updates passed on to the callback.
+STATUS_INTERVAL = 0.25
+
+
+"""
+Snapshot of a mission's status. eta is in seconds, or None if it cannot be estimated yet.
+"""
+class MissionStatus:
+
+    def __init__(self, phase, current=0, total=0, eta=None):
+        self.phase = phase
+        self.current = current
+        self.total = total
+        self.eta = eta
+
+    def __repr__(self):
+        return f"MissionStatus({self.phase}, {self.current}/{self.total}, eta={self.eta})"
+
+    def __eq__(self, other):
+        return isinstance(other, MissionStatus) and vars(self) == vars(other)
+
+
+"""
+Collects status updates for one mission and passes coalesced snapshots on to `callback`. Must be used from the
+event loop the mission runs on.
+"""
+class StatusReporter:
+
+    def __init__(self, callback=None, interval=STATUS_INTERVAL):
+        self.callback = callback
+        self.interval = interval
+        self.phase_name = None
+        self.current = 0
+        self.total = 0
+        self.deadline = None
+        self.last_sent = None
+        self.last_time = None
+        self.pending = None
+
+    def phase(self, phase):
+        if phase == self.phase_name:
+            return
+        self.phase_name = phase
+        if phase in (LANDED, FAILED):
+            self.deadline = None
+        self._update(force=True)
+
+    def progress(self, current, total):
+        self.current = current
+        self.total = total
+        self._update()
+
+    """
+    Set the estimated time left, in seconds. The ETA then counts down on its own between updates.
+    """
+    def eta(self, seconds):
+        self.deadline = None if seconds is None else time.monotonic() + max(0.0, seconds)
+        self._update()
+
+    def status(self):
+        eta = None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+        return MissionStatus(self.phase_name, self.current, self.total, eta)
+
+    def _update(self, force=False):
+        if self.callback is None:
+            return
+        now = time.monotonic()
+        if force or self.last_time is None or now - self.last_time >= self.interval:
+            self._send()
+        elif self.pending is None:
+            # Send the newest state once the interval is up.
+            loop = asyncio.get_running_loop()
+            self.pending = loop.call_later(self.interval - (now - self.last_time), self._send)
+
+    def _send(self):
+        if self.pending is not None:
+            self.pending.cancel()
+            self.pending = None
+        status = self.status()
+        self.last_time = time.monotonic()
+        if status == self.last_sent and status.eta is None:
+            return
+        self.last_sent = status
+        try:
+            self.callback(status)
+        except Exception as e:
+            log.exception("Mission status callback failed: %s", e)
@@ -0,0 +1,92 @@
+"""
+
+Differential mission upload.
+
+Uploading a mission over a slow telemetry link (e.g. a serial radio) takes seconds per sortie. Every plan
+uploaded is therefore fingerprinted with a content hash that is remembered per vehicle. When the same plan is
+flown again, the plan on board is downloaded and hashed; if it still matches, the upload is skipped and the
+mission is simply restarted from its first item.
+
+"""
+
+import hashlib
+import math
+import struct
+
+from StructuredLog import get_logger
+
+log = get_logger(__name__)
+
+
+# Fields of a mission item that make up its content, with the resolution they are compared at. Positions are
+# stored on the vehicle as 1e-7 degree integers, so anything finer would never survive a round trip.
+HASH_FIELDS = (
+    ("latitude_deg", 1e-7),
+    ("longitude_deg", 1e-7),
+    ("relative_altitude_m", 1e-2),
+    ("speed_m_s", 1e-2),
+    ("is_fly_through", None),
+    ("gimbal_pitch_deg", 1e-2),
+    ("gimbal_yaw_deg", 1e-2),
+    ("camera_action", None),
+    ("loiter_time_s", 1e-2),
+    ("camera_photo_interval_s", 1e-2),
+    ("acceptance_radius_m", 1e-2),
+    ("yaw_deg", 1e-2),
+    ("camera_photo_distance_m", 1e-2),
+)
+
+
+def _quantize(value, resolution):
+    if value is None:
+        return "-"
+    if resolution is None:
+        return str(getattr(value, "name", value))
+    if math.isnan(value):
+        return "nan"
+    return str(round(value / resolution))
+
+
+"""
+Content hash of a MissionPlan (or a list of MissionItems). Fields a MAVSDK version does not have are skipped.
+"""
+def plan_hash(plan):
+    items = getattr(plan, "mission_items", plan)
+    digest = hashlib.sha256(struct.pack("<I", len(items)))
+    for item in items:
+        fields = [_quantize(getattr(item, name, None), resolution) for name, resolution in HASH_FIELDS]
+        digest.update(";".join(fields).encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+"""
+True if the plan stored on the vehicle hashes to `expected`.
+"""
+async def onboard_matches(drone, expected):
+    try:
+        onboard = await drone.mission.download_mission()
+    except Exception as e:
+        log.warning("Mission download failed, uploading again: %s", e)
+        return False
+    return onboard is not None and plan_hash(onboard) == expected
+
+
+"""
+Upload a plan unless the vehicle already holds it. `link` is the vehicle's connection (see ConnectionManager),
+which remembers the hash of the last plan uploaded to it. Returns True if the plan was uploaded.
+"""
+async def upload_mission(drone, plan, link=None):
+    digest = plan_hash(plan)
+    if link is not None and link.mission_hash == digest and await onboard_matches(drone, digest):
+        log.info("-- Mission unchanged, skipping upload")
+        await drone.mission.set_current_mission_item(0)
+        return False
+
+    log.info("-- Uploading mission")
+    if link is not None:
+        link.mission_hash = None
+    await drone.mission.upload_mission(plan)
+    if link is not None:
+        link.mission_hash = digest
+    return True
@@ -0,0 +1,236 @@
+"""
+
+Ordered command channel to the MultiDrone's payload modules.
+
+Module commands are sent over the gimbal protocol: control of the gimbal is taken once per session, then each
+(module, action) command is sent as a pitch/yaw rate. Commands are queued and sent one at a time in the order
+they were submitted, so rapid clicks go out back to back rather than being dropped.
+
+Every command is tracked from submission to acknowledgement by the vehicle's CommandTracker. The gimbal messages
+get no COMMAND_ACK, so a command counts as acknowledged when the module reports it back: the module echoes the
+last (module, action) it carried out as the gimbal's pitch and yaw, which MAVSDK streams as camera attitude.
+Only an attitude sample that arrives after the command was sent, is newer than the attitude reported at the time
+and differs from it counts as an echo. A command that repeats the attitude already reported (or is sent before
+any is known) cannot be told apart from a stale sample, so it is recorded as unverifiable rather than acked.
+Sent commands wait up to ACK_TIMEOUT seconds for their echo without holding up the commands behind them.
+
+Modules listed in STATE_MODULES are driven to a state (e.g. gripper open/closed), so a command that repeats the
+last one still waiting to be sent for that module is redundant and is merged into it. Every other module is
+pulsed (e.g. one seed bomb per command), and each of its commands is always sent.
+
+"""
+
+import asyncio
+import collections
+import time
+
+from mavsdk.gimbal import ControlMode
+
+from StructuredLog import get_logger
+
+log = get_logger(__name__)
+
+
+# Modules whose commands set a state rather than trigger an action. 0 = gripper.
+STATE_MODULES = {0}
+
+# Seconds a sent command waits for its attitude echo before it counts as unacknowledged.
+ACK_TIMEOUT = 5.0
+# Largest difference (deg) between an echoed pitch/yaw and the commanded (module, action).
+ECHO_TOLERANCE = 0.05
+
+
+"""
+A queued module command. `future` resolves to True once the command has been sent.
+"""
+class ModuleCommand:
+
+    def __init__(self, module, action, future):
+        self.module = module
+        self.action = action
+        self.future = future
+        # Tracker records of this command and of any commands merged into it.
+        self.records = []
+
+    def __repr__(self):
+        return f"ModuleCommand({self.module}, {self.action})"
+
+
+"""
+Command channel for one vehicle. Must be created on the event loop that owns the drone's System.
+"""
+class ModuleChannel:
+
+    def __init__(self, drone, tracker=None, hub=None, state_modules=STATE_MODULES, ack_timeout=ACK_TIMEOUT):
+        self.drone = drone
+        self.tracker = tracker
+        self.hub = hub
+        self.ack_timeout = ack_timeout
+        # Sent commands waiting for their echo, oldest first, as (entry, attitude at send, send time, time they
+        # stop waiting).
+        self.unacked = collections.deque()
+        # Last camera attitude sample, followed from creation so that the attitude at each send is known.
+        self.attitude = None
+        self.echoes = None
+        if tracker is not None and hub is not None:
+            self.echoes = hub.subscribe("camera_attitude_euler", self._echo)
+        self.loop = asyncio.get_running_loop()
+        self.state_modules = set(state_modules)
+        self.queue = collections.deque()
+        self.wakeup = asyncio.Event()
+        self.controlled = False
+        self.task = None
+
+    """
+    Queue a (module, action) command and return a future that resolves once it has been sent. `submitted` is
+    the time.monotonic() time the command was issued, if earlier than now.
+    """
+    def submit(self, command, submitted=None):
+        module, action = float(command[0]), float(command[1])
+        record = None
+        if self.tracker is not None:
+            record = self.tracker.submitted((module, action), submitted)
+
+        if module in self.state_modules:
+            pending = self._pending(module)
+            if pending is not None and pending.action == action:
+                log.debug("Coalescing module command %s", command)
+                if record is not None:
+                    record.coalesced = True
+                    pending.records.append(record)
+                return pending.future
+
+        entry = ModuleCommand(module, action, self.loop.create_future())
+        if record is not None:
+            entry.records.append(record)
+        self.queue.append(entry)
+        self.wakeup.set()
+        if self.task is None or self.task.done():
+            self.task = self.loop.create_task(self._run())
+        return entry.future
+
+    """
+    Queue a command and wait until it has been sent.
+    """
+    async def send(self, command, submitted=None):
+        return await asyncio.shield(self.submit(command, submitted))
+
+    """
+    Last queued, unsent command for a module.
+    """
+    def _pending(self, module):
+        for entry in reversed(self.queue):
+            if entry.module == module:
+                return entry
+        return None
+
+    """
+    Take control of the gimbal the first time a command is sent in a session.
+    """
+    async def _take_control(self):
+        if not self.controlled:
+            await self.drone.gimbal.take_control(ControlMode.PRIMARY)
+            self.controlled = True
+
+    async def _run(self):
+        while True:
+            if not self.queue:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            entry = self.queue[0]
+            try:
+                await self._take_control()
+                baseline = self.attitude
+                """
+                Using Gimbal protocol to send messages that can be forwarded on to module.
+
+                Setting atitude to (module, action) e.g.
+
+                (0.0, 0.0) = Gripper/Close
+                (0.0, 1.0) = Gripper/Open
+
+                (1.0, 1.0) = Seeder/Rotate
+                """
+                await self.drone.gimbal.set_pitch_rate_and_yaw_rate(entry.module, entry.action)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.tracker is not None:
+                    for record in entry.records:
+                        self.tracker.failed_with(record, e)
+                # Control is taken again before the next command.
+                self.controlled = False
+                self.queue.popleft()
+                if not entry.future.done():
+                    entry.future.set_exception(e)
+                continue
+
+            # MAVSDK returns once the message is on its way; the ack is the attitude echo (see _echo).
+            self._stamp(entry, self.tracker.sent if self.tracker else None)
+            self._await_echo(entry, baseline)
+            self.queue.popleft()
+            if not entry.future.done():
+                entry.future.set_result(True)
+
+    def _stamp(self, entry, stamp, now=None):
+        if stamp is None:
+            return
+        now = time.monotonic() if now is None else now
+        for record in entry.records:
+            stamp(record, now)
+
+    """
+    Wait for a sent command's echo. `baseline` is the attitude reported when it was sent.
+    """
+    def _await_echo(self, entry, baseline):
+        if self.echoes is None:
+            return
+        if baseline is None or _echoes(baseline, entry):
+            for record in entry.records:
+                self.tracker.unverified(record)
+            return
+        now = time.monotonic()
+        self.unacked.append((entry, baseline, now, now + self.ack_timeout))
+
+    """
+    Stamp the oldest waiting command that an attitude sample echoes. Commands that have waited longer than
+    ack_timeout are given up on first.
+    """
+    def _echo(self, attitude):
+        now = time.monotonic()
+        self.attitude = attitude
+        while self.unacked and self.unacked[0][3] < now:
+            entry = self.unacked.popleft()[0]
+            for record in entry.records:
+                self.tracker.timed_out(record)
+        for i, (entry, baseline, sent, _) in enumerate(self.unacked):
+            if now > sent and attitude.timestamp_us > baseline.timestamp_us and _echoes(attitude, entry):
+                del self.unacked[i]
+                self._stamp(entry, self.tracker.acked, now)
+                return
+
+    """
+    Stop the channel, failing any commands still queued.
+    """
+    def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        if self.echoes is not None:
+            self.echoes.cancel()
+            self.echoes = None
+        self.unacked.clear()
+        while self.queue:
+            entry = self.queue.popleft()
+            if not entry.future.done():
+                entry.future.cancel()
+
+
+"""
+Whether a camera attitude sample reports a command's (module, action).
+"""
+def _echoes(attitude, entry):
+    return (abs(attitude.pitch_deg - entry.module) <= ECHO_TOLERANCE
+            and abs(attitude.yaw_deg - entry.action) <= ECHO_TOLERANCE)
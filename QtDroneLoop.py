@@ -0,0 +1,113 @@
+"""
+
+Drone event loop integrated with the Qt event loop.
+
+With qasync installed, asyncio runs on the GUI thread inside Qt's own event loop instead of on a separate
+DroneLoop thread. Coroutines from DroneFunctions are then awaited directly by the controller's workers,
+no thread is involved in any drone operation, and worker signals reach the view as direct calls rather than
+being queued across threads. Without qasync (or with USE_QT_LOOP off) the threaded DroneLoop is used, and both
+offer the same interface to the controller.
+
+"""
+
+import asyncio
+
+try:
+    import qasync
+except ImportError:
+    qasync = None
+
+from DroneLoop import DroneLoop
+from StructuredLog import get_logger
+
+log = get_logger(__name__)
+
+
+# Run drone I/O on the Qt event loop when qasync is available.
+USE_QT_LOOP = True
+
+
+"""
+Drone loop running on the Qt event loop. Offers the same interface as DroneLoop.
+"""
+class QtDroneLoop:
+
+    integrated = True
+
+    def __init__(self, app):
+        if qasync is None:
+            raise RuntimeError("qasync is required to run the drone loop on the Qt event loop")
+        self.app = app
+        self.loop = qasync.QEventLoop(app)
+        asyncio.set_event_loop(self.loop)
+        self.closing = asyncio.Event()
+
+    def start(self):
+        return self
+
+    def is_running(self):
+        return self.loop.is_running()
+
+    """
+    Schedule a coroutine on the loop. Returns its asyncio Task.
+    """
+    def submit(self, coro):
+        return self.loop.create_task(coro)
+
+    def call(self, callback, *args):
+        self.loop.call_soon(callback, *args)
+
+    """
+    Run a coroutine to completion. Only possible before the application is running, as waiting on the GUI
+    thread would block the very loop the coroutine runs on; submit() it instead.
+    """
+    def run(self, coro, timeout=None):
+        if self.loop.is_running():
+            coro.close()
+            raise RuntimeError("Cannot block on the Qt drone loop while it is running; submit the coroutine instead")
+        return self.loop.run_until_complete(asyncio.wait_for(coro, timeout))
+
+    """
+    Ask the loop to finish. Outstanding tasks are cancelled once the application's event loop has returned.
+    """
+    def stop(self, timeout=5.0):
+        self.closing.set()
+
+    """
+    Run the application until it quits, then cancel every drone task and close the loop. Returns the exit code.
+    """
+    def exec(self):
+        self.app.aboutToQuit.connect(self.stop)
+        with self.loop:
+            self.loop.run_until_complete(self.closing.wait())
+            tasks = [task for task in asyncio.all_tasks(self.loop) if not task.done()]
+            for task in tasks:
+                task.cancel()
+            try:
+                self.loop.run_until_complete(asyncio.wait_for(
+                    asyncio.gather(*tasks, return_exceptions=True), 5.0))
+            except Exception as e:
+                log.warning("Drone tasks did not cancel cleanly: %s", e)
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        return 0
+
+
+"""
+Create the application's drone loop: on the Qt event loop if possible, otherwise on its own thread.
+"""
+def create_drone_loop(app, integrated=USE_QT_LOOP):
+    if integrated and qasync is not None:
+        return QtDroneLoop(app).start()
+    if integrated:
+        log.info("qasync is not installed, running drone I/O on a separate thread")
+    return DroneLoop().start()
+
+
+"""
+Run the Qt application with the given drone loop until it quits. Returns the exit code.
+"""
+def run_application(app, drone_loop):
+    if getattr(drone_loop, "integrated", False):
+        return drone_loop.exec()
+    app.aboutToQuit.connect(drone_loop.stop)
+    return app.exec_()
@@ -0,0 +1,433 @@
+"""
+
+In-process simulated drone for testing and benchmarking without PX4 SITL.
+
+SimulatedDrone provides the subset of the MAVSDK System API used by this application: core connection state,
+action, telemetry streams (with set_rate_* support), offboard position control, missions and gimbal commands.
+Flight is modelled with a simple kinematic model, and telemetry samples carry the same attribute names as
+their MAVSDK counterparts. The drone functions and Controller workers therefore run unchanged against it.
+
+Select it with a "sim://" address, e.g. address = "sim://" in DroneFunctions.py. Setting vehicle.connected to
+False simulates a link dropout: the drone reports itself disconnected and no telemetry gets through.
+
+"""
+
+import asyncio
+import math
+import time
+
+from mavsdk.offboard import OffboardError
+from mavsdk.mission import MissionError
+
+
+# Metres per degree of latitude, used for flat-earth conversion around the home position.
+METRES_PER_DEGREE = 111320.0
+
+
+"""
+Plain sample types with the same attribute names as the MAVSDK telemetry types.
+"""
+class Sample:
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def __repr__(self):
+        fields = ", ".join(f"{key}: {value}" for key, value in self.__dict__.items())
+        return f"{type(self).__name__} [{fields}]"
+
+
+class ConnectionState(Sample):
+    pass
+
+
+class Battery(Sample):
+    pass
+
+
+class Position(Sample):
+    pass
+
+
+class PositionNed(Sample):
+    pass
+
+
+class VelocityNed(Sample):
+    pass
+
+
+class PositionVelocityNed(Sample):
+    pass
+
+
+class GpsInfo(Sample):
+    pass
+
+
+class MissionProgress(Sample):
+    pass
+
+
+class EulerAngle(Sample):
+    pass
+
+
+class Health(Sample):
+    pass
+
+
+class SimResult(Sample):
+    pass
+
+
+"""
+Vehicle state and kinematic model shared by all of the simulated plugins.
+"""
+class SimVehicle:
+
+    def __init__(self, home=(55.860573940337495, -4.242192506790162), max_speed=5.0, max_climb=2.0,
+                 max_accel=3.0, time_scale=1.0, drain_rate=1.0 / 1200.0):
+        self.home_lat, self.home_lon = home
+        self.max_speed = max_speed
+        self.max_climb = max_climb
+        self.max_accel = max_accel
+        self.time_scale = time_scale
+        self.drain_rate = drain_rate
+
+        self.connected = True
+        self.armed = False
+        self.mode = "hold"
+        self.battery = 1.0
+        self.position = [0.0, 0.0, 0.0]
+        self.velocity = [0.0, 0.0, 0.0]
+        self.target = None
+        self.speed = max_speed
+
+        self.mission_items = []
+        self.mission_current = 0
+        self.return_to_launch = False
+        self.offboard_setpoint = None
+        # Gimbal pitch and yaw (deg), which the payload module sets to echo the last command it carried out.
+        self.gimbal = [0.0, 0.0]
+
+        self.last_update = time.monotonic()
+
+    def sleep(self, rate_hz):
+        return asyncio.sleep(1.0 / (rate_hz * self.time_scale))
+
+    def in_air(self):
+        return self.position[2] < -0.1
+
+    """
+    Advance the model to the current time in small fixed steps.
+    """
+    def update(self):
+        now = time.monotonic()
+        elapsed = (now - self.last_update) * self.time_scale
+        self.last_update = now
+        while elapsed > 0:
+            dt = min(elapsed, 0.02)
+            self._step(dt)
+            elapsed -= dt
+
+    def _step(self, dt):
+        if self.armed:
+            self.battery = max(0.0, self.battery - self.drain_rate * dt)
+
+        if self.mode == "mission":
+            self._mission_target()
+
+        if self.target is None or not self.armed:
+            self.velocity = [0.0, 0.0, 0.0]
+        else:
+            offset = [t - p for t, p in zip(self.target, self.position)]
+            distance = math.sqrt(sum(d * d for d in offset))
+            if distance < 0.05:
+                self.position = list(self.target)
+                self.velocity = [0.0, 0.0, 0.0]
+            else:
+                # Fly straight at the target, slowing down on approach and respecting the accel limit.
+                speed = min(self.speed, math.sqrt(2 * self.max_accel * distance))
+                desired = [d / distance * speed for d in offset]
+                desired[2] = max(-self.max_climb, min(self.max_climb, desired[2]))
+                max_change = self.max_accel * dt
+                for axis in range(3):
+                    change = max(-max_change, min(max_change, desired[axis] - self.velocity[axis]))
+                    self.velocity[axis] += change
+                    self.position[axis] += self.velocity[axis] * dt
+
+        # Never below the ground.
+        if self.position[2] > 0.0:
+            self.position[2] = 0.0
+            self.velocity[2] = min(0.0, self.velocity[2])
+
+        if self.mode in ("land", "rtl") and self._reached() and not self.in_air():
+            # Auto disarm on touchdown, as PX4 does.
+            self.armed = False
+            self.mode = "hold"
+            self.target = None
+
+    def _reached(self, radius=0.1):
+        if self.target is None:
+            return True
+        return math.dist(self.position, self.target) <= radius
+
+    def _mission_target(self):
+        if self.mission_current >= len(self.mission_items):
+            return
+        item = self.mission_items[self.mission_current]
+        self.target = self.to_ned(item.latitude_deg, item.longitude_deg, item.relative_altitude_m)
+        if item.speed_m_s and not math.isnan(item.speed_m_s):
+            self.speed = min(item.speed_m_s, self.max_speed)
+        radius = getattr(item, "acceptance_radius_m", float("nan"))
+        if math.isnan(radius):
+            radius = 1.0
+        if self._reached(radius):
+            self.mission_current += 1
+            if self.mission_current >= len(self.mission_items):
+                self.speed = self.max_speed
+                if self.return_to_launch:
+                    self.mode = "rtl"
+                    self.target = [0.0, 0.0, 0.0]
+                else:
+                    self.mode = "hold"
+
+    def to_ned(self, lat, lon, altitude):
+        north = (lat - self.home_lat) * METRES_PER_DEGREE
+        east = (lon - self.home_lon) * METRES_PER_DEGREE * math.cos(math.radians(self.home_lat))
+        return [north, east, -altitude]
+
+    def to_global(self):
+        north, east, down = self.position
+        lat = self.home_lat + north / METRES_PER_DEGREE
+        lon = self.home_lon + east / (METRES_PER_DEGREE * math.cos(math.radians(self.home_lat)))
+        return lat, lon, -down
+
+
+class SimCore:
+
+    def __init__(self, vehicle):
+        self.vehicle = vehicle
+
+    async def connection_state(self):
+        while True:
+            yield ConnectionState(uuid=0, is_connected=self.vehicle.connected)
+            await self.vehicle.sleep(1.0)
+
+
+class SimAction:
+
+    def __init__(self, vehicle):
+        self.vehicle = vehicle
+
+    async def arm(self):
+        self.vehicle.update()
+        self.vehicle.armed = True
+
+    async def disarm(self):
+        self.vehicle.update()
+        if not self.vehicle.in_air():
+            self.vehicle.armed = False
+            self.vehicle.mode = "hold"
+
+    async def land(self):
+        self.vehicle.update()
+        north, east, _ = self.vehicle.position
+        self.vehicle.mode = "land"
+        self.vehicle.target = [north, east, 0.0]
+
+    async def return_to_launch(self):
+        self.vehicle.update()
+        self.vehicle.mode = "rtl"
+        self.vehicle.target = [0.0, 0.0, 0.0]
+
+
+class SimTelemetry:
+
+    def __init__(self, vehicle):
+        self.vehicle = vehicle
+        self.rates = {"armed": 10.0, "battery": 1.0, "in_air": 1.0, "position": 10.0,
+                      "position_velocity_ned": 30.0, "gps_info": 1.0, "camera_attitude_euler": 10.0,
+                      "health": 1.0}
+
+    async def _stream(self, name, sample):
+        while True:
+            self.vehicle.update()
+            # Nothing gets through while the link is down.
+            if self.vehicle.connected:
+                yield sample()
+            await self.vehicle.sleep(self.rates[name])
+
+    def armed(self):
+        return self._stream("armed", lambda: self.vehicle.armed)
+
+    def in_air(self):
+        return self._stream("in_air", self.vehicle.in_air)
+
+    def battery(self):
+        return self._stream("battery", lambda: Battery(
+            remaining_percent=self.vehicle.battery, voltage_v=12.6 * (0.8 + 0.2 * self.vehicle.battery)))
+
+    def position(self):
+        def sample():
+            lat, lon, altitude = self.vehicle.to_global()
+            return Position(latitude_deg=lat, longitude_deg=lon,
+                            absolute_altitude_m=altitude, relative_altitude_m=altitude)
+        return self._stream("position", sample)
+
+    def position_velocity_ned(self):
+        def sample():
+            north, east, down = self.vehicle.position
+            v_north, v_east, v_down = self.vehicle.velocity
+            return PositionVelocityNed(
+                position=PositionNed(north_m=north, east_m=east, down_m=down),
+                velocity=VelocityNed(north_m_s=v_north, east_m_s=v_east, down_m_s=v_down))
+        return self._stream("position_velocity_ned", sample)
+
+    def gps_info(self):
+        return self._stream("gps_info", lambda: GpsInfo(num_satellites=12, fix_type="FIX_3D"))
+
+    def health(self):
+        return self._stream("health", lambda: Health(
+            is_gyrometer_calibration_ok=True, is_accelerometer_calibration_ok=True,
+            is_magnetometer_calibration_ok=True, is_local_position_ok=True, is_global_position_ok=True,
+            is_home_position_ok=True, is_armable=not self.vehicle.armed))
+
+    def camera_attitude_euler(self):
+        return self._stream("camera_attitude_euler", lambda: EulerAngle(
+            roll_deg=0.0, pitch_deg=self.vehicle.gimbal[0], yaw_deg=self.vehicle.gimbal[1],
+            timestamp_us=int(time.monotonic() * 1e6)))
+
+    async def _set_rate(self, name, rate_hz):
+        self.rates[name] = rate_hz
+
+    async def set_rate_battery(self, rate_hz):
+        await self._set_rate("battery", rate_hz)
+
+    async def set_rate_in_air(self, rate_hz):
+        await self._set_rate("in_air", rate_hz)
+
+    async def set_rate_position(self, rate_hz):
+        await self._set_rate("position", rate_hz)
+
+    async def set_rate_position_velocity_ned(self, rate_hz):
+        await self._set_rate("position_velocity_ned", rate_hz)
+
+    async def set_rate_gps_info(self, rate_hz):
+        await self._set_rate("gps_info", rate_hz)
+
+
+class SimOffboard:
+
+    def __init__(self, vehicle):
+        self.vehicle = vehicle
+
+    async def set_position_ned(self, position_ned_yaw):
+        self.vehicle.update()
+        self.vehicle.offboard_setpoint = [position_ned_yaw.north_m, position_ned_yaw.east_m,
+                                          position_ned_yaw.down_m]
+        if self.vehicle.mode == "offboard":
+            self.vehicle.target = list(self.vehicle.offboard_setpoint)
+
+    async def start(self):
+        self.vehicle.update()
+        if self.vehicle.offboard_setpoint is None:
+            raise OffboardError(SimResult(result="NO_SETPOINT_SET", result_str="No setpoint set"), "start()")
+        self.vehicle.mode = "offboard"
+        self.vehicle.target = list(self.vehicle.offboard_setpoint)
+
+    async def stop(self):
+        self.vehicle.update()
+        self.vehicle.mode = "hold"
+        self.vehicle.target = list(self.vehicle.position)
+
+    async def is_active(self):
+        return self.vehicle.mode == "offboard"
+
+
+class SimMission:
+
+    def __init__(self, vehicle):
+        self.vehicle = vehicle
+        self.plan = None
+
+    async def upload_mission(self, mission_plan):
+        self.plan = mission_plan
+        self.vehicle.mission_items = list(mission_plan.mission_items)
+        self.vehicle.mission_current = 0
+
+    async def download_mission(self):
+        return self.plan
+
+    async def clear_mission(self):
+        self.plan = None
+        self.vehicle.mission_items = []
+        self.vehicle.mission_current = 0
+
+    async def set_return_to_launch_after_mission(self, enable):
+        self.vehicle.return_to_launch = enable
+
+    async def start_mission(self):
+        self.vehicle.update()
+        if not self.vehicle.mission_items:
+            raise MissionError(SimResult(result="NO_MISSION_AVAILABLE", result_str="No mission"), "start_mission()")
+        self.vehicle.mode = "mission"
+
+    async def pause_mission(self):
+        self.vehicle.update()
+        self.vehicle.mode = "hold"
+        self.vehicle.target = list(self.vehicle.position)
+
+    async def set_current_mission_item(self, index):
+        self.vehicle.mission_current = index
+
+    async def mission_progress(self):
+        last = None
+        while True:
+            self.vehicle.update()
+            progress = (min(self.vehicle.mission_current, len(self.vehicle.mission_items)),
+                        len(self.vehicle.mission_items))
+            if progress != last and self.vehicle.connected:
+                last = progress
+                yield MissionProgress(current=progress[0], total=progress[1])
+            await self.vehicle.sleep(10.0)
+
+
+class SimGimbal:
+
+    def __init__(self, vehicle):
+        self.vehicle = vehicle
+        self.control_mode = None
+        self.commands = []
+
+    async def take_control(self, control_mode):
+        self.control_mode = control_mode
+
+    async def release_control(self):
+        self.control_mode = None
+
+    async def set_pitch_rate_and_yaw_rate(self, pitch_rate_deg_s, yaw_rate_deg_s):
+        self.commands.append((time.monotonic(), pitch_rate_deg_s, yaw_rate_deg_s))
+        self.vehicle.gimbal = [pitch_rate_deg_s, yaw_rate_deg_s]
+
+    async def set_pitch_and_yaw(self, pitch_deg, yaw_deg):
+        self.commands.append((time.monotonic(), pitch_deg, yaw_deg))
+
+
+"""
+Drop-in stand-in for mavsdk.System backed by SimVehicle.
+"""
+class SimulatedDrone:
+
+    def __init__(self, **vehicle_options):
+        self.vehicle = SimVehicle(**vehicle_options)
+        self.core = SimCore(self.vehicle)
+        self.action = SimAction(self.vehicle)
+        self.telemetry = SimTelemetry(self.vehicle)
+        self.offboard = SimOffboard(self.vehicle)
+        self.mission = SimMission(self.vehicle)
+        self.gimbal = SimGimbal(self.vehicle)
+
+    async def connect(self, system_address=None):
+        self.vehicle.update()
@@ -0,0 +1,169 @@
+"""
+
+Asynchronous structured logging.
+
+Log calls made anywhere in the application (including the drone event loop and the GUI thread) only put a record
+on an in-memory queue. A background listener thread does the formatting and the writing, so a control loop never
+blocks on terminal or file output. Records below the configured level are dropped before they are queued.
+
+Records can carry structured fields next to the message:
+
+    log.info("Waypoint reached", extra=fields(north=1.0, east=2.0))
+
+Besides the console, records can be written to a binary sink: a file of length-prefixed records whose fixed
+header (time, level) can be scanned and filtered without decoding the rest of the record.
+
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import struct
+import sys
+
+
+# Name of the application's root logger. Every module logs to a child of it.
+ROOT = "multidrone"
+
+# Level and (optional) binary sink used by the application.
+LOG_LEVEL = logging.INFO
+BINARY_LOG = None  # e.g. "flights/multidrone.mdl"
+
+BINARY_MAGIC = b"MDLG"
+BINARY_VERSION = 1
+# magic, version
+BINARY_HEADER = struct.Struct("<4sHxx")
+# time, level, logger name length, payload length
+RECORD_HEADER = struct.Struct("<dBHI")
+
+_listener = None
+
+
+"""
+Logger for a module, e.g. log = get_logger(__name__).
+"""
+def get_logger(name):
+    return logging.getLogger(f"{ROOT}.{name}")
+
+
+"""
+Structured fields for a log call's `extra` argument.
+"""
+def fields(**values):
+    return {"fields": values}
+
+
+"""
+Console format: time, level, module and message, followed by any structured fields as key=value pairs.
+"""
+class StructuredFormatter(logging.Formatter):
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%H:%M:%S")
+
+    def format(self, record):
+        text = super().format(record)
+        values = getattr(record, "fields", None)
+        if values:
+            text += "  " + " ".join(f"{key}={value}" for key, value in values.items())
+        return text
+
+
+"""
+Appends records to a binary log file.
+"""
+class BinaryLogHandler(logging.Handler):
+
+    def __init__(self, path):
+        super().__init__()
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION))
+
+    def emit(self, record):
+        try:
+            name = record.name.encode()
+            payload = json.dumps({"message": record.getMessage(), "fields": getattr(record, "fields", None)},
+                                 default=str).encode()
+            self.file.write(RECORD_HEADER.pack(record.created, record.levelno, len(name), len(payload)))
+            self.file.write(name)
+            self.file.write(payload)
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        super().close()
+
+
+"""
+Read a binary log, yielding (time, level, logger, message, fields) for records at or above `level`. Only the
+fixed header of a filtered out record is read.
+"""
+def read_binary_log(path, level=logging.NOTSET):
+    with open(path, "rb") as file:
+        magic, version = BINARY_HEADER.unpack(file.read(BINARY_HEADER.size))
+        if magic != BINARY_MAGIC:
+            raise ValueError(f"{path} is not a binary log")
+        if version != BINARY_VERSION:
+            raise ValueError(f"Unsupported binary log version {version} in {path}")
+        while True:
+            header = file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            created, levelno, name_length, payload_length = RECORD_HEADER.unpack(header)
+            if levelno < level:
+                file.seek(name_length + payload_length, 1)
+                continue
+            name = file.read(name_length).decode()
+            payload = file.read(payload_length)
+            if len(payload) < payload_length:
+                return
+            record = json.loads(payload)
+            yield created, levelno, name, record["message"], record["fields"]
+
+
+"""
+Route the application's logging through a queue to a background listener writing to the console and, if a path
+is given, a binary sink. Safe to call again to change the configuration.
+"""
+def setup_logging(level=LOG_LEVEL, binary_path=BINARY_LOG, stream=None):
+    global _listener
+    shutdown_logging()
+
+    console = logging.StreamHandler(stream or sys.stdout)
+    console.setFormatter(StructuredFormatter())
+    handlers = [console]
+    if binary_path:
+        handlers.append(BinaryLogHandler(binary_path))
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger(ROOT)
+    root.setLevel(level)
+    root.propagate = False
+    root.handlers = [logging.handlers.QueueHandler(records)]
+
+    _listener = logging.handlers.QueueListener(records, *handlers)
+    _listener.start()
+    return _listener
+
+
+"""
+Write out everything still queued and stop the listener.
+"""
+def shutdown_logging():
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    logging.getLogger(ROOT).handlers = []
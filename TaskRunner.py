@@ -0,0 +1,276 @@
+"""
+
+Bounded, prioritised runner for the drone jobs started by the controller.
+
+Every connect, mission and module command that the GUI starts goes through one TaskRunner on the drone loop
+instead of being scheduled on its own. The runner starts at most max_workers jobs at once, and starts queued
+jobs in priority order (failsafe, then module commands, then missions, then telemetry). A failsafe job is never
+kept waiting for a free slot, and long-running telemetry streams are never given the last RESERVED_WORKERS slots,
+so however many vehicles are connected a module command or failsafe is never stuck behind them.
+
+Each job gets a TaskHandle, which can cancel it (queued or running) and calls back when the job ends. Jobs
+started with a key are not started twice: submitting a job while another with the same key is still queued or
+running returns the existing handle.
+
+"""
+
+import asyncio
+import heapq
+import itertools
+import threading
+
+from StructuredLog import get_logger
+
+log = get_logger(__name__)
+
+
+# Task priorities, most urgent first.
+FAILSAFE = 0
+MODULE = 1
+MISSION = 2
+TELEMETRY = 3
+
+# Task states.
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Most jobs run at once.
+MAX_WORKERS = 8
+# Slots that telemetry jobs can never take, so they are always free for more urgent work.
+RESERVED_WORKERS = 2
+
+
+"""
+Cancellation token of one task. Cancelling a running task also cancels its asyncio task, so jobs only need to
+check the token if they want to stop at a point of their own choosing.
+"""
+class CancelToken:
+
+    def __init__(self):
+        self.cancelled = False
+        self.reason = None
+        self.callbacks = []
+
+    def cancel(self, reason=None):
+        if self.cancelled:
+            return
+        self.cancelled = True
+        self.reason = reason
+        for callback in self.callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                log.exception("Cancel callback failed: %s", e)
+        self.callbacks = []
+
+    """
+    Call callback(token) when the token is cancelled (straight away if it already is).
+    """
+    def add_callback(self, callback):
+        if self.cancelled:
+            callback(self)
+        else:
+            self.callbacks.append(callback)
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise asyncio.CancelledError(self.reason)
+
+
+"""
+Handle of a job submitted to a TaskRunner.
+"""
+class TaskHandle:
+
+    def __init__(self, runner, coro, priority, name, key):
+        self.runner = runner
+        self.coro = coro
+        self.priority = priority
+        self.name = name
+        self.key = key
+        self.token = CancelToken()
+        self.state = QUEUED
+        self.result = None
+        self.error = None
+        self.task = None
+        self.callbacks = []
+
+    def done(self):
+        return self.state in (DONE, FAILED, CANCELLED)
+
+    def cancel(self, reason=None):
+        self.runner.cancel(self, reason)
+
+    """
+    Call callback(handle) on the drone loop when the job ends, however it ends.
+    """
+    def add_done_callback(self, callback):
+        if self.done():
+            callback(self)
+        else:
+            self.callbacks.append(callback)
+
+    def __repr__(self):
+        return f"TaskHandle({self.name}, {self.state})"
+
+
+"""
+Runs submitted jobs on the drone loop, a bounded number at a time. run() must be running on the loop for any
+job to start; submit() and cancel() are thread safe.
+"""
+class TaskRunner:
+
+    def __init__(self, max_workers=MAX_WORKERS, reserved=RESERVED_WORKERS):
+        self.max_workers = max_workers
+        self.reserved = reserved
+        self.queue = []
+        self.running = set()
+        self.keys = {}
+        self.loop = None
+        self.wakeup = None
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    """
+    Queue a job and return its handle. `job` is a coroutine, or a callable that is given the task's CancelToken
+    and returns one. on_done(handle) is called on the drone loop when the job ends.
+    """
+    def submit(self, job, priority=TELEMETRY, name=None, key=None, on_done=None):
+        with self._lock:
+            existing = self.keys.get(key) if key is not None else None
+            if existing is not None and not existing.done():
+                if asyncio.iscoroutine(job):
+                    job.close()
+                return existing
+
+            handle = TaskHandle(self, None, priority, name or getattr(job, "__qualname__", "task"), key)
+            handle.coro = job(handle.token) if callable(job) else job
+            if on_done is not None:
+                handle.callbacks.append(on_done)
+            if key is not None:
+                self.keys[key] = handle
+            heapq.heappush(self.queue, (priority, next(self._order), handle))
+        self._wake()
+        return handle
+
+    """
+    Return the queued or running job with the given key, or None.
+    """
+    def active(self, key):
+        handle = self.keys.get(key)
+        return handle if handle is not None and not handle.done() else None
+
+    """
+    Cancel a job. A queued job is dropped without being started; a running one has its asyncio task cancelled.
+    """
+    def cancel(self, handle, reason=None):
+        handle.token.cancel(reason)
+        self._call(self._cancel, handle)
+
+    def _cancel(self, handle):
+        if handle.state == QUEUED:
+            handle.coro.close()
+            self._finish(handle, CANCELLED)
+        elif handle.state == RUNNING:
+            handle.task.cancel()
+
+    """
+    Cancel every queued and running job (optionally only those of one priority).
+    """
+    def cancel_all(self, priority=None, reason=None):
+        with self._lock:
+            handles = [entry[2] for entry in self.queue] + list(self.running)
+        for handle in handles:
+            if priority is None or handle.priority == priority:
+                self.cancel(handle, reason)
+
+    def _call(self, callback, *args):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if self.loop is None or running is self.loop:
+            callback(*args)
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def _wake(self):
+        if self.loop is not None and self.wakeup is not None:
+            self._call(self.wakeup.set)
+
+    """
+    Number of jobs of a priority that may be running at once.
+    """
+    def limit(self, priority):
+        if priority == FAILSAFE:
+            return None
+        if priority == TELEMETRY:
+            return self.max_workers - self.reserved
+        return self.max_workers
+
+    """
+    Start queued jobs in priority order until the next one has to wait for a free slot.
+    """
+    def dispatch(self):
+        started = []
+        while True:
+            with self._lock:
+                if not self.queue:
+                    break
+                priority, _, handle = self.queue[0]
+                if handle.state != QUEUED:
+                    heapq.heappop(self.queue)
+                    continue
+                limit = self.limit(priority)
+                if limit is not None and len(self.running) >= limit:
+                    break
+                heapq.heappop(self.queue)
+                handle.state = RUNNING
+                self.running.add(handle)
+            handle.task = self.loop.create_task(self._run(handle))
+            started.append(handle)
+        return started
+
+    async def _run(self, handle):
+        try:
+            handle.result = await handle.coro
+            state = DONE
+        except asyncio.CancelledError:
+            state = CANCELLED
+        except Exception as e:
+            log.exception("Task %s failed: %s", handle.name, e)
+            handle.error = e
+            state = FAILED
+        self._finish(handle, state)
+
+    def _finish(self, handle, state):
+        with self._lock:
+            handle.state = state
+            self.running.discard(handle)
+            if handle.key is not None and self.keys.get(handle.key) is handle:
+                del self.keys[handle.key]
+        callbacks, handle.callbacks = handle.callbacks, []
+        for callback in callbacks:
+            try:
+                callback(handle)
+            except Exception as e:
+                log.exception("Task callback failed: %s", e)
+        self._wake()
+
+    """
+    Runner task. Runs on the drone loop until cancelled, starting jobs whenever one is queued or finishes.
+    Every outstanding job is cancelled when it stops.
+    """
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        try:
+            while True:
+                self.wakeup.clear()
+                self.dispatch()
+                await self.wakeup.wait()
+        finally:
+            self.cancel_all(reason="Task runner stopped")
@@ -0,0 +1,193 @@
+"""
+
+Telemetry history kept in fixed-capacity numpy ring buffers.
+
+Every stream gets a preallocated structured array, so appending a sample is O(1) and never allocates. Window
+queries ("last 60 s of position", "mean discharge rate") are answered with vectorised numpy operations on the
+stored history instead of polling the drone again.
+
+"""
+
+import time
+
+import numpy as np
+
+from TelemetryHub import STREAM_RATES
+
+
+# Record layout for each stream that is stored.
+DTYPES = {
+    "battery": np.dtype([("timestamp", "f8"), ("battery", "f4")]),
+    "in_air": np.dtype([("timestamp", "f8"), ("in_air", "?")]),
+    "position": np.dtype([("timestamp", "f8"), ("lat", "f8"), ("lon", "f8"), ("alt", "f4")]),
+    "position_velocity_ned": np.dtype([("timestamp", "f8"),
+                                       ("north", "f4"), ("east", "f4"), ("down", "f4"),
+                                       ("v_north", "f4"), ("v_east", "f4"), ("v_down", "f4")]),
+}
+
+# Seconds of history to keep for each stream (at its configured rate).
+HISTORY_SECONDS = 3600
+
+
+"""
+Convert a MAVSDK sample into a record tuple for its stream.
+"""
+def to_record(stream, sample, timestamp):
+    if stream == "battery":
+        return (timestamp, sample.remaining_percent)
+    if stream == "in_air":
+        return (timestamp, sample)
+    if stream == "position":
+        return (timestamp, sample.latitude_deg, sample.longitude_deg, sample.relative_altitude_m)
+    if stream == "position_velocity_ned":
+        return (timestamp,
+                sample.position.north_m, sample.position.east_m, sample.position.down_m,
+                sample.velocity.north_m_s, sample.velocity.east_m_s, sample.velocity.down_m_s)
+    raise ValueError(f"No record layout for telemetry stream: {stream}")
+
+
+"""
+Fixed-capacity ring buffer over a preallocated structured array. Records must be appended in timestamp order.
+"""
+class RingBuffer:
+
+    def __init__(self, dtype, capacity):
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.capacity = capacity
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, record):
+        self.data[self.count % self.capacity] = record
+        self.count += 1
+
+    def clear(self):
+        self.count = 0
+
+    """
+    Stored records split into (older, newer) views in chronological order. No data is copied.
+    """
+    def segments(self):
+        if self.count <= self.capacity:
+            return self.data[:self.count], self.data[:0]
+        head = self.count % self.capacity
+        return self.data[head:], self.data[:head]
+
+    """
+    All stored records in chronological order.
+    """
+    def ordered(self):
+        older, newer = self.segments()
+        if not len(newer):
+            return older
+        return np.concatenate((older, newer))
+
+    """
+    Most recent record, or None if the buffer is empty.
+    """
+    def latest(self):
+        if not self.count:
+            return None
+        return self.data[(self.count - 1) % self.capacity]
+
+    """
+    Records with start <= timestamp < end, found by binary search on each segment.
+    """
+    def window(self, start, end=np.inf):
+        parts = []
+        for segment in self.segments():
+            if not len(segment):
+                continue
+            times = segment["timestamp"]
+            lo, hi = np.searchsorted(times, [start, end], side="left")
+            if hi > lo:
+                parts.append(segment[lo:hi])
+        if not parts:
+            return self.data[:0]
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts)
+
+
+"""
+Ring buffer store holding the telemetry history of one vehicle, one buffer per stream.
+"""
+class TelemetryStore:
+
+    def __init__(self, streams=tuple(DTYPES), history=HISTORY_SECONDS):
+        self.buffers = {}
+        for stream in streams:
+            rate_hz = STREAM_RATES.get(stream) or 1.0
+            self.buffers[stream] = RingBuffer(DTYPES[stream], max(1024, int(rate_hz * history)))
+        self.subscriptions = []
+
+    """
+    Subscribe every buffer to the vehicle's telemetry hub.
+    """
+    def attach(self, hub):
+        self.detach()
+        for stream in self.buffers:
+            self.subscriptions.append(hub.subscribe(stream, lambda sample, s=stream: self.append(s, sample)))
+
+    def detach(self):
+        for subscription in self.subscriptions:
+            subscription.cancel()
+        self.subscriptions = []
+
+    """
+    Store a MAVSDK sample, timestamped now unless a timestamp is given.
+    """
+    def append(self, stream, sample, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        self.buffers[stream].append(to_record(stream, sample, timestamp))
+
+    """
+    Records of a stream from the last `seconds` seconds, e.g. store.last("position", 60).
+    """
+    def last(self, stream, seconds, now=None):
+        if now is None:
+            now = time.time()
+        return self.buffers[stream].window(now - seconds)
+
+    def window(self, stream, start, end=np.inf):
+        return self.buffers[stream].window(start, end)
+
+    def latest(self, stream):
+        return self.buffers[stream].latest()
+
+    """
+    Mean battery discharge rate (fraction of a full battery per second) over the last `seconds` seconds,
+    from a least squares fit. Positive while discharging, None without enough history.
+    """
+    def discharge_rate(self, seconds=60, now=None):
+        records = self.last("battery", seconds, now)
+        if len(records) < 2:
+            return None
+        times = records["timestamp"] - records["timestamp"][0]
+        if times[-1] <= 0:
+            return None
+        slope = np.polyfit(times, records["battery"].astype("f8"), 1)[0]
+        return float(-slope)
+
+    """
+    Estimated seconds until the battery reaches `reserve`, based on the recent discharge rate.
+    """
+    def battery_time_remaining(self, reserve=0.2, seconds=60, now=None):
+        rate = self.discharge_rate(seconds, now)
+        latest = self.latest("battery")
+        if not rate or rate <= 0 or latest is None:
+            return None
+        return max(0.0, (float(latest["battery"]) - reserve) / rate)
+
+    """
+    Ground distance (m) covered in the last `seconds` seconds, from NED positions.
+    """
+    def distance_travelled(self, seconds=60, now=None):
+        records = self.last("position_velocity_ned", seconds, now)
+        if len(records) < 2:
+            return 0.0
+        steps = np.hypot(np.diff(records["north"]), np.diff(records["east"]))
+        return float(steps.sum())
@@ -0,0 +1,257 @@
+"""
+
+Telemetry fan-out hub.
+
+Subscribes to each MAVSDK telemetry stream at most once per vehicle and hands every sample on to any number
+of subscribers. The GUI, the recorder and the mission logic can then all consume the same stream without
+opening duplicate gRPC subscriptions. Each subscriber sets its own rate limit.
+
+Every stream also has a configurable rate. It is applied on the vehicle through the telemetry set_rate_*
+calls where supported, and by decimating on the client side otherwise, so consumers always see the latest
+sample with bounded latency and nothing queues up.
+
+"""
+
+import asyncio
+import threading
+import time
+
+from StructuredLog import get_logger
+
+log = get_logger(__name__)
+
+
+# Streams the hub knows how to open, mapped to the plugin that provides them.
+STREAMS = {
+    "battery": "telemetry",
+    "in_air": "telemetry",
+    "position": "telemetry",
+    "position_velocity_ned": "telemetry",
+    "gps_info": "telemetry",
+    "camera_attitude_euler": "telemetry",
+    "mission_progress": "mission",
+}
+
+# Default rate (Hz) of each stream. None leaves the stream at whatever rate the vehicle sends.
+STREAM_RATES = {
+    "battery": 1.0,
+    "in_air": 1.0,
+    "position": 5.0,
+    "position_velocity_ned": 20.0,
+    "gps_info": 0.5,
+    "camera_attitude_euler": None,
+    "mission_progress": None,
+}
+
+
+"""
+A single subscriber to one stream. Samples arriving faster than rate_hz are dropped for this subscriber only.
+"""
+class Subscription:
+
+    def __init__(self, hub, stream, callback, rate_hz=None):
+        self.hub = hub
+        self.stream = stream
+        self.callback = callback
+        self.interval = 1.0 / rate_hz if rate_hz else 0.0
+        self.last = None
+        self.active = True
+
+    """
+    Pass a sample on to the callback if this subscriber's rate limit allows it.
+    """
+    def offer(self, sample, now):
+        if not self.active:
+            return
+        if self.last is not None and now - self.last < self.interval:
+            return
+        self.last = now
+        try:
+            self.callback(sample)
+        except Exception as e:
+            log.exception("Telemetry subscriber for %s failed: %s", self.stream, e)
+
+    def cancel(self):
+        self.hub.unsubscribe(self)
+
+
+"""
+Fan-out hub for a single vehicle. Must be created on the event loop that owns the drone's System.
+"""
+class TelemetryHub:
+
+    def __init__(self, drone, rates=None):
+        self.drone = drone
+        self.loop = asyncio.get_running_loop()
+        self.rates = dict(STREAM_RATES)
+        if rates:
+            self.rates.update(rates)
+        self.latest = {}
+        self.subscribers = {stream: [] for stream in STREAMS}
+        self.observers = []
+        self.tasks = {}
+        self._lock = threading.Lock()
+
+    """
+    Register a callback for a stream. The underlying MAVSDK stream is opened on first subscription.
+    Safe to call from any thread; callbacks always run on the hub's event loop.
+    """
+    def subscribe(self, stream, callback, rate_hz=None):
+        if stream not in STREAMS:
+            raise ValueError(f"Unknown telemetry stream: {stream}")
+
+        subscription = Subscription(self, stream, callback, rate_hz)
+        with self._lock:
+            self.subscribers[stream].append(subscription)
+        self._call(self._open, stream)
+        return subscription
+
+    """
+    Remove a subscriber. The MAVSDK stream itself stays open for the rest of the session.
+    """
+    def unsubscribe(self, subscription):
+        subscription.active = False
+        with self._lock:
+            if subscription in self.subscribers[subscription.stream]:
+                self.subscribers[subscription.stream].remove(subscription)
+
+    """
+    Register an observer(stream, now) called for every sample received, before any decimation. Used to
+    monitor link health (see LinkWatchdog).
+    """
+    def add_observer(self, observer):
+        self.observers.append(observer)
+
+    def remove_observer(self, observer):
+        if observer in self.observers:
+            self.observers.remove(observer)
+
+    """
+    Change the rate of a stream. Takes effect straight away if the stream is already open.
+    """
+    def set_rate(self, stream, rate_hz):
+        if stream not in STREAMS:
+            raise ValueError(f"Unknown telemetry stream: {stream}")
+
+        self.rates[stream] = rate_hz
+        if stream in self.tasks:
+            self._call(lambda: self.loop.create_task(self._apply_rate(stream)))
+
+    """
+    Most recent sample of a stream, or None if nothing has arrived yet.
+    """
+    def get(self, stream):
+        return self.latest.get(stream)
+
+    """
+    Return the latest sample of a stream, waiting for the first one if none has arrived yet.
+    """
+    async def first(self, stream):
+        if stream in self.latest:
+            return self.latest[stream]
+
+        future = self.loop.create_future()
+
+        def resolve(sample):
+            if not future.done():
+                future.set_result(sample)
+
+        subscription = self.subscribe(stream, resolve)
+        try:
+            return await future
+        finally:
+            subscription.cancel()
+
+    """
+    Iterate over a stream from a coroutine. Only the newest sample is kept while the consumer is busy, so
+    a slow consumer never works through a backlog of stale values.
+    """
+    async def samples(self, stream, rate_hz=None):
+        queue = asyncio.Queue(maxsize=1)
+
+        def push(sample):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(sample)
+
+        subscription = self.subscribe(stream, push, rate_hz)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            subscription.cancel()
+
+    """
+    Restart any opened stream whose MAVSDK stream has ended, e.g. after a link dropout. Subscribers are kept.
+    """
+    def reopen(self):
+        for stream in list(self.tasks):
+            self._call(self._open, stream)
+
+    """
+    Cancel every open stream.
+    """
+    def close(self):
+        for task in self.tasks.values():
+            self._call(task.cancel)
+        self.tasks = {}
+
+    """
+    Run a callable on the hub's loop, directly if we are already on it.
+    """
+    def _call(self, callback, *args):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is self.loop:
+            callback(*args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    """
+    Open the MAVSDK stream if nothing is consuming it yet.
+    """
+    def _open(self, stream):
+        task = self.tasks.get(stream)
+        if task is None or task.done():
+            self.tasks[stream] = self.loop.create_task(self._pump(stream))
+
+    """
+    Ask the vehicle to send a stream at its configured rate. Returns False if the vehicle or plugin does
+    not support it, in which case the stream is only decimated on our side.
+    """
+    async def _apply_rate(self, stream):
+        rate_hz = self.rates.get(stream)
+        set_rate = getattr(self.drone.telemetry, f"set_rate_{stream}", None)
+        if not rate_hz or set_rate is None or STREAMS[stream] != "telemetry":
+            return False
+        try:
+            await set_rate(rate_hz)
+            return True
+        except Exception as e:
+            log.info("Vehicle rate for %s not set, decimating locally: %s", stream, e)
+            return False
+
+    """
+    Read one MAVSDK stream and fan each sample out to the current subscribers.
+    """
+    async def _pump(self, stream):
+        await self._apply_rate(stream)
+        plugin = getattr(self.drone, STREAMS[stream])
+        last = None
+        async for sample in getattr(plugin, stream)():
+            self.latest[stream] = sample
+            now = time.monotonic()
+            for observer in self.observers:
+                observer(stream, now)
+            # Client side decimation for anything arriving faster than the configured rate.
+            rate_hz = self.rates.get(stream)
+            if rate_hz and last is not None and now - last < 1.0 / rate_hz:
+                continue
+            last = now
+            with self._lock:
+                subscribers = list(self.subscribers[stream])
+            for subscription in subscribers:
+                subscription.offer(sample, now)
@@ -0,0 +1,131 @@
+"""
+
+Offboard trajectory streaming for indoor missions.
+
+Rather than sending one position setpoint per waypoint and leaving the flight controller to fly a step response
+to it, the waypoints are joined into a trajectory that respects a speed and acceleration limit. Setpoints sampled
+from it are then published at a fixed rate. Each leg uses a trapezoidal velocity profile, accelerating away from
+one waypoint and braking to a stop at the next, so the vehicle tracks a moving setpoint that is always within
+reach and does not overshoot.
+
+"""
+
+import asyncio
+import bisect
+import math
+
+from mavsdk.offboard import PositionNedYaw
+
+
+# Rate (Hz) that setpoints are published at while a trajectory is flown.
+SETPOINT_RATE = 30.0
+# Speed (m/s) used when none has been set in the GUI.
+DEFAULT_SPEED = 1.0
+# Time (s) taken to accelerate to the cruise speed. Sets the acceleration limit from the speed.
+RAMP_TIME = 1.0
+
+
+"""
+Straight-line legs between waypoints, each flown with a trapezoidal velocity profile.
+"""
+class Trajectory:
+
+    def __init__(self, waypoints, max_speed=DEFAULT_SPEED, max_accel=None):
+        if max_accel is None:
+            max_accel = max_speed / RAMP_TIME
+        self.max_speed = max_speed
+        self.max_accel = max_accel
+        self.points = [tuple(float(value) for value in waypoint[:3]) for waypoint in waypoints]
+        self.yaws = [float(waypoint[3]) if len(waypoint) > 3 else 0.0 for waypoint in waypoints]
+
+        # Start time, length and duration of each leg.
+        self.starts = []
+        self.lengths = []
+        self.durations = []
+        elapsed = 0.0
+        for start, end in zip(self.points, self.points[1:]):
+            length = math.dist(start, end)
+            self.starts.append(elapsed)
+            self.lengths.append(length)
+            self.durations.append(self._leg_time(length))
+            elapsed += self.durations[-1]
+        self.duration = elapsed
+
+    def __len__(self):
+        return len(self.durations)
+
+    def _leg_time(self, length):
+        v, a = self.max_speed, self.max_accel
+        if length >= v * v / a:
+            return length / v + v / a
+        return 2.0 * math.sqrt(length / a)
+
+    """
+    Distance covered along a leg of the given length, `t` seconds after leaving its start.
+    """
+    def _leg_distance(self, length, duration, t):
+        a = self.max_accel
+        # Peak speed of the leg: the cruise speed, or less if the leg is too short to reach it.
+        v = min(self.max_speed, math.sqrt(length * a))
+        ramp = v / a
+        if t <= 0.0:
+            return 0.0
+        if t >= duration:
+            return length
+        if t < ramp:
+            return 0.5 * a * t * t
+        if t <= duration - ramp:
+            return 0.5 * a * ramp * ramp + v * (t - ramp)
+        remaining = duration - t
+        return length - 0.5 * a * remaining * remaining
+
+    """
+    Index of the leg being flown at time t.
+    """
+    def leg(self, t):
+        return max(0, min(len(self) - 1, bisect.bisect_right(self.starts, t) - 1))
+
+    """
+    Setpoint (north, east, down, yaw) at time t seconds after the start.
+    """
+    def sample(self, t):
+        if not len(self) or t >= self.duration:
+            north, east, down = self.points[-1]
+            return north, east, down, self.yaws[-1]
+
+        i = self.leg(t)
+        length = self.lengths[i]
+        start, end = self.points[i], self.points[i + 1]
+        fraction = self._leg_distance(length, self.durations[i], t - self.starts[i]) / length if length else 1.0
+        north, east, down = (s + (e - s) * fraction for s, e in zip(start, end))
+        return north, east, down, self.yaws[i + 1]
+
+
+"""
+Publish setpoints from a trajectory at a fixed rate until its end is reached. Ticks are scheduled against the
+loop clock, so a slow send delays the next setpoint but never makes the stream drift or bunch up.
+"""
+async def stream_trajectory(drone, trajectory, rate_hz=SETPOINT_RATE, on_leg=None):
+    loop = asyncio.get_running_loop()
+    period = 1.0 / rate_hz
+    start = loop.time()
+    tick = 0
+    leg = None
+    while True:
+        t = loop.time() - start
+        if on_leg is not None and len(trajectory) and trajectory.leg(t) != leg:
+            leg = trajectory.leg(t)
+            on_leg(leg)
+
+        north, east, down, yaw = trajectory.sample(t)
+        await drone.offboard.set_position_ned(PositionNedYaw(north, east, down, yaw))
+        if t >= trajectory.duration:
+            return
+
+        tick += 1
+        delay = start + tick * period - loop.time()
+        if delay < 0:
+            # Missed ticks are skipped rather than sent in a burst.
+            tick = math.ceil((loop.time() - start) / period)
+            delay = 0.0
+        await asyncio.sleep(delay)
@@ -4,6 +4,12 @@ Python file for all the Util functions required by the Application.
 
 """
 
+import math
+
+from StructuredLog import get_logger
+
+log = get_logger(__name__)
+
 
 """
 Save the current mission planner state to a text file.
@@ -153,18 +159,18 @@ def formatDimensions(dimensions_str):
     try:
         dimensions_arr = dimensions_str.split(',')
     except:
-        print("split")
+        log.debug("Dimensions input could not be split")
         return []
 
     n = len(dimensions_arr)
     if not n == 2:
-        print("number")
+        log.debug("Dimensions input does not have 2 values")
         return []
 
     try:
         dimensions = [float(dimensions_arr[0]), float(dimensions_arr[1])]
     except:
-        print("float")
+        log.debug("Dimensions input is not numeric")
         return []
 
     return dimensions
@@ -182,3 +188,12 @@ def terminalString(wp_arr, outdoor):
                   "m    z = " + str(wp_arr[2]) + "m \n"
 
     return wp_text
+
+
+"""
+Great circle distance in metres between two (lat, lon) points.
+"""
+def haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371000.0 * math.asin(math.sqrt(a))
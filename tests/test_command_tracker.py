@@ -0,0 +1,78 @@
+import numpy as np
+
+from CommandTracker import LatencyHistogram
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+
+    assert histogram.percentile(50) is None
+    assert histogram.mean() is None
+    assert histogram.distribution() == []
+
+
+def test_small_values_are_exact():
+    histogram = LatencyHistogram()
+    for value in range(1, 101):
+        histogram.record(value)
+
+    assert histogram.total == 100
+    assert histogram.min == 1
+    assert histogram.max == 100
+    assert histogram.mean() == 50.5
+    assert histogram.percentile(50) == 50
+    assert histogram.percentile(99) == 99
+    assert histogram.percentile(100) == 100
+
+
+def test_percentiles_keep_relative_precision():
+    values = np.random.default_rng(1).lognormal(mean=10, sigma=2, size=10000).astype(np.int64) + 1
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+
+    for percent in (10.0, 50.0, 90.0, 99.0, 99.9):
+        exact = np.percentile(values, percent, method="inverted_cdf")
+        assert abs(histogram.percentile(percent) - exact) <= exact * 10 ** -histogram.significant_figures
+    assert histogram.percentile(100) == values.max()
+
+
+def test_percentiles_are_monotonic():
+    histogram = LatencyHistogram()
+    for value in (5, 500, 50000, 5000000):
+        histogram.record(value, count=25)
+
+    percentiles = [histogram.percentile(percent) for percent in range(1, 101)]
+    assert percentiles == sorted(percentiles)
+    assert percentiles[-1] == 5000000
+
+
+def test_values_are_clamped():
+    histogram = LatencyHistogram(highest=1000)
+    histogram.record(-5)
+    histogram.record(10 ** 9)
+
+    assert histogram.min == 0
+    assert histogram.max == 1000
+    assert histogram.percentile(100) == 1000
+
+
+def test_distribution_ends_at_all_values():
+    histogram = LatencyHistogram()
+    for value in (3, 3, 700, 90000):
+        histogram.record(value)
+
+    rows = histogram.distribution()
+    assert [count for _, _, count in rows] == [2, 3, 4]
+    assert rows[-1][0] == 90000
+    assert rows[-1][1] == 100.0
+
+
+def test_reset():
+    histogram = LatencyHistogram()
+    histogram.record(42)
+    histogram.reset()
+
+    assert histogram.total == 0
+    assert histogram.max is None
+    assert histogram.percentile(50) is None
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from FlightRecorder import CHUNK_HEADER, FlightLog, FlightRecorder
+
+
+def record_flight(path, batteries, positions, chunk_records=4):
+    recorder = FlightRecorder(path, streams=("battery", "position"), chunk_records=chunk_records)
+    for record in batteries:
+        recorder.append_record("battery", record)
+    for record in positions:
+        recorder.append_record("position", record)
+    recorder.close()
+    return FlightLog(path)
+
+
+def test_chunk_header_keeps_columns_aligned():
+    assert CHUNK_HEADER.size % 8 == 0
+
+
+def test_columns_are_aligned_views(tmp_path):
+    batteries = [(float(t), 1.0 - t / 100) for t in range(10)]
+    log = record_flight(tmp_path / "flight.mdf", batteries, [])
+
+    assert [len(chunk["timestamp"]) for chunk in log.chunks["battery"]] == [4, 4, 2]
+    for chunk in log.chunks["battery"]:
+        for column in chunk.values():
+            assert column.ctypes.data % 8 == 0
+            assert not column.flags.owndata
+
+
+def test_records_round_trip(tmp_path):
+    batteries = [(float(t), 1.0 - t / 100) for t in range(10)]
+    positions = [(t + 0.5, 47.0 + t * 1e-6, 8.0 - t * 1e-6, 10.0 + t) for t in range(6)]
+    log = record_flight(tmp_path / "flight.mdf", batteries, positions)
+
+    assert log.count("battery") == 10
+    assert log.count("position") == 6
+    np.testing.assert_array_equal(log.column("battery", "timestamp"), [t for t, _ in batteries])
+    np.testing.assert_allclose(log.column("battery", "battery"), [b for _, b in batteries], rtol=1e-6)
+    positions_read = log.records("position")
+    np.testing.assert_array_equal(positions_read["lat"], [p[1] for p in positions])
+    np.testing.assert_array_equal(positions_read["lon"], [p[2] for p in positions])
+
+
+def test_empty_stream(tmp_path):
+    log = record_flight(tmp_path / "flight.mdf", [(0.0, 1.0)], [])
+
+    assert log.count("position") == 0
+    assert len(log.column("position", "lat")) == 0
+    assert len(log.records("position")) == 0
+
+
+def test_replay_merges_streams_in_time_order(tmp_path):
+    batteries = [(float(t), 1.0) for t in range(5)]
+    positions = [(t + 0.5, 47.0, 8.0, 10.0) for t in range(5)]
+    log = record_flight(tmp_path / "flight.mdf", batteries, positions)
+
+    replayed = list(log.replay())
+    times = [timestamp for timestamp, _, _ in replayed]
+    assert times == sorted(times)
+    assert [stream for _, stream, _ in replayed] == ["battery", "position"] * 5
+    assert all(record["timestamp"] == timestamp for timestamp, _, record in replayed)
+    assert [stream for _, stream, _ in log.replay(["position"])] == ["position"] * 5
+
+
+def test_truncated_chunk_is_ignored(tmp_path):
+    path = tmp_path / "flight.mdf"
+    record_flight(path, [(float(t), 1.0) for t in range(10)], [])
+    data = path.read_bytes()
+    path.write_bytes(data[:-8])
+
+    log = FlightLog(path)
+    assert log.count("battery") == 8
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.mdf"
+    path.write_bytes(b"not a flight log at all")
+    with pytest.raises(ValueError):
+        FlightLog(path)
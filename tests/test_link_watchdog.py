@@ -0,0 +1,74 @@
+import math
+
+import pytest
+
+from LinkWatchdog import MIN_INTERVALS, ArrivalStats
+
+
+def arrive(stats, times):
+    for now in times:
+        stats.add(now)
+    return stats
+
+
+def test_no_arrivals():
+    snapshot = ArrivalStats().snapshot(now=10.0)
+
+    assert snapshot["count"] == 0
+    assert snapshot["rate_hz"] == 0.0
+    assert snapshot["age"] == math.inf
+
+
+def test_steady_rate():
+    stats = arrive(ArrivalStats(), [t * 0.1 for t in range(51)])
+    snapshot = stats.snapshot(now=5.5)
+
+    assert snapshot["count"] == 51
+    assert snapshot["rate_hz"] == pytest.approx(10.0)
+    assert snapshot["mean_interval"] == pytest.approx(0.1)
+    assert snapshot["stddev"] == pytest.approx(0.0, abs=1e-9)
+    assert snapshot["jitter"] == pytest.approx(0.0, abs=1e-9)
+    assert snapshot["gaps"] == 0
+    assert snapshot["age"] == pytest.approx(0.5)
+
+
+def test_gap_is_kept_out_of_the_mean():
+    times = [float(t) for t in range(11)] + [15.0, 16.0, 17.0]
+    stats = arrive(ArrivalStats(), times)
+    snapshot = stats.snapshot(now=17.0)
+
+    assert snapshot["gaps"] == 1
+    assert snapshot["max_gap"] == pytest.approx(5.0)
+    assert snapshot["mean_interval"] == pytest.approx(1.0)
+
+
+def test_dropout_while_warming_up_is_a_gap():
+    # The second interval is a dropout; judged against the median of the first intervals it is still a gap.
+    times = [0.0, 1.0, 9.0] + [9.0 + t for t in range(1, 10)]
+    stats = arrive(ArrivalStats(), times)
+    snapshot = stats.snapshot(now=18.0)
+
+    assert snapshot["gaps"] == 1
+    assert snapshot["max_gap"] == pytest.approx(8.0)
+    assert snapshot["rate_hz"] == pytest.approx(1.0)
+
+
+def test_warming_up_reports_the_median():
+    times = [0.0, 1.0, 9.0, 10.0]
+    assert len(times) - 1 < MIN_INTERVALS
+    snapshot = arrive(ArrivalStats(), times).snapshot(now=10.0)
+
+    assert snapshot["mean_interval"] == pytest.approx(1.0)
+    assert snapshot["gaps"] == 0
+
+
+def test_jitter_tracks_irregular_intervals():
+    times = [0.0]
+    for k in range(40):
+        times.append(times[-1] + (0.9 if k % 2 else 1.1))
+    snapshot = arrive(ArrivalStats(), times).snapshot(now=times[-1])
+
+    assert snapshot["gaps"] == 0
+    assert snapshot["mean_interval"] == pytest.approx(1.0)
+    assert snapshot["stddev"] == pytest.approx(0.1, rel=0.05)
+    assert 0.05 < snapshot["jitter"] < 0.2
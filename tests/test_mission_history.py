@@ -0,0 +1,171 @@
+import random
+
+import numpy as np
+import pytest
+
+from Mission import MISSION_DTYPE, SEED_DROP, Mission
+from MissionHistory import HISTORY_LIMIT, MissionHistory, PersistentSequence
+
+
+def indoor_mission(count):
+    return Mission.from_list([[float(k), float(-k), -1.5, 0.0] for k in range(count)], outdoor=False)
+
+
+"""
+Raw bytes of the mission, so that NaN speeds compare equal.
+"""
+def snapshot(mission):
+    return mission.records.tobytes()
+
+
+def assert_in_step(history):
+    tree = np.array(list(history.current), dtype=MISSION_DTYPE)
+    assert tree.tobytes() == snapshot(history.mission)
+
+
+def test_persistent_sequence_versions_are_independent():
+    values = list(range(100))
+    first = PersistentSequence.from_values(values)
+    second = first.insert(10, "new").delete(0).set(50, "changed")
+
+    assert list(first) == values
+    assert len(second) == 100
+    assert second[9] == "new"
+    assert second[50] == "changed"
+    assert second[-1] == 99
+    with pytest.raises(IndexError):
+        second[100]
+
+
+def test_every_edit_can_be_undone_and_redone():
+    history = MissionHistory(indoor_mission(5))
+    versions = [snapshot(history.mission)]
+
+    history.insert([9.0, 9.0, -2.0, 0.0], index=2, speed=1.5)
+    versions.append(snapshot(history.mission))
+    history.extend(indoor_mission(3).records)
+    versions.append(snapshot(history.mission))
+    history.move(0.5, -0.5, indices=[0, 3])
+    versions.append(snapshot(history.mission))
+    history.delete([1, 4])
+    versions.append(snapshot(history.mission))
+    history.pop()
+    versions.append(snapshot(history.mission))
+    history.clear()
+    versions.append(snapshot(history.mission))
+    assert len(history.mission) == 0
+
+    for version in reversed(versions[:-1]):
+        assert history.undo()
+        assert snapshot(history.mission) == version
+        assert_in_step(history)
+    assert not history.undo()
+
+    for version in versions[1:]:
+        assert history.redo()
+        assert snapshot(history.mission) == version
+        assert_in_step(history)
+    assert not history.redo()
+
+
+def test_new_edit_clears_redo():
+    history = MissionHistory(indoor_mission(3))
+    history.pop()
+    history.undo()
+    assert history.can_redo()
+
+    history.insert([5.0, 5.0, -1.0, 0.0])
+    assert not history.can_redo()
+    assert len(history.mission) == 4
+
+
+def test_random_edits_match_a_list_model():
+    rng = random.Random(7)
+    history = MissionHistory(indoor_mission(10))
+    model = history.mission.to_list()
+    versions = [model]
+
+    for _ in range(200):
+        edit = rng.random()
+        if edit < 0.3 or not model:
+            index = rng.randint(0, len(model))
+            waypoint = [rng.uniform(-5, 5), rng.uniform(-5, 5), -1.0, 0.0]
+            history.insert(waypoint, index=index)
+            model = model[:index] + [waypoint] + model[index:]
+        elif edit < 0.6:
+            indices = set(rng.sample(range(len(model)), rng.randint(1, min(3, len(model)))))
+            history.delete(indices)
+            model = [waypoint for i, waypoint in enumerate(model) if i not in indices]
+        elif edit < 0.8:
+            index = rng.randrange(len(model))
+            history.move(1.0, 2.0, indices=[index])
+            model = list(model)
+            x, y, z, yaw = model[index]
+            model[index] = [x + 1.0, y + 2.0, z, yaw]
+        elif history.can_undo():
+            history.undo()
+            versions.pop()
+            model = versions[-1]
+            continue
+        versions.append(model)
+        assert history.mission.to_list() == model
+        assert_in_step(history)
+
+    while history.undo():
+        versions.pop()
+        assert history.mission.to_list() == versions[-1]
+        assert_in_step(history)
+
+
+def test_history_is_limited():
+    history = MissionHistory(indoor_mission(1), limit=3)
+    for k in range(5):
+        history.insert([float(k), 0.0, -1.0, 0.0])
+
+    undone = 0
+    while history.undo():
+        undone += 1
+    assert undone == 3
+    assert len(history.mission) == 3
+    assert HISTORY_LIMIT > 3
+
+
+def test_restore_keeps_speed_hold_and_action():
+    history = MissionHistory(Mission(outdoor=True))
+    history.insert([47.0, 8.0, 20.0], speed=4.0, hold=2.0, action=SEED_DROP)
+    history.insert([47.1, 8.1, 25.0])
+    history.undo()
+    history.redo()
+
+    records = history.mission.records
+    assert records["speed"][0] == 4.0
+    assert records["hold"][0] == 2.0
+    assert records["action"][0] == SEED_DROP
+    assert np.isnan(records["speed"][1])
+
+
+def test_selection():
+    history = MissionHistory(indoor_mission(4))
+    assert history.toggle(1)
+    assert history.toggle(3)
+    assert not history.toggle(3)
+    history.toggle(2)
+
+    history.insert([9.0, 9.0, -1.0, 0.0], index=0)
+    assert history.selected == {2, 3}
+    history.move(1.0, 0.0)
+    assert history.mission.position[2].tolist() == [2.0, -1.0]
+    history.delete()
+    assert history.selected == set()
+    assert len(history.mission) == 3
+    history.undo()
+    assert history.selected == set()
+    assert len(history.mission) == 5
+
+
+def test_nearest():
+    history = MissionHistory(indoor_mission(4))
+
+    assert history.nearest(2.1, -2.1, 0.5) == 2
+    assert history.nearest(20.0, 20.0, 0.5) is None
+    assert MissionHistory(Mission(outdoor=False)).nearest(0.0, 0.0, 1.0) is None
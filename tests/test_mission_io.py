@@ -0,0 +1,181 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from Mission import GRIPPER_OPEN, NO_ACTION, Mission
+from MissionIO import (DEFAULT_ALTITUDE, EXPORT_CHUNK, MAV_CMD_DO_CHANGE_SPEED, MAV_CMD_NAV_WAYPOINT,
+                       MAV_FRAME_GLOBAL_RELATIVE_ALT, MAV_FRAME_LOCAL_NED, export_mission, import_mission)
+
+
+def write(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def test_csv_with_header(tmp_path):
+    path = write(tmp_path / "route.csv", "# survey\nlon,lat,alt,speed,hold,action\n"
+                                         "8.5,47.1,10,2.5,3,1\n"
+                                         "8.6,47.2,,,,\n")
+    mission, skipped = import_mission(path, outdoor=True)
+
+    assert skipped == 0
+    assert mission.position.tolist() == [[47.1, 8.5], [47.2, 8.6]]
+    assert mission.altitude.tolist() == [10.0, DEFAULT_ALTITUDE]
+    assert mission.speed[0] == 2.5
+    assert np.isnan(mission.speed[1])
+    assert mission.hold.tolist() == [3.0, 0.0]
+    assert mission.action.tolist() == [GRIPPER_OPEN, NO_ACTION]
+
+
+def test_csv_without_header_indoors(tmp_path):
+    path = write(tmp_path / "route.txt", "1,2,1.5\n3,4,-2\n\n5,6\n")
+    mission, _ = import_mission(path, outdoor=False)
+
+    assert mission.position.tolist() == [[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]]
+    # Stored NED whichever sign the file used.
+    assert mission.altitude.tolist() == [-1.5, -2.0, -DEFAULT_ALTITUDE]
+
+
+def test_csv_chunks(tmp_path):
+    rows = "".join(f"{k},{-k},2\n" for k in range(1000))
+    mission, _ = import_mission(write(tmp_path / "route.csv", rows), outdoor=False, chunk_size=64)
+
+    assert len(mission) == 1000
+    assert mission.position[:, 0].tolist() == list(range(1000))
+
+
+def test_invalid_waypoint_is_named(tmp_path):
+    rows = "".join(f"{k},{k},2\n" for k in range(10)) + "10,10,40\n"
+    path = write(tmp_path / "route.csv", rows)
+
+    with pytest.raises(ValueError, match="waypoint 11: altitude"):
+        import_mission(path, outdoor=False, chunk_size=4)
+    mission, skipped = import_mission(path, outdoor=False, skip_invalid=True, chunk_size=4)
+    assert skipped == 1
+    assert len(mission) == 10
+
+
+def test_unreadable_row(tmp_path):
+    path = write(tmp_path / "route.csv", "lat,lon\n47,8\n47,east\n")
+
+    with pytest.raises(ValueError, match="line 3"):
+        import_mission(path, outdoor=True)
+
+
+def test_gps_files_only_outdoors(tmp_path):
+    path = write(tmp_path / "route.geojson", '{"type": "Point", "coordinates": [8.5, 47.1, 12]}')
+
+    with pytest.raises(ValueError):
+        import_mission(path, outdoor=False)
+    mission, _ = import_mission(path, outdoor=True)
+    assert mission.to_list() == [[47.1, 8.5, 12.0]]
+
+
+def test_unsupported_file_type(tmp_path):
+    with pytest.raises(ValueError):
+        import_mission(write(tmp_path / "route.gpx", ""), outdoor=True)
+
+
+def outdoor_mission():
+    mission = Mission(outdoor=True)
+    mission.append([47.1, 8.5, 10.0])
+    mission.append([47.2, 8.6, 12.0], speed=3.0, hold=2.0)
+    mission.append([47.3, 8.7, 14.0], speed=3.0)
+    mission.append([47.4, 8.8, 16.0], speed=4.5)
+    mission.yaw[1] = 90.0
+    return mission
+
+
+"""
+Items of a QGC WPL 110 file as (index, current, frame, command, params) tuples.
+"""
+def read_wpl(path):
+    with open(path) as file:
+        assert file.readline() == "QGC WPL 110\n"
+        items = []
+        for line in file:
+            fields = line.rstrip("\n").split("\t")
+            assert len(fields) == 12
+            items.append((int(fields[0]), int(fields[1]), int(fields[2]), int(fields[3]),
+                          [float(field) for field in fields[4:11]]))
+    return items
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, EXPORT_CHUNK])
+def test_plan_round_trip(tmp_path, chunk_size):
+    mission = outdoor_mission()
+    path = str(tmp_path / "mission.plan")
+    export_mission(mission, path, chunk_size=chunk_size)
+    with open(path) as file:
+        plan = json.load(file)
+    read, skipped = import_mission(path, outdoor=True)
+
+    assert skipped == 0
+    assert plan["mission"]["plannedHomePosition"] == [47.1, 8.5, 0.0]
+    assert [item["doJumpId"] for item in plan["mission"]["items"]] == list(range(1, 7))
+    assert read.position.tolist() == mission.position.tolist()
+    assert read.altitude.tolist() == mission.altitude.tolist()
+    assert read.hold.tolist() == mission.hold.tolist()
+    assert np.array_equal(read.speed, mission.speed, equal_nan=True)
+    assert np.array_equal(read.yaw, mission.yaw, equal_nan=True)
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_plan_default_speed(tmp_path):
+    path = str(tmp_path / "mission.plan")
+    export_mission(outdoor_mission(), path, default_speed=1.5)
+    with open(path) as file:
+        plan = json.load(file)
+    read, _ = import_mission(path, outdoor=True)
+
+    assert plan["mission"]["hoverSpeed"] == 1.5
+    assert read.speed.tolist() == [1.5, 3.0, 3.0, 4.5]
+
+
+def test_plan_is_outdoor_only(tmp_path):
+    mission = Mission.from_list([[1.0, 2.0, -1.5, 0.0]], outdoor=False)
+
+    with pytest.raises(ValueError):
+        export_mission(mission, str(tmp_path / "mission.plan"))
+    assert not os.listdir(tmp_path)
+
+
+@pytest.mark.parametrize("chunk_size", [1, EXPORT_CHUNK])
+def test_wpl_round_trip(tmp_path, chunk_size):
+    mission = outdoor_mission()
+    path = str(tmp_path / "mission.waypoints")
+    export_mission(mission, path, chunk_size=chunk_size)
+    items = read_wpl(path)
+
+    assert [item[0] for item in items] == list(range(len(items)))
+    _, current, frame, command, params = items[0]
+    assert (current, frame, command) == (1, MAV_FRAME_GLOBAL_RELATIVE_ALT, MAV_CMD_NAV_WAYPOINT)
+    assert params[4:] == [47.1, 8.5, 0.0]
+
+    waypoints = [params for _, _, _, command, params in items[1:] if command == MAV_CMD_NAV_WAYPOINT]
+    speeds = [params[1] for _, _, _, command, params in items[1:] if command == MAV_CMD_DO_CHANGE_SPEED]
+    assert [params[4:6] for params in waypoints] == mission.position.tolist()
+    assert [params[6] for params in waypoints] == pytest.approx(mission.altitude.tolist())
+    assert [params[0] for params in waypoints] == mission.hold.tolist()
+    assert speeds == [3.0, 4.5]
+    assert np.isnan(waypoints[0][3])
+    assert waypoints[1][3] == 90.0
+
+
+def test_wpl_indoor(tmp_path):
+    mission = Mission.from_list([[1.0, 2.0, -1.5, 0.0], [3.0, 4.0, -2.0, 45.0]], outdoor=False)
+    path = str(tmp_path / "mission.txt")
+    export_mission(mission, path, default_speed=0.8)
+    items = read_wpl(path)
+
+    assert {frame for _, _, frame, command, _ in items if command == MAV_CMD_NAV_WAYPOINT} == {MAV_FRAME_LOCAL_NED}
+    assert items[1][3] == MAV_CMD_DO_CHANGE_SPEED
+    assert items[1][4][1] == pytest.approx(0.8)
+    assert [params[4:] for _, _, _, command, params in items[2:]] == [[1.0, 2.0, -1.5], [3.0, 4.0, -2.0]]
+
+
+def test_unsupported_export_type(tmp_path):
+    with pytest.raises(ValueError):
+        export_mission(outdoor_mission(), str(tmp_path / "mission.kml"))
@@ -0,0 +1,137 @@
+import asyncio
+
+from TaskRunner import (CANCELLED, DONE, FAILED, FAILSAFE, MISSION, MODULE, QUEUED, RUNNING, TELEMETRY,
+                        TaskRunner)
+
+
+async def settle():
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+"""
+Run `test(runner)` with the runner task running on a fresh loop.
+"""
+def with_runner(test, max_workers=4, reserved=1):
+    async def main():
+        runner = TaskRunner(max_workers, reserved)
+        runner_task = asyncio.create_task(runner.run())
+        try:
+            await test(runner)
+        finally:
+            runner_task.cancel()
+            await asyncio.gather(runner_task, return_exceptions=True)
+    asyncio.run(main())
+
+
+def test_jobs_start_in_priority_order():
+    started = []
+
+    async def job(name):
+        started.append(name)
+
+    async def main():
+        runner = TaskRunner(max_workers=1, reserved=0)
+        for name, priority in (("telemetry", TELEMETRY), ("mission", MISSION), ("module", MODULE),
+                               ("mission 2", MISSION)):
+            runner.submit(job(name), priority, name)
+        runner_task = asyncio.create_task(runner.run())
+        await settle()
+        runner_task.cancel()
+        await asyncio.gather(runner_task, return_exceptions=True)
+
+    asyncio.run(main())
+    assert started == ["module", "mission", "mission 2", "telemetry"]
+
+
+def test_telemetry_never_takes_the_reserved_slots():
+    async def test(runner):
+        release = asyncio.Event()
+        streams = [runner.submit(release.wait(), TELEMETRY, f"stream {k}") for k in range(5)]
+        await settle()
+        assert [handle.state for handle in streams] == [RUNNING] * 3 + [QUEUED] * 2
+
+        module = runner.submit(release.wait(), MODULE, "module")
+        await settle()
+        assert module.state == RUNNING
+        assert len(runner.running) == 4
+
+        release.set()
+        await settle()
+        assert all(handle.state == DONE for handle in streams + [module])
+
+    with_runner(test, max_workers=4, reserved=1)
+
+
+def test_failsafe_is_never_kept_waiting():
+    async def test(runner):
+        release = asyncio.Event()
+        missions = [runner.submit(release.wait(), MISSION, f"mission {k}") for k in range(2)]
+        await settle()
+        assert all(handle.state == RUNNING for handle in missions)
+
+        queued = runner.submit(release.wait(), MODULE, "module")
+        failsafe = runner.submit(release.wait(), FAILSAFE, "failsafe")
+        await settle()
+        assert failsafe.state == RUNNING
+        assert queued.state == QUEUED
+        release.set()
+
+    with_runner(test, max_workers=2, reserved=1)
+
+
+def test_keyed_jobs_are_not_started_twice():
+    async def test(runner):
+        release = asyncio.Event()
+        first = runner.submit(release.wait(), TELEMETRY, "battery", key=("battery", 1))
+        duplicate = release.wait()
+        assert runner.submit(duplicate, TELEMETRY, "battery", key=("battery", 1)) is first
+        assert duplicate.cr_frame is None
+        assert runner.active(("battery", 1)) is first
+
+        release.set()
+        await settle()
+        assert runner.active(("battery", 1)) is None
+        assert runner.submit(asyncio.sleep(0), TELEMETRY, "battery", key=("battery", 1)) is not first
+
+    with_runner(test)
+
+
+def test_cancel_and_failure():
+    async def test(runner):
+        ended = []
+        release = asyncio.Event()
+        running = runner.submit(release.wait(), MISSION, "running", on_done=ended.append)
+        queued = runner.submit(release.wait(), MISSION, "queued", on_done=ended.append)
+        await settle()
+        assert queued.state == QUEUED
+
+        queued.cancel("not needed")
+        assert queued.state == CANCELLED
+        assert queued.token.cancelled
+        running.cancel()
+        await settle()
+        assert running.state == CANCELLED
+
+        async def fail():
+            raise RuntimeError("no link")
+
+        failed = runner.submit(fail(), MODULE, "fail")
+        await settle()
+        assert failed.state == FAILED
+        assert isinstance(failed.error, RuntimeError)
+        assert ended == [queued, running]
+
+    with_runner(test, max_workers=1, reserved=0)
+
+
+def test_stopping_the_runner_cancels_everything():
+    handles = []
+
+    async def test(runner):
+        handles.append(runner.submit(asyncio.Event().wait(), MISSION, "running"))
+        handles.append(runner.submit(asyncio.Event().wait(), MISSION, "queued"))
+        await settle()
+
+    with_runner(test, max_workers=1, reserved=0)
+    assert [handle.state for handle in handles] == [CANCELLED, CANCELLED]